@@ -0,0 +1,235 @@
+"""
+End-to-end benchmark of the pip-upgrade pipeline, against a local in-process stub index.
+
+Synthetic requirements trees (several files, chained with -r includes) are generated in a temp directory, and
+a threaded HTTP server serves the pypi json api, or simple pages (html, or PEP 691 json), with a configurable
+latency and payload size. Every stage of cli.main is timed separately:
+detection, parsing, status detection, selection and rewriting (packages are not installed).
+
+Results are printed as json (or written with --output), to compare runs between commits.
+
+Usage:
+  python benchmarks/bench_end_to_end.py [--sizes=10,100,1000] [--api=pypi_json|simple_html|simple_json]
+                                        [--latency-ms=20] [--releases=100] [--files-per-release=5]
+                                        [--jobs=8] [--cache] [--output=<file>]
+"""
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from pip_upgrader.packages_detector import PackagesDetector
+from pip_upgrader.packages_interactive_selector import PackageInteractiveSelector
+from pip_upgrader.packages_status_detector import PackagesStatusDetector
+from pip_upgrader.packages_upgrader import PackagesUpgrader
+from pip_upgrader.requirements_detector import RequirementsDetector
+
+PACKAGES_PER_FILE = 50
+
+
+class StubIndex(object):
+    """ Deterministic index content: every package has `releases` releases (1.0.0, 1.1.0, ...),
+    each with `files_per_release` files. """
+
+    def __init__(self, releases, files_per_release):
+        self.releases = releases
+        self.files_per_release = files_per_release
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def _filenames(self, name, vers):
+        filenames = ['{}-{}.tar.gz'.format(name, vers)]
+        for i in range(self.files_per_release - 1):
+            filenames.append('{}-{}-cp3{}-cp3{}-manylinux_2_17_x86_64.whl'.format(name.replace('-', '_'), vers, i, i))
+        return filenames
+
+    def _versions(self):
+        return ['1.{}.0'.format(i) for i in range(self.releases)]
+
+    def body(self, api, name):
+        key = (api, name)
+        with self._lock:
+            if key not in self._bodies:
+                self._bodies[key] = getattr(self, '_' + api)(name).encode('utf-8')
+            return self._bodies[key]
+
+    def _pypi_json(self, name):
+        def file_info(filename):
+            return {'filename': filename, 'upload_time': '2020-01-01T00:00:00', 'size': 12345,
+                    'digests': {'sha256': 's' * 64, 'md5': 'm' * 32}, 'packagetype': 'bdist_wheel',
+                    'url': 'https://files.example.com/packages/' + filename, 'yanked': False}
+        versions = self._versions()
+        return json.dumps({
+            'info': {'name': name, 'version': versions[-1], 'summary': 'stub', 'description': 'x' * 2000},
+            'releases': {vers: [file_info(filename) for filename in self._filenames(name, vers)]
+                         for vers in versions},
+        })
+
+    def _simple_html(self, name):
+        anchors = ['<a href="../../packages/{0}#sha256={1}">{0}</a><br/>'.format(filename, 's' * 64)
+                   for vers in self._versions() for filename in self._filenames(name, vers)]
+        return '<html><body><h1>Links for {}</h1>\n{}\n</body></html>'.format(name, '\n'.join(anchors))
+
+    def _simple_json(self, name):
+        return json.dumps({
+            'meta': {'api-version': '1.1'}, 'name': name, 'versions': self._versions(),
+            'files': [{'filename': filename, 'url': '../../packages/' + filename, 'hashes': {'sha256': 's' * 64},
+                       'upload-time': '2020-01-01T00:00:00.000000Z'}
+                      for vers in self._versions() for filename in self._filenames(name, vers)],
+        })
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def make_handler(stub_index, api, latency):
+    class StubIndexHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like a real index
+
+        def do_GET(self):
+            time.sleep(latency)
+            json_match = re.match(r'^/pypi/([^/]+)/json$', self.path)
+            simple_match = re.match(r'^/simple/([^/]+)/$', self.path)
+
+            if api == 'pypi_json' and json_match:
+                body, content_type = stub_index.body('pypi_json', json_match.group(1)), 'application/json'
+            elif api != 'pypi_json' and simple_match:
+                if api == 'simple_json' and 'application/vnd.pypi.simple.v1+json' in self.headers.get('Accept', ''):
+                    body = stub_index.body('simple_json', simple_match.group(1))
+                    content_type = 'application/vnd.pypi.simple.v1+json'
+                else:
+                    body, content_type = stub_index.body('simple_html', simple_match.group(1)), 'text/html'
+            else:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StubIndexHandler
+
+
+def make_requirements_tree(root, size):
+    """ requirements.txt including requirements/part-N.txt files, PACKAGES_PER_FILE packages each. """
+    os.makedirs(os.path.join(root, 'requirements'))
+    parts = []
+    for start in range(0, size, PACKAGES_PER_FILE):
+        part = 'requirements/part-{}.txt'.format(start // PACKAGES_PER_FILE)
+        parts.append(part)
+        with open(os.path.join(root, part), 'w') as fh:
+            for i in range(start, min(start + PACKAGES_PER_FILE, size)):
+                fh.write('pkg-{:05d}==1.0.0  # pinned\n'.format(i))
+    with open(os.path.join(root, 'requirements.txt'), 'w') as fh:
+        fh.write(''.join('-r {}\n'.format(part) for part in parts))
+
+
+def run_pipeline(index_url, jobs, use_cache):
+    """ Runs the stages of cli.main, returns their timings in seconds. """
+    options = {'<requirements_file>': [], '--dry-run': False, '-p': ['all'], '--skip-package-installation': True,
+               '--use-default-index': True, '--no-cache': not use_cache, '--jobs': str(jobs)}
+    timings = {}
+
+    with redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        filenames = RequirementsDetector(None).get_filenames()
+        timings['detection'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        packages = PackagesDetector(filenames).get_packages()
+        timings['parsing'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        status_detector = PackagesStatusDetector(packages, options)
+        status_detector.PYPI_API_URL = status_detector._prepare_api_url(index_url)
+        packages_status_map = status_detector.detect_available_upgrades(options)
+        timings['status_detection'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        selected_packages = PackageInteractiveSelector(packages_status_map, options).get_packages()
+        timings['selection'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        upgraded_packages = PackagesUpgrader(selected_packages, filenames, options).do_upgrade()
+        timings['rewriting'] = time.perf_counter() - started
+
+    result = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+    result['total'] = round(sum(timings.values()), 4)
+    result['packages'] = len(packages)
+    result['upgraded'] = len(upgraded_packages)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = dict((arg.lstrip('-').split('=') + [True])[:2] for arg in sys.argv[1:])
+    sizes = [int(size) for size in str(args.get('sizes', '10,100,1000')).split(',')]
+    api = args.get('api', 'pypi_json')
+    latency = float(args.get('latency-ms', 20)) / 1000.0
+    jobs = int(args.get('jobs', 8))
+
+    stub_index = StubIndex(int(args.get('releases', 100)), int(args.get('files-per-release', 5)))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(stub_index, api, latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    index_url = base_url + ('/pypi/' if api == 'pypi_json' else '/simple/')
+
+    cwd = os.getcwd()
+    cache_dir = tempfile.mkdtemp()
+    os.environ['PIP_UPGRADER_CACHE_DIR'] = cache_dir
+    results = []
+    try:
+        for size in sizes:
+            root = tempfile.mkdtemp()
+            try:
+                make_requirements_tree(root, size)
+                os.chdir(root)
+                result = run_pipeline(index_url, jobs, bool(args.get('cache')))
+                result['size'] = size
+                results.append(result)
+            finally:
+                os.chdir(cwd)
+                shutil.rmtree(root)
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir)
+
+    report = json.dumps({
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'config': {'api': api, 'latency_ms': latency * 1000, 'jobs': jobs, 'releases': stub_index.releases,
+                   'files_per_release': stub_index.files_per_release, 'cache': bool(args.get('cache'))},
+        'results': results,
+    }, indent=2)
+
+    if args.get('output'):
+        with open(args['output'], 'w') as fh:
+            fh.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Times the installed environments scanner (dist-info directory names, read with os.scandir) on synthetic
+virtualenvs, like the environments of a build host.
+
+Usage:
+  python benchmarks/bench_installed_environments.py [--environments=<n>] [--packages=<n>]
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from pip_upgrader.installed_environments import scan_environments
+
+
+def make_environments(root, environments, packages):
+    paths = []
+    for e in range(environments):
+        path = os.path.join(root, 'venv-{}'.format(e))
+        site_packages = os.path.join(path, 'lib', 'python3.11', 'site-packages')
+        for p in range(packages):
+            dist_info = os.path.join(site_packages, 'package_{}-1.{}.0.dist-info'.format(p, e % 7))
+            os.makedirs(dist_info)
+            open(os.path.join(dist_info, 'METADATA'), 'w').close()
+            os.makedirs(os.path.join(site_packages, 'package_{}'.format(p)))
+        paths.append(path)
+    return paths
+
+
+def main():
+    args = dict(arg.lstrip('-').split('=') for arg in sys.argv[1:] if '=' in arg)
+    environments = int(args.get('environments', 300))
+    packages = int(args.get('packages', 150))
+
+    root = tempfile.mkdtemp()
+    try:
+        paths = make_environments(root, environments, packages)
+
+        started = time.perf_counter()
+        installed = scan_environments(paths)
+        seconds = time.perf_counter() - started
+    finally:
+        shutil.rmtree(root)
+
+    print(json.dumps({
+        'environments': environments,
+        'packages_per_environment': packages,
+        'distributions': sum(len(versions) for versions in installed.values()),
+        'seconds': round(seconds, 4),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Compares decoding a large pypi json project document in full (json.loads) vs. the compact decoder
+used by pip-upgrader (pip_upgrader.pypi_json_parser.load_pypi_json).
+
+Each mode runs in a fresh interpreter, so peak RSS is not shared between them.
+
+Usage:
+  python benchmarks/bench_pypi_json_parse.py [--releases=<n>] [--files=<n>]
+"""
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+
+def make_document(releases, files_per_release):
+    """ Synthetic document, shaped like the pypi json api response of boto3 / tensorflow. """
+    def file_entry(vers, i):
+        return {
+            'comment_text': '',
+            'digests': {'blake2b_256': 'b' * 64, 'md5': 'm' * 32, 'sha256': 's' * 64},
+            'downloads': -1,
+            'filename': 'bigpackage-{}-cp3{}-cp3{}-manylinux_2_17_x86_64.whl'.format(vers, i, i),
+            'has_sig': False,
+            'md5_digest': 'm' * 32,
+            'packagetype': 'bdist_wheel',
+            'python_version': 'cp3{}'.format(i),
+            'requires_python': '>=3.7',
+            'size': 123456789,
+            'upload_time': '2020-01-01T00:00:{:02d}'.format(i % 60),
+            'upload_time_iso_8601': '2020-01-01T00:00:{:02d}.000000Z'.format(i % 60),
+            'url': 'https://files.pythonhosted.org/packages/aa/bb/' + 'c' * 60 + '/bigpackage.whl',
+            'yanked': False,
+            'yanked_reason': None,
+        }
+
+    release_versions = ['1.{}.{}'.format(i // 100, i % 100) for i in range(releases)]
+    return json.dumps({
+        'info': {'name': 'bigpackage', 'version': release_versions[-1], 'summary': 'big',
+                 'description': 'x' * 200000},
+        'releases': {vers: [file_entry(vers, i) for i in range(files_per_release)] for vers in release_versions},
+        'urls': [],
+    }).encode('utf-8')
+
+
+def run_mode(mode, releases, files_per_release):
+    from pip_upgrader.pypi_json_parser import load_pypi_json
+
+    content = make_document(releases, files_per_release)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    if mode == 'full':
+        data = json.loads(content)
+    else:
+        data = load_pypi_json(content)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(data['releases']) == releases
+
+    return {
+        'mode': mode,
+        'document_bytes': len(content),
+        'seconds': round(elapsed, 4),
+        'peak_traced_mb': round(peak / 1024.0 / 1024.0, 2),
+        # ru_maxrss is in KB on linux (bytes on macOS)
+        'rss_growth_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss,
+    }
+
+
+def main():
+    args = dict(arg.lstrip('-').split('=') for arg in sys.argv[1:] if '=' in arg)
+    releases = int(args.get('releases', 2000))
+    files_per_release = int(args.get('files', 20))
+
+    if 'mode' in args:
+        print(json.dumps(run_mode(args['mode'], releases, files_per_release)))
+        return
+
+    results = []
+    for mode in ('full', 'compact'):
+        output = subprocess.check_output([sys.executable, __file__, '--mode=' + mode,
+                                          '--releases={}'.format(releases), '--files={}'.format(files_per_release)])
+        results.append(json.loads(output.decode('utf-8')))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
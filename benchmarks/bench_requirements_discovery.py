@@ -0,0 +1,66 @@
+"""
+Times the recursive requirements discovery (os.scandir walk with ignore rules, includes with cycle detection)
+on a synthetic monorepo: `services` directories with a requirements/ dir, source trees, a .gitignore each,
+and an ignored node_modules tree.
+
+Usage:
+  python benchmarks/bench_requirements_discovery.py [--services=<n>] [--dirs-per-service=<n>]
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from pip_upgrader.requirements_detector import RequirementsDetector
+
+
+def make_monorepo(root, services, dirs_per_service):
+    directories = 0
+    for s in range(services):
+        service = os.path.join(root, 'services', 'service-{}'.format(s))
+        os.makedirs(os.path.join(service, 'requirements'))
+        with open(os.path.join(service, 'requirements', 'base.txt'), 'w') as fh:
+            fh.write('-c ../../../constraints.txt\ndjango==1.11\n')
+        with open(os.path.join(service, 'requirements', 'dev.txt'), 'w') as fh:
+            fh.write('--requirement=base.txt\npytest==3.0\n')
+        with open(os.path.join(service, '.gitignore'), 'w') as fh:
+            fh.write('build/\n*.pyc\n')
+        for d in range(dirs_per_service):
+            package_dir = os.path.join(service, 'src', 'pkg{}'.format(d // 10), 'mod{}'.format(d))
+            os.makedirs(package_dir)
+            open(os.path.join(package_dir, '__init__.py'), 'w').close()
+            directories += 1
+        os.makedirs(os.path.join(service, 'node_modules', 'left-pad'))
+        os.makedirs(os.path.join(service, 'build', 'lib'))
+    with open(os.path.join(root, 'constraints.txt'), 'w') as fh:
+        fh.write('celery==4.0\n')
+    return directories
+
+
+def main():
+    args = dict(arg.lstrip('-').split('=') for arg in sys.argv[1:] if '=' in arg)
+    services = int(args.get('services', 200))
+    dirs_per_service = int(args.get('dirs-per-service', 100))
+
+    root = tempfile.mkdtemp()
+    try:
+        directories = make_monorepo(root, services, dirs_per_service)
+
+        started = time.perf_counter()
+        filenames = RequirementsDetector(None, root=root, recursive=True).get_filenames()
+        seconds = time.perf_counter() - started
+    finally:
+        shutil.rmtree(root)
+
+    print(json.dumps({
+        'services': services,
+        'directories': directories,
+        'requirements_files': len(filenames),
+        'seconds': round(seconds, 4),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
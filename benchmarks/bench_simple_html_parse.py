@@ -0,0 +1,82 @@
+"""
+Compares the previous regex scan of simple (PEP 503) pages with the single pass anchor tokenizer,
+on a synthetic page with many links. The tokenizer is also timed on a page where no anchor is closed.
+
+Usage:
+  python benchmarks/bench_simple_html_parse.py [--links=<n>] [--repeat=<n>]
+"""
+import json
+import re
+import sys
+import time
+
+from packaging.utils import canonicalize_name
+
+from pip_upgrader.distribution_filenames import parse_filename_version
+from pip_upgrader.simple_html_parser import iter_anchor_files
+
+PACKAGE_NAME = 'bigpackage'
+
+
+def make_page(links, separator='\n', closing='</a>'):
+    anchors = []
+    for i in range(links):
+        vers = '{}.{}.{}'.format(i // 10000, (i // 100) % 100, i % 100)
+        if i % 3 == 0:
+            filename = '{}-{}.tar.gz'.format(PACKAGE_NAME, vers)
+        elif i % 3 == 1:
+            filename = '{}-{}-cp311-cp311-manylinux_2_17_x86_64.whl'.format(PACKAGE_NAME, vers)
+        else:
+            filename = '{}-{}.zip'.format(PACKAGE_NAME, vers)
+        anchors.append('<a href="../../packages/aa/bb/{}/{}#sha256={}" data-requires-python="&gt;=3.7">{}{}<br/>'
+                       .format('c' * 60, filename, 'd' * 64, filename, closing))
+    return ('<!DOCTYPE html><html><head><title>Links for {0}</title></head><body><h1>Links for {0}</h1>\n'
+            .format(PACKAGE_NAME) + separator.join(anchors) + '\n</body></html>')
+
+
+def regex_versions(text):
+    """ The parser used before the anchor tokenizer. """
+    pattern = r'<a.*>.*{name}-([A-z0-9\.-]*)(?:-py|\.tar).*<\/a>'.format(name=re.escape(PACKAGE_NAME))
+    return re.findall(pattern, text, flags=re.IGNORECASE)
+
+
+def tokenizer_versions(text):
+    canonical_name = canonicalize_name(PACKAGE_NAME)
+    versions = []
+    for filename, yanked in iter_anchor_files(text):
+        version_string = parse_filename_version(filename, canonical_name)
+        if version_string and not yanked:
+            versions.append(version_string)
+    return versions
+
+
+def measure(func, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        versions = func(text)
+        timings.append(time.perf_counter() - started)
+    return {'best_seconds': round(min(timings), 5), 'versions_found': len(set(versions))}
+
+
+def main():
+    args = dict(arg.lstrip('-').split('=') for arg in sys.argv[1:] if '=' in arg)
+    links = int(args.get('links', 10000))
+    repeat = int(args.get('repeat', 5))
+    results = {'links': links}
+    # some indexes (minified pages) put every anchor on a single line
+    for layout, separator in (('one_link_per_line', '\n'), ('single_line', '')):
+        text = make_page(links, separator)
+        results[layout] = {
+            'page_bytes': len(text),
+            'regex': measure(regex_versions, text, repeat),
+            'tokenizer': measure(tokenizer_versions, text, repeat),
+        }
+    # broken pages must not be quadratic: each unclosed anchor fails at the next one
+    text = make_page(links, closing='')
+    results['unclosed_anchors'] = {'page_bytes': len(text), 'tokenizer': measure(tokenizer_versions, text, repeat)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Compares the previous latest-version selection (parse every release, then max() over filtered lists)
+with pip_upgrader.version_selector.select_latest_version, on synthetic release histories.
+
+Usage:
+  python benchmarks/bench_version_selection.py [--packages=<n>] [--releases=<n>]
+"""
+import json
+import sys
+import time
+
+from packaging import version
+
+from pip_upgrader.version_selector import parse_version, select_latest_version
+
+
+def make_histories(packages, releases):
+    histories = []
+    for p in range(packages):
+        strings = []
+        for i in range(releases):
+            vers = '{}.{}.{}'.format(i // 100, (i // 10) % 10, i % 10)
+            strings.append(vers)
+            if i % 10 == 0:
+                strings.append(vers + 'rc1')
+        # pinned somewhere in the last quarter of the history
+        pinned = version.parse(strings[int(len(strings) * 0.8)])
+        histories.append((strings, pinned))
+    return histories
+
+
+def previous_selection(version_strings, current_version):
+    all_versions = [version.parse(vers) for vers in version_strings]
+    filtered_versions = [vers for vers in all_versions if not vers.is_prerelease and not vers.is_postrelease]
+    latest_version = max(filtered_versions)
+    if current_version.is_postrelease or current_version.is_prerelease:
+        prerelease_versions = [vers for vers in all_versions if vers.is_prerelease or vers.is_postrelease]
+        if prerelease_versions and max(prerelease_versions) > latest_version:
+            latest_version = max(prerelease_versions)
+    return latest_version
+
+
+def new_selection(version_strings, current_version):
+    include_prereleases = current_version.is_postrelease or current_version.is_prerelease
+    return select_latest_version(version_strings, current_version, include_prereleases)[0]
+
+
+def measure(func, histories):
+    started = time.process_time()
+    results = [func(strings, pinned) for strings, pinned in histories]
+    return round(time.process_time() - started, 4), results
+
+
+def main():
+    args = dict(arg.lstrip('-').split('=') for arg in sys.argv[1:] if '=' in arg)
+    histories = make_histories(int(args.get('packages', 300)), int(args.get('releases', 1000)))
+
+    previous_seconds, previous_results = measure(previous_selection, histories)
+    parse_version.cache_clear()
+    new_seconds, new_results = measure(new_selection, histories)
+    assert previous_results == new_results
+
+    print(json.dumps({
+        'packages': len(histories),
+        'releases_per_package': len(histories[0][0]),
+        'previous_cpu_seconds': previous_seconds,
+        'selector_cpu_seconds': new_seconds,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
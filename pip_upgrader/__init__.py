@@ -1,7 +1,9 @@
-from importlib.metadata import version 
-
-try:
-    __version__ = version('pip_upgrader')
-except Exception:  # pragma: nocover
-    __version__ = 'unknown'
- 
+def __getattr__(name):
+    # resolved on first access: importlib.metadata is slow to import, and only --version needs it
+    if name == '__version__':
+        from importlib.metadata import version
+        try:
+            return version('pip_upgrader')
+        except Exception:  # pragma: nocover
+            return 'unknown'
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
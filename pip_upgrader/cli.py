@@ -2,7 +2,8 @@
 pip-upgrade
 
 Usage:
-  pip-upgrade [<requirements_file>] ... [--prerelease] [-p=<package>...] [--dry-run] [--check-greater-equal] [--skip-virtualenv-check] [--skip-package-installation] [--use-default-index]
+  pip-upgrade [<requirements_file>] ... [--prerelease] [-p=<package>...] [--dry-run] [--check-greater-equal] [--check-compatibility] [--skip-virtualenv-check] [--skip-package-installation] [--use-default-index] [--jobs=<n>] [--no-cache] [--refresh] [--cache-ttl=<seconds>] [--sync] [--timeout=<seconds>] [--retries=<n>] [--batch-install] [--installer=<name>] [--python=<interpreter>] [--installer-command=<cmd>] [--prefetch] [--wheelhouse=<dir>] [--snapshot-out=<file>] [--offline=<file>] [--timings] [--profile=<file>] [--format=<format>] [--project=<dir>...] [--recursive] [--exclude=<glob>...] [--installed=<env>...] [--no-daemon]
+  pip-upgrade --daemon [--jobs=<n>] [--cache-ttl=<seconds>] [--timeout=<seconds>] [--retries=<n>]
 
 Arguments:
     requirements_file             The requirement FILE, or WILDCARD PATH to multiple files.
@@ -10,9 +11,34 @@ Arguments:
     -p <package>                  Pre-choose which packages tp upgrade. Skips any prompt. You can also use regular expressions to filter packages to upgrade.
     --dry-run                     Simulates the upgrade, but does not execute the actual upgrade.
     --check-greater-equal         Also checks packages with minimum version pinned (package>=version).
+    --check-compatibility         Check requires_dist / requires_python of the new versions against the other pins before installing. Conflicting upgrades are flagged, and skipped by -p.
     --skip-package-installation   Only upgrade the version in requirements files, don't install the new package.
     --skip-virtualenv-check       Disable virtualenv check. Allows installing the new packages outside the virtualenv.
     --use-default-index           Skip searching for custom index-url in pip configuration file(s).
+    --jobs=<n>                    Number of concurrent index lookups [default: 8].
+    --no-cache                    Don't read or write the on-disk index metadata cache.
+    --refresh                     Ignore cached index metadata, fetch everything again and update the cache.
+    --cache-ttl=<seconds>         Use cached index metadata without revalidation for this long [default: 3600].
+    --sync                        Validate cached index metadata from the index changelog (serials): only projects changed since the last sync are fetched.
+    --timeout=<seconds>           Timeout of each index request [default: 15].
+    --retries=<n>                 Retries (with backoff) for index errors, 429 and connection resets [default: 3].
+    --batch-install               Install all selected packages with a single installer call (failures are bisected).
+    --installer=<name>            Installer backend: pip (first pip on PATH), python (python -m pip of --python), pip-batch (python -m pip, all packages in one call) or command (--installer-command). The duration of each install is reported.
+    --python=<interpreter>        Target interpreter of the python, pip-batch and command installers (default: the one of the active virtualenv, else the running one).
+    --installer-command=<cmd>     External installer command, followed by the pins, like "uv pip install --python {python}" ({python} is replaced by the target interpreter). Implies --installer=command.
+    --prefetch                    Download the selected upgrades concurrently (sha256 verified) into a wheelhouse, then install from it without index access.
+    --wheelhouse=<dir>            The wheelhouse directory of --prefetch (default: wheelhouse in the cache directory).
+    --snapshot-out=<file>         Save all index answers of this run to a snapshot FILE (gzipped if it ends with .gz).
+    --offline=<file>              Answer all index queries from a snapshot FILE, without any network access.
+    --timings                     Print the duration of each stage, the index latency / bytes and the install duration of each package.
+    --profile=<file>              Run under cProfile and save the stats to FILE (for pstats or snakeviz).
+    --recursive                   Detect requirements files in the whole directory tree (requirements*.txt, constraints*.txt, requirements/ dirs).
+    --exclude=<glob>              Skip paths matching this .gitignore-style glob when detecting requirements files (.gitignore files are honored too).
+    --project=<dir>               Check several project roots at once (querying each package once), and update the requirements of each project (packages are not installed).
+    --installed=<env>             Compare pins with the packages installed in this environment (virtualenv, python executable or site-packages dir). Repeat for several environments.
+    --format=<format>             Output format: text, or ndjson / json to only report package statuses (ndjson streams one record per package) [default: text].
+    --daemon                      Run a daemon on a unix socket (PIP_UPGRADER_SOCKET, or daemon.sock in the cache directory), which keeps index answers warm. Later runs use it when it's running.
+    --no-daemon                   Query the indexes in this process, even if a daemon is running.
 
 Examples:
   pip-upgrade             # auto discovers requirements file
@@ -21,6 +47,12 @@ Examples:
   pip-upgrade requirements.txt -p django -p celery
   pip-upgrade requirements.txt -p all
   pip-upgrade requirements.txt --dry-run  # run everything as a simulation (don't do the actual upgrade)
+  pip-upgrade --format=ndjson | jq 'select(.upgrade_available)'
+  pip-upgrade --project=services/api --project=services/worker -p all
+  pip-upgrade --recursive --exclude='tests/fixtures/'
+  pip-upgrade --daemon &  # later runs ask the daemon
+  pip-upgrade --dry-run --installed=.venv --installed=/opt/app/venv
+  pip-upgrade -p all --installer-command='uv pip install --python {python}' --timings
 
 Help:
   Interactively upgrade packages from requirements file, and also update the pinned version from requirements file(s).
@@ -29,61 +61,219 @@ Help:
   https://github.com/simion/pip-upgrader
 """  # noqa: E501
 
-from colorclass import Windows, Color
+import os
+import sys
+
 from docopt import docopt
 
-from pip_upgrader import __version__ as VERSION
-from pip_upgrader.packages_detector import PackagesDetector
-from pip_upgrader.packages_interactive_selector import PackageInteractiveSelector
-from pip_upgrader.packages_status_detector import PackagesStatusDetector
-from pip_upgrader.packages_upgrader import PackagesUpgrader
-from pip_upgrader.requirements_detector import RequirementsDetector
-from pip_upgrader.virtualenv_checker import check_for_virtualenv
+# Stage modules (and their dependencies: requests, packaging, terminaltables...) are imported when their stage
+# runs, so --help, --version and early exits don't pay for them.
 
 
 def get_options():
-    return docopt(__doc__, version=VERSION)
+    # the version lookup (importlib.metadata) is only needed to answer --version
+    version = None
+    if '--version' in sys.argv[1:]:
+        from pip_upgrader import __version__ as version
+    return docopt(__doc__, version=version)
 
 
 def main():
     """ Main CLI entrypoint. """
     options = get_options()
+
+    from colorclass import Windows, Color
     Windows.enable(auto_colors=True, reset_atexit=True)
 
+    if options.get('--daemon'):
+        return run_daemon(options)
+
+    if not options.get('--profile'):
+        return run(options)
+
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(run, options)
+    finally:
+        profiler.dump_stats(options['--profile'])
+        print(Color('Profile saved to {{autoyellow}}{}{{/autoyellow}}'.format(options['--profile'])))
+
+
+def run_daemon(options):
+    from colorclass import Color
+
+    from pip_upgrader.daemon import DaemonError, StatusDaemon
+
+    daemon = StatusDaemon(options)
+    try:
+        daemon.bind()
+    except DaemonError as e:
+        print(Color('{{autored}}{}{{/autored}}'.format(e)))
+        return
+    print(Color('Daemon listening on {{autoyellow}}{}{{/autoyellow}}'.format(daemon.socket_path)))
+    # exit cleanly on kill too, so the socket file is removed
+    import signal
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:  # pragma: nocover
+        pass
+
+
+def prefetch_packages(status_detector, selected_packages, wheelhouse=None, python=None):
+    """ :param python: the interpreter the packages are installed for (default: the running one) """
+    from colorclass import Color
+
+    from pip_upgrader.wheel_prefetch import PrefetchError, WheelPrefetcher, interpreter_tags
+
     try:
-        # maybe check if virtualenv is not activated
-        check_for_virtualenv(options)
+        tags = interpreter_tags(python) if python else None
+    except PrefetchError as e:
+        print(Color('{{autoyellow}}Skipping prefetch (installing from the index): {}{{/autoyellow}}'.format(e)))
+        return
+    prefetcher = WheelPrefetcher(status_detector, wheelhouse=wheelhouse, tags=tags)
+    results = prefetcher.prefetch(selected_packages)
+    downloaded = 0
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            print(Color('{{autoyellow}}Could not prefetch {} (installing it from the index): {}{{/autoyellow}}'.format(
+                name, result)))
+            continue
+        downloaded += result['bytes']
+        if not result['verified']:
+            print(Color('{{autoyellow}}No digest published for {}, not verified{{/autoyellow}}'.format(
+                os.path.basename(result['path']))))
+    print(Color('Prefetched {}/{} packages ({:.1f} MB downloaded) into {{autoyellow}}{}{{/autoyellow}}'.format(
+        sum(1 for result in results.values() if not isinstance(result, Exception)), len(results),
+        downloaded / 1024.0 / 1024.0, prefetcher.wheelhouse)))
+
+
+def run(options):
+    from colorclass import Color
+
+    from pip_upgrader.installers import create_installer
+    from pip_upgrader.status_output import OUTPUT_FORMATS
+    from pip_upgrader.timings import Timings
+
+    timings = Timings()
+    output_format = options.get('--format') or 'text'
+    if output_format not in OUTPUT_FORMATS:
+        print(Color('{{autored}}Unknown output format "{}", use one of: {}{{/autored}}'.format(
+            output_format, ', '.join(OUTPUT_FORMATS))))
+        return
+    try:
+        installer = create_installer(options)
+    except ValueError as e:
+        print(Color('{{autored}}{}{{/autored}}'.format(e)))
+        return
+    # machine readable formats only report, and keep stdout for the records
+    info_stream = sys.stdout if output_format == 'text' else sys.stderr
+
+    projects_scanner = None
+
+    try:
+        # maybe check if virtualenv is not activated (several projects are never installed)
+        if output_format == 'text' and not options.get('--project'):
+            from pip_upgrader.virtualenv_checker import check_for_virtualenv
+            check_for_virtualenv(options)
 
         # 1. detect requirements files
-        filenames = RequirementsDetector(options.get('<requirements_file>')).get_filenames()
+        with timings.stage('detection'):
+            if options.get('--project'):
+                from pip_upgrader.multi_project import MultiProjectScanner
+                projects_scanner = MultiProjectScanner(options['--project'], recursive=options.get('--recursive'),
+                                                       excludes=options.get('--exclude'))
+                filenames = projects_scanner.get_filenames()
+            else:
+                from pip_upgrader.requirements_detector import RequirementsDetector
+                filenames = RequirementsDetector(options.get('<requirements_file>'),
+                                                 recursive=options.get('--recursive'),
+                                                 excludes=options.get('--exclude')).get_filenames()
         if filenames:
             print(Color('{{autoyellow}}Found valid requirements file(s):{{/autoyellow}} '
-                        '{{autocyan}}\n{}{{/autocyan}}'.format('\n'.join(filenames))))
+                        '{{autocyan}}\n{}{{/autocyan}}'.format('\n'.join(filenames))), file=info_stream)
         else:  # pragma: nocover
             print(Color('{autoyellow}No requirements files found in current directory. CD into your project '
-                        'or manually specify requirements files as arguments.{/autoyellow}'))
+                        'or manually specify requirements files as arguments.{/autoyellow}'), file=info_stream)
             return
         # 2. detect all packages inside requirements
-        packages = PackagesDetector(filenames).get_packages()
+        with timings.stage('parsing'):
+            from pip_upgrader.packages_detector import PackagesDetector
+            packages_detector = PackagesDetector(filenames)
+            packages = packages_detector.get_packages()
 
         # 3. query pypi API, see which package has a newer version vs the one in requirements (or current env)
-        packages_status_map = PackagesStatusDetector(
-            packages, options).detect_available_upgrades(options)
+        installed = None
+        if options.get('--installed'):
+            with timings.stage('installed_scan'):
+                from pip_upgrader.installed_environments import scan_environments
+                installed = scan_environments(options['--installed'])
 
-        # 4. [optionally], show interactive screen when user can choose which packages to upgrade
-        selected_packages = PackageInteractiveSelector(packages_status_map, options).get_packages()
+        with timings.stage('status_detection'):
+            from pip_upgrader.packages_status_detector import PackagesStatusDetector
+            status_detector = PackagesStatusDetector(
+                packages, options, timings=timings, requirements_index_urls=packages_detector.index_urls,
+                requirements_extra_index_urls=packages_detector.extra_index_urls, installed=installed)
+            packages_status_map = status_detector.detect_available_upgrades(options)
 
-        # 5. having the list of packages, do the actual upgrade and replace the version inside all filenames
-        upgraded_packages = PackagesUpgrader(selected_packages, filenames, options).do_upgrade()
+        if output_format == 'json':
+            from pip_upgrader.status_output import write_summary
+            write_summary(packages_status_map, status_detector.errors)
+        if output_format != 'text':
+            return
+
+        if installed is not None:
+            from pip_upgrader.installed_environments import print_installed_report
+            print_installed_report(packages_status_map, installed)
+
+        if projects_scanner:
+            # 4-5. selection and requirements update, per project
+            with timings.stage('upgrade'):
+                upgraded_projects = projects_scanner.upgrade(packages_status_map, options)
+            for root, upgraded_packages in upgraded_projects.items():
+                print(Color('{{autogreen}}Updated requirements of {}: {}{{/autogreen}}'.format(
+                    root, ','.join([package['name'] for package in upgraded_packages]))))
+        else:
+            if options.get('--check-compatibility'):
+                with timings.stage('compatibility'):
+                    from pip_upgrader.compatibility_checker import CompatibilityChecker
+                    conflicting = CompatibilityChecker(status_detector).check(packages_status_map)
+                if conflicting:
+                    print(Color('{{autoyellow}}{} upgrade(s) conflict with the other pins{{/autoyellow}}'.format(
+                        conflicting)))
+
+            # 4. [optionally], show interactive screen when user can choose which packages to upgrade
+            with timings.stage('selection'):
+                from pip_upgrader.packages_interactive_selector import PackageInteractiveSelector
+                selected_packages = PackageInteractiveSelector(packages_status_map, options).get_packages()
+
+            # 4b. [optionally], download all the selected upgrades concurrently, so the install is a local operation
+            if options.get('--prefetch') and selected_packages and not options['--dry-run'] and \
+                    not options.get('--skip-package-installation'):
+                with timings.stage('prefetch'):
+                    prefetch_packages(status_detector, selected_packages, options.get('--wheelhouse'),
+                                      python=installer.python)
+
+            # 5. having the list of packages, do the actual upgrade and replace the version inside all filenames
+            with timings.stage('upgrade'):
+                from pip_upgrader.packages_upgrader import PackagesUpgrader
+                upgraded_packages = PackagesUpgrader(selected_packages, filenames, options,
+                                                     timings=timings).do_upgrade()
+
+            print(Color('{{autogreen}}Successfully upgraded (and updated requirements) for the following packages: '
+                        '{}{{/autogreen}}'.format(','.join([package['name'] for package in upgraded_packages]))))
 
-        print(Color('{{autogreen}}Successfully upgraded (and updated requirements) for the following packages: '
-                    '{}{{/autogreen}}'.format(','.join([package['name'] for package in upgraded_packages]))))
         if options['--dry-run']:
             print(Color('{automagenta}Actually, no, because this was a simulation using --dry-run{/automagenta}'))
 
     except KeyboardInterrupt:  # pragma: nocover
         print(Color('\n{autored}Upgrade interrupted.{/autored}'))
 
+    finally:
+        if options.get('--timings'):
+            timings.print_report(file=info_stream)
+
 
 if __name__ == '__main__':  # pragma: nocover
     main()
@@ -0,0 +1,197 @@
+import json
+import platform
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import HeaderParser
+
+from packaging.markers import default_environment
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.specifiers import InvalidSpecifier, SpecifierSet
+from packaging.utils import canonicalize_name
+from requests import RequestException
+
+from pip_upgrader.release_files import pypi_json_release, simple_json_release_files
+
+
+class CompatibilityChecker(object):
+    """ Pre-flight check of the available upgrades, before anything is installed.
+
+    The requires_dist / requires_python metadata of each candidate version, and of each pinned version, is fetched
+    concurrently (and cached: the metadata of a release never changes). An upgrade conflicts when:
+    - the running python doesn't satisfy its requires_python
+    - it requires a version of another package which excludes that package's pin
+    - another pinned package requires a version of it which excludes the candidate
+    Conflicts are listed in the `conflicts` key of each package status.
+    """
+
+    status_detector = None
+    metadata = None
+
+    def __init__(self, status_detector, python_version=None):
+        """
+        :type status_detector: pip_upgrader.packages_status_detector.PackagesStatusDetector
+        :param python_version: the python the upgrades are checked for (default: the running one)
+        """
+        self.status_detector = status_detector
+        self.python_version = python_version or platform.python_version()
+        self.environment = dict(default_environment(), python_full_version=self.python_version,
+                                python_version='.'.join(self.python_version.split('.')[:2]))
+        self.metadata = {}
+
+    def check(self, packages_status_map):
+        """ Fills the `conflicts` of each package status with an available upgrade. Returns the number of
+        conflicting upgrades. """
+        statuses = {}
+        extras = {}
+        for package_status in packages_status_map.values():
+            name = canonicalize_name(package_status['name'])
+            statuses[name] = package_status
+            extras[name] = set()
+            for record in package_status.get('requirements', []):
+                extras[name].update(record.extras)
+
+        candidates = [(package_status['name'], package_status['latest_version'])
+                      for package_status in packages_status_map.values() if package_status['upgrade_available']]
+        pinned = [(package_status['name'], package_status['current_version'])
+                  for package_status in packages_status_map.values()]
+        self.fetch_metadata(candidates + pinned)
+
+        # {canonical name: [(pinned package status, its requirement on that name)]}
+        required_by = {}
+        for name, package_status in statuses.items():
+            for requirement in self._requirements(name, package_status['current_version'], extras[name]):
+                required_by.setdefault(canonicalize_name(requirement.name), []).append((package_status, requirement))
+
+        conflicting = 0
+        for package_status in packages_status_map.values():
+            if not package_status['upgrade_available']:
+                continue
+            package_status['conflicts'] = self._conflicts(package_status, statuses, extras, required_by)
+            conflicting += bool(package_status['conflicts'])
+        return conflicting
+
+    def fetch_metadata(self, releases):
+        """ Fetches the metadata of (name, version) releases, concurrently. Unknown metadata is stored as None. """
+        missing = sorted({(canonicalize_name(name), str(release_version)) for name, release_version in releases
+                          if (canonicalize_name(name), str(release_version)) not in self.metadata})
+        if not missing:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.status_detector.jobs) as executor:
+            for release, metadata in zip(missing, executor.map(self._fetch_release_metadata, missing)):
+                self.metadata[release] = metadata
+
+    def _requirements(self, name, release_version, extras=()):
+        """ The requirements of a release which apply to the checked environment (and the requested extras) """
+        metadata = self.metadata.get((canonicalize_name(name), str(release_version)))
+        if not metadata:
+            return []
+
+        requirements = []
+        for requirement_string in metadata.get('requires_dist') or []:
+            try:
+                requirement = Requirement(requirement_string)
+            except InvalidRequirement:  # pragma: nocover
+                continue
+            if requirement.marker and not any(requirement.marker.evaluate(dict(self.environment, extra=extra))
+                                              for extra in [''] + sorted(extras)):
+                continue
+            requirements.append(requirement)
+        return requirements
+
+    def _conflicts(self, package_status, statuses, extras, required_by):
+        """
+        :param statuses: {canonical name: package status} of all the pins
+        :param extras: {canonical name: extras requested in the requirements files}
+        :param required_by: {canonical name: [(package status, requirement)]} requirements of the pinned versions
+        """
+        name = canonicalize_name(package_status['name'])
+        latest_version = package_status['latest_version']
+        conflicts = []
+
+        metadata = self.metadata.get((name, str(latest_version))) or {}
+        try:
+            requires_python = SpecifierSet(metadata.get('requires_python') or '')
+        except InvalidSpecifier:  # pragma: nocover
+            requires_python = SpecifierSet('')
+        if not requires_python.contains(self.python_version, prereleases=True):
+            conflicts.append('requires Python {} (running {})'.format(requires_python, self.python_version))
+
+        # what the candidate requires from the other pins
+        for requirement in self._requirements(name, latest_version, extras.get(name, ())):
+            dependency_status = statuses.get(canonicalize_name(requirement.name))
+            if not dependency_status or \
+                    requirement.specifier.contains(dependency_status['current_version'], prereleases=True):
+                continue
+            conflict = 'requires {} ({} is pinned to {})'.format(requirement, requirement.name,
+                                                                 dependency_status['current_version'])
+            if dependency_status['upgrade_available'] and \
+                    requirement.specifier.contains(dependency_status['latest_version'], prereleases=True):
+                conflict += ', upgrade it to {} too'.format(dependency_status['latest_version'])
+            conflicts.append(conflict)
+
+        # what the other pins require from the candidate
+        for other_status, requirement in required_by.get(name, []):
+            if other_status is not package_status and \
+                    not requirement.specifier.contains(latest_version, prereleases=True):
+                conflicts.append('{} {} requires {}'.format(other_status['name'], other_status['current_version'],
+                                                            requirement))
+        return conflicts
+
+    def _fetch_release_metadata(self, release):
+        """ Runs in a worker thread. Returns {'requires_dist': [...], 'requires_python': ...}, or None """
+        name, release_version = release
+        detector = self.status_detector
+        index = detector.indexes[0] if detector.indexes else None
+        api_url = index.api_url if index else detector.PYPI_API_URL
+        api_type = index.api_type if index else detector.PYPI_API_TYPE
+
+        cache_key = '{}#metadata={}'.format(api_url, release_version)
+        entry = detector.cache.get(cache_key, name) if detector.cache else None
+        if entry:
+            # releases are immutable: their metadata is cached for good
+            return json.loads(entry['content'].decode('utf-8'))
+        if detector.offline_snapshot:
+            return None
+
+        try:
+            if api_type == 'pypi_json':
+                metadata = self._fetch_pypi_json_metadata(api_url, name, release_version)
+            elif api_type == 'simple_json':
+                metadata = self._fetch_simple_json_metadata(api_url, name, release_version)
+            else:
+                # the html simple api and local indexes don't expose metadata without downloading distributions
+                return None
+        except (RequestException, ValueError, KeyError):
+            return None
+
+        if metadata is not None and detector.cache:
+            detector.cache.store(cache_key, name, json.dumps(metadata).encode('utf-8'), {})
+        return metadata
+
+    def _fetch_pypi_json_metadata(self, api_url, name, release_version):
+        """ pypi json api: /pypi/<name>/<version>/json """
+        release = pypi_json_release(self.status_detector, api_url, name, release_version)
+        if release is None:
+            return None
+        info = release['info']
+        return {'requires_dist': info.get('requires_dist') or [], 'requires_python': info.get('requires_python')}
+
+    def _fetch_simple_json_metadata(self, api_url, name, release_version):
+        """ PEP 691 project page, and the PEP 658 core metadata file of a wheel of the release """
+        files = simple_json_release_files(self.status_detector, api_url, name, release_version)
+        if not files:
+            return None
+
+        metadata = {'requires_dist': None, 'requires_python': files[0].get('requires-python')}
+        for file_info in files:
+            # dist-info-metadata: the key used before PEP 714, still the only one served by some indexes
+            if file_info.get('core-metadata') or file_info.get('dist-info-metadata'):
+                metadata_response = self.status_detector.session.get(file_info['url'] + '.metadata',
+                                                                     timeout=self.status_detector.timeout)
+                if not metadata_response.ok:  # pragma: nocover
+                    continue
+                headers = HeaderParser().parsestr(metadata_response.content.decode('utf-8'))
+                metadata['requires_dist'] = headers.get_all('Requires-Dist') or []
+                metadata['requires_python'] = headers.get('Requires-Python') or metadata['requires_python']
+                break
+        return metadata
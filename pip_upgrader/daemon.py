@@ -0,0 +1,226 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from packaging import version
+from packaging.utils import canonicalize_name
+
+from pip_upgrader.index_cache import IndexCache, user_cache_dir
+from pip_upgrader.local_index import LocalIndex
+from pip_upgrader.package_index import PackageIndex
+from pip_upgrader.packages_status_detector import PackagesStatusDetector
+from pip_upgrader.version_selector import select_latest_version
+
+DAEMON_PROTOCOL_VERSION = 1
+CONNECT_TIMEOUT = 0.2
+# a daemon which doesn't answer a ping within this delay is considered stopped
+PING_TIMEOUT = 1.0
+
+
+def default_socket_path():
+    """ The daemon socket, in the user cache directory (can be overridden with PIP_UPGRADER_SOCKET). """
+    return os.environ.get('PIP_UPGRADER_SOCKET') or os.path.join(user_cache_dir(), 'daemon.sock')
+
+
+class DaemonError(Exception):
+    pass
+
+
+class DaemonClient(object):
+    """ Queries a running daemon. Each request uses its own connection, so the client is thread safe. """
+
+    socket_path = None
+
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or default_socket_path()
+
+    def _request(self, request, timeout=None):
+        if not hasattr(socket, 'AF_UNIX'):  # pragma: nocover
+            raise DaemonError('unix sockets are not supported on this platform')
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(CONNECT_TIMEOUT)
+                sock.connect(self.socket_path)
+                sock.settimeout(timeout)
+                sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+                with sock.makefile('rb') as fh:
+                    line = fh.readline()
+        except OSError as e:
+            raise DaemonError(str(e))
+        if not line:
+            raise DaemonError('connection closed by the daemon')
+        return json.loads(line.decode('utf-8'))
+
+    def is_running(self):
+        if not os.path.exists(self.socket_path):
+            return False
+        try:
+            return self._request({'op': 'ping'}, timeout=PING_TIMEOUT).get('protocol') == DAEMON_PROTOCOL_VERSION
+        except (DaemonError, ValueError):
+            return False
+
+    def package_status(self, indexes, package_name, current_version, prerelease, timeout=None):
+        """ Returns (package status, reason, fetch info), like PackagesStatusDetector._fetch_index_package_info
+
+        :param indexes: [(api url, api type)] of the indexes to query, the primary one first
+        :type current_version: version.Version
+        """
+        response = self._request({
+            'op': 'status', 'indexes': indexes, 'name': package_name,
+            'current_version': str(current_version), 'prerelease': prerelease,
+        }, timeout=timeout)
+        if 'error' in response:
+            raise DaemonError(response['error'])
+        if not response['status']:
+            return False, response['reason'], response['fetch']
+
+        latest_version = version.parse(response['status']['latest_version'])
+        return {
+            'name': package_name,
+            'current_version': current_version,
+            'latest_version': latest_version,
+            'upgrade_available': current_version < latest_version,
+            'upload_time': response['status']['upload_time'],
+        }, response['reason'], response['fetch']
+
+
+def _package_index(api_url, api_type):
+    return PackageIndex(api_url, api_type, LocalIndex(api_url) if api_type == 'local_files' else None)
+
+
+class WarmStatusDetector(PackagesStatusDetector):
+    """ A status detector living as long as the daemon: its HTTP pool, disk cache and version parsing caches stay
+    warm, and the releases of each package are also kept in memory, for the cache ttl. """
+
+    def __init__(self, indexes, options):
+        """
+        :param indexes: [(api url, api type)], the primary index first
+        """
+        # the daemon is the one answering: it must not be a client of its own socket
+        super(WarmStatusDetector, self).__init__([], dict(options, **{'--use-default-index': True,
+                                                                      '--no-daemon': True}))
+        self.indexes = [_package_index(api_url, api_type) for api_url, api_type in indexes]
+        self.PYPI_API_URL, self.PYPI_API_TYPE = indexes[0]
+        self.local_index = self.indexes[0].local_index
+        self.extra_indexes = self.indexes[1:]
+        if len(self.indexes) > 1:
+            self._index_executor = ThreadPoolExecutor(max_workers=self.jobs * len(self.indexes))
+
+        self.memory_ttl = self.cache.ttl if self.cache else IndexCache.DEFAULT_TTL
+        self._memory = {}
+        self._memory_lock = threading.Lock()
+
+    def status(self, package_name, current_version, prerelease):
+        """ Like _fetch_index_package_info, without any per-run state, as requests are served concurrently """
+        fetch_info = {'source': 'memory', 'latency': 0.0, 'bytes': 0}
+        releases, reason, _ = self._fetch_releases_from_indexes(package_name, fetch_info)
+        if releases is None:
+            return None, reason, fetch_info
+
+        include_prereleases = prerelease or current_version.is_postrelease or current_version.is_prerelease
+        latest_version, latest_version_string = select_latest_version(releases.keys(), current_version,
+                                                                      include_prereleases)
+        if not latest_version:  # pragma: nocover
+            return None, 'error while parsing version', fetch_info
+        return {'latest_version': latest_version_string,
+                'upload_time': releases[latest_version_string] or '-'}, 'success', fetch_info
+
+    def _fetch_index_releases(self, package_name, fetch_info=None, index=None):
+        index = index or self.indexes[0]
+        key = (index.api_url, canonicalize_name(package_name))
+        with self._memory_lock:
+            memorized = self._memory.get(key)
+        if memorized and time.time() - memorized[0] < self.memory_ttl:
+            if fetch_info is not None:
+                fetch_info['source'] = 'memory'
+            return memorized[1], 'success'
+
+        releases, reason = super(WarmStatusDetector, self)._fetch_index_releases(package_name, fetch_info, index)
+        if releases is not None:
+            with self._memory_lock:
+                self._memory[key] = (time.time(), releases)
+        return releases, reason
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            response = self.server.status_daemon.handle_request(json.loads(line.decode('utf-8')))
+        except Exception as e:  # noqa  # pragma: nocover
+            response = {'error': '{}: {}'.format(type(e).__name__, e)}
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+class StatusDaemon(object):
+    """ Serves package status queries over a local unix socket, with a warm detector per set of indexes. """
+
+    socket_path = None
+
+    def __init__(self, options, socket_path=None):
+        self.options = options
+        self.socket_path = socket_path or default_socket_path()
+        self._detectors = {}
+        self._lock = threading.Lock()
+        self.server = None
+
+    def _detector(self, indexes):
+        key = tuple(tuple(index) for index in indexes)
+        with self._lock:
+            if key not in self._detectors:
+                self._detectors[key] = WarmStatusDetector(indexes, self.options)
+            return self._detectors[key]
+
+    def handle_request(self, request):
+        if request.get('op') == 'ping':
+            return {'protocol': DAEMON_PROTOCOL_VERSION, 'pid': os.getpid()}
+
+        if request.get('op') == 'status':
+            status, reason, fetch_info = self._detector(request['indexes']).status(
+                request['name'], version.parse(request['current_version']), request.get('prerelease', False))
+            return {'status': status, 'reason': reason, 'fetch': fetch_info}
+
+        return {'error': 'unknown op: {}'.format(request.get('op'))}
+
+    def bind(self):
+        """ Creates the socket (replacing a stale one), readable by the current user only """
+        if DaemonClient(self.socket_path).is_running():
+            raise DaemonError('a daemon is already running on {}'.format(self.socket_path))
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        if not os.path.isdir(os.path.dirname(self.socket_path)):
+            os.makedirs(os.path.dirname(self.socket_path))
+
+        previous_umask = os.umask(0o077)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, DaemonRequestHandler)
+        finally:
+            os.umask(previous_umask)
+        self.server.daemon_threads = True
+        self.server.status_daemon = self
+
+    def serve_forever(self):
+        if not self.server:
+            self.bind()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+
+    def shutdown(self):
+        """ Stops serve_forever, from another thread """
+        self.server.shutdown()
+
+    def close(self):
+        if self.server:
+            self.server.server_close()
+            self.server = None
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
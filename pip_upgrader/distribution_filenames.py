@@ -0,0 +1,74 @@
+from packaging.utils import canonicalize_name
+
+SDIST_EXTENSIONS = ('.tar.gz', '.tar.bz2', '.tar.xz', '.tgz', '.tar', '.zip')
+
+
+def _is_same_name(name, canonical_name):
+    # cheap equivalent of canonicalize_name(name) == canonical_name, this runs for every file of every index page
+    simple_name = name.lower().replace('_', '-').replace('.', '-')
+    if simple_name == canonical_name:
+        return True
+    return '--' in simple_name and canonicalize_name(name) == canonical_name
+
+
+def _split_filename(filename):
+    """ Returns (name part, version part) for wheels, or (stem, None) for sdists and eggs, or None. """
+    lower_filename = filename.lower()
+
+    if lower_filename.endswith('.whl'):
+        # {name}-{version}(-{build})?-{python}-{abi}-{platform}.whl, the name has no dashes
+        parts = filename[:-4].split('-')
+        if len(parts) not in (5, 6):
+            return None
+        return parts[0], parts[1]
+
+    if lower_filename.endswith('.egg'):
+        # {name}-{version}-py{x.y}(-{platform})?.egg
+        return filename[:-4].split('-py')[0], None
+
+    for extension in SDIST_EXTENSIONS:
+        if lower_filename.endswith(extension):
+            return filename[:-len(extension)], None
+    return None
+
+
+def parse_filename_version(filename, canonical_name):
+    """ Returns the version string from a sdist, wheel or egg filename of the `canonical_name` project,
+    or None if the file is not a distribution of that project. """
+    split_filename = _split_filename(filename)
+    if not split_filename:
+        return None
+
+    stem, wheel_version = split_filename
+    if wheel_version is not None:
+        return wheel_version if _is_same_name(stem, canonical_name) else None
+
+    # sdist names may contain dashes (legacy ones are not normalized), so try every split point
+    # which is followed by a version-like part ("django" must not match "django-rest-auth-0.9.1")
+    position = stem.find('-')
+    while position != -1:
+        version_string = stem[position + 1:]
+        if version_string[:1].isdigit() and _is_same_name(stem[:position], canonical_name):
+            return version_string
+        position = stem.find('-', position + 1)
+    return None
+
+
+def parse_filename(filename):
+    """ Returns (canonical name, version string) of a sdist, wheel or egg filename, or None.
+
+    Without a known project name, sdist names are split before the first dash followed by a digit. """
+    split_filename = _split_filename(filename)
+    if not split_filename:
+        return None
+
+    stem, wheel_version = split_filename
+    if wheel_version is not None:
+        return canonicalize_name(stem), wheel_version
+
+    position = stem.find('-')
+    while position != -1:
+        if stem[position + 1:position + 2].isdigit():
+            return canonicalize_name(stem[:position]), stem[position + 1:]
+        position = stem.find('-', position + 1)
+    return None
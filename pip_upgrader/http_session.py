@@ -0,0 +1,42 @@
+import random
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+class JitterRetry(Retry):
+    """ urllib3 Retry with full jitter on the exponential backoff, so parallel workers don't retry in lockstep.
+    Retry-After headers (429 / 503) still take priority over the computed backoff. """
+
+    def get_backoff_time(self):
+        backoff = super(JitterRetry, self).get_backoff_time()
+        return random.uniform(backoff / 2, backoff) if backoff else 0
+
+
+def create_session(pool_size=10, retries=3, backoff_factor=0.5):
+    """ Returns a requests session with keep-alive connection pooling and retries, shared by all index lookups.
+
+    :param pool_size: max number of kept-alive connections per host (usually the number of concurrent jobs)
+    :param retries: how many times a failed request (5xx, 429, connection reset, read timeout) is retried
+    :param backoff_factor: base of the exponential backoff between retries, in seconds
+    """
+    retry = JitterRetry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    # pool_block makes extra threads wait for a free connection, instead of opening throwaway ones
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
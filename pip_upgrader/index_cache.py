@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+from packaging.utils import canonicalize_name
+
+
+def user_cache_dir():
+    """ Returns the per-user cache directory of pip-upgrader (can be overridden with PIP_UPGRADER_CACHE_DIR). """
+    if os.environ.get('PIP_UPGRADER_CACHE_DIR'):
+        return os.environ['PIP_UPGRADER_CACHE_DIR']
+
+    if sys.platform == 'win32':  # pragma: nocover
+        base_dir = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+    elif sys.platform == 'darwin':  # pragma: nocover
+        base_dir = os.path.expanduser('~/Library/Caches')
+    else:
+        base_dir = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+
+    return os.path.join(base_dir, 'pip-upgrader')
+
+
+class IndexCache(object):
+    """ Persistent on-disk cache of index responses, keyed by index url and canonical package name.
+
+    Every entry is one file: a json header line (validators, content type, fetch time), followed by the raw body.
+    Entries younger than `ttl` are used as they are, older ones are revalidated with If-None-Match / If-Modified-Since.
+    With --sync, entries also record the index serial at which they were last known valid (see IndexSync).
+    """
+
+    cache_dir = None
+    ttl = 3600
+    max_size = 50 * 1024 * 1024
+    refresh = False
+
+    DEFAULT_TTL = 3600
+    ENTRY_DIR_RE = re.compile(r'^[0-9a-f]{2}$')
+
+    def __init__(self, cache_dir=None, ttl=None, max_size=None, refresh=False):
+        self.cache_dir = cache_dir or user_cache_dir()
+        self.ttl = self.DEFAULT_TTL if ttl is None else int(ttl)
+        if max_size is not None:
+            self.max_size = max_size
+        self.refresh = refresh
+
+    def _entry_path(self, index_url, package_name):
+        key = '{}\n{}'.format(index_url, canonicalize_name(package_name))
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest)
+
+    def get(self, index_url, package_name):
+        """ Returns the cached entry (dict with a `content` key holding the raw body), or None. """
+        if self.refresh:
+            return None
+
+        path = self._entry_path(index_url, package_name)
+        try:
+            with open(path, 'rb') as fh:
+                entry = json.loads(fh.readline().decode('utf-8'))
+                entry['content'] = fh.read()
+        except (IOError, OSError, ValueError):
+            return None
+
+        try:
+            os.utime(path, None)  # keeps recently used entries away from eviction
+        except OSError:  # pragma: nocover
+            pass
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get('fetched_at', 0) < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, index_url, package_name, content, headers, serial=None):
+        """ Saves a fresh (200) response. `headers` is the response headers mapping.
+
+        :param serial: serial of the index when the request was sent (only when syncing)
+        """
+        last_serial = headers.get('X-PyPI-Last-Serial')
+        entry = {
+            'index_url': index_url,
+            'package': canonicalize_name(package_name),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'content_type': headers.get('Content-Type'),
+            'last_serial': int(last_serial) if last_serial and last_serial.isdigit() else None,
+            'serial': serial,
+            'fetched_at': time.time(),
+        }
+        self._write(index_url, package_name, entry, content)
+        entry['content'] = content
+        return entry
+
+    def revalidated(self, index_url, package_name, entry, serial=None):
+        """ Marks an entry as fresh again, after a 304 Not Modified response. """
+        entry = dict(entry)
+        content = entry.pop('content')
+        entry['fetched_at'] = time.time()
+        if serial is not None:
+            entry['serial'] = serial
+        self._write(index_url, package_name, entry, content)
+        entry['content'] = content
+        return entry
+
+    def synced(self, index_url, package_name, entry, serial):
+        """ Records that an entry is still valid at this serial of the index (it's not in the changelog). """
+        if entry.get('serial') == serial:
+            return entry
+        entry = dict(entry)
+        content = entry.pop('content')
+        entry['serial'] = serial
+        self._write(index_url, package_name, entry, content)
+        entry['content'] = content
+        return entry
+
+    def _write(self, index_url, package_name, entry, content):
+        path = self._entry_path(index_url, package_name)
+        directory = os.path.dirname(path)
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+        except OSError:  # pragma: nocover
+            # created meanwhile by another thread
+            pass
+
+        # write to a temp file, then rename, so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(json.dumps(entry).encode('utf-8'))
+                fh.write(b'\n')
+                fh.write(content)
+            os.replace(tmp_path, path)
+        except Exception:  # pragma: nocover
+            os.remove(tmp_path)
+            raise
+
+    def prune(self):
+        """ Evicts the least recently used entries, until the cache fits in `max_size` bytes. """
+        entries = []
+        total_size = 0
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:  # pragma: nocover
+            names = []
+        # entries live in the two hex digits subdirectories: the sync state, the daemon socket and the wheelhouse
+        # (which can hold wheels much larger than the whole index cache) are left alone
+        entry_dirs = [os.path.join(self.cache_dir, name) for name in names if self.ENTRY_DIR_RE.match(name)]
+        for entry_dir in filter(os.path.isdir, entry_dirs):
+            for filename in os.listdir(entry_dir):
+                path = os.path.join(entry_dir, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:  # pragma: nocover
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:  # pragma: nocover
+                continue
+            total_size -= size
@@ -0,0 +1,56 @@
+import gzip
+import json
+import threading
+import time
+
+from packaging.utils import canonicalize_name
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+class IndexSnapshot(object):
+    """ All the index answers of a run (releases and upload times of each package, and the index which served them),
+    in a single compact json file (gzipped when the filename ends with .gz).
+
+    Written with --snapshot-out, replayed with --offline, without any network access.
+    """
+
+    packages = None
+
+    def __init__(self, packages=None):
+        self.packages = packages or {}
+        self._lock = threading.Lock()
+
+    def add(self, package_name, index_url, releases):
+        """
+        :param releases: map of version string -> upload time (or None when the index doesn't tell)
+        """
+        with self._lock:
+            self.packages[canonicalize_name(package_name)] = {'index': index_url, 'releases': releases}
+
+    def get(self, package_name):
+        """ Returns (index url, releases), or (None, None) if the package was not recorded """
+        entry = self.packages.get(canonicalize_name(package_name))
+        if not entry:
+            return None, None
+        return entry['index'], entry['releases']
+
+    @staticmethod
+    def _open(filename, mode):
+        if filename.endswith('.gz'):
+            return gzip.open(filename, mode + 't', encoding='utf-8')
+        return open(filename, mode, encoding='utf-8')
+
+    def save(self, filename):
+        with self._lock:
+            data = {'format': SNAPSHOT_FORMAT_VERSION, 'created_at': time.time(), 'packages': self.packages}
+            with self._open(filename, 'w') as fh:
+                json.dump(data, fh, separators=(',', ':'), sort_keys=True)
+
+    @classmethod
+    def load(cls, filename):
+        with cls._open(filename, 'r') as fh:
+            data = json.load(fh)
+        if data.get('format') != SNAPSHOT_FORMAT_VERSION:  # pragma: nocover
+            raise ValueError('Unsupported index snapshot format: {}'.format(data.get('format')))
+        return cls(data['packages'])
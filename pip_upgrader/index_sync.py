@@ -0,0 +1,128 @@
+import json
+import os
+import tempfile
+import threading
+import xmlrpc.client
+from urllib.parse import urlsplit
+
+from packaging.utils import canonicalize_name
+from requests import RequestException
+
+SERIALS_FILENAME = 'serials.json'
+PYPI_HOSTS = ('pypi.org', 'pypi.python.org')
+
+
+def index_changelog_url(api_url):
+    """ The XML-RPC endpoint serving the changelog of an index: PyPI's, or the /pypi endpoint of the same host
+    (warehouse compatible mirrors). """
+    parts = urlsplit(api_url)
+    if parts.hostname in PYPI_HOSTS:
+        return 'https://pypi.org/pypi'
+    return '{}://{}/pypi'.format(parts.scheme, parts.netloc)
+
+
+class ChangelogError(Exception):
+    pass
+
+
+class IndexSync(object):
+    """ Incremental validation of the cached answers of one index, from its changelog.
+
+    The serial of the index at the start of each run is saved in the cache directory. The next run asks only for the
+    projects changed since that serial (changelog_since_serial), and trusts the cached answers of all the other
+    projects without any request. Cached answers carry the serial at which they were last known valid, and the
+    project's own X-PyPI-Last-Serial header, so an answer fetched after a change isn't fetched again.
+    """
+
+    api_url = None
+    changelog_url = None
+    cache_dir = None
+    base_serial = None
+    serial = None
+    changes = None
+
+    # warehouse caps each changelog_since_serial answer: a full page means there are more events
+    CHANGELOG_PAGE_SIZE = 50000
+    # further behind than this, revalidating the cached answers is cheaper than reading the changelog
+    MAX_CHANGELOG_PAGES = 10
+
+    def __init__(self, api_url, cache_dir, changelog_url=None):
+        self.api_url = api_url
+        self.cache_dir = cache_dir
+        self.changelog_url = changelog_url or index_changelog_url(api_url)
+        self.changes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def state_path(self):
+        return os.path.join(self.cache_dir, SERIALS_FILENAME)
+
+    def _load_serials(self):
+        try:
+            with open(self.state_path) as fh:
+                return json.load(fh)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _call(self, session, method, params, timeout):
+        try:
+            response = session.post(self.changelog_url, data=xmlrpc.client.dumps(params, method),
+                                    headers={'Content-Type': 'text/xml'}, timeout=timeout)
+        except RequestException as e:
+            raise ChangelogError(str(e))
+        if not response.ok:
+            raise ChangelogError('{} {}'.format(response.status_code, response.reason))
+        try:
+            return xmlrpc.client.loads(response.content)[0][0]
+        except (xmlrpc.client.Fault, ValueError, IndexError) as e:
+            raise ChangelogError(str(e))
+
+    def start(self, session, timeout=None):
+        """ Reads the current serial of the index, and the projects changed since the saved one (one request per
+        page of changes, or a single one on the first run). Raises ChangelogError if the index has no changelog. """
+        self.base_serial = self._load_serials().get(self.api_url)
+        if self.base_serial is None:
+            self.serial = int(self._call(session, 'changelog_last_serial', (), timeout))
+            return
+
+        self.serial = self.base_serial
+        for _ in range(self.MAX_CHANGELOG_PAGES):
+            events = self._call(session, 'changelog_since_serial', (self.serial,), timeout)
+            for event in events:
+                # [name, version, timestamp, action, serial]
+                name, event_serial = canonicalize_name(event[0]), int(event[4])
+                self.changes[name] = max(self.changes.get(name, 0), event_serial)
+                self.serial = max(self.serial, event_serial)
+            if len(events) < self.CHANGELOG_PAGE_SIZE:
+                return
+
+        # too far behind: this run revalidates as usual, the next one syncs from the current serial
+        self.base_serial = None
+        self.changes = {}
+        self.serial = int(self._call(session, 'changelog_last_serial', (), timeout))
+
+    def is_unchanged(self, package_name, entry):
+        """ Whether a cached entry is still valid at the current serial, without asking the index """
+        if self.base_serial is None or (entry.get('serial') or -1) < self.base_serial:
+            # not validated since the last sync: the changelog doesn't cover it
+            return False
+
+        changed_at = self.changes.get(canonicalize_name(package_name))
+        return changed_at is None or (entry.get('last_serial') or -1) >= changed_at
+
+    def is_changed(self, package_name, entry):
+        """ Whether a cached entry is known to be outdated (then it's fetched again, without revalidation) """
+        return self.base_serial is not None and not self.is_unchanged(package_name, entry) and \
+            canonicalize_name(package_name) in self.changes
+
+    def save(self):
+        """ Saves the serial read at the start of this run, as the base of the next one """
+        with self._lock:
+            serials = self._load_serials()
+            serials[self.api_url] = self.serial
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(serials, fh, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.state_path)
@@ -0,0 +1,167 @@
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from colorclass import Color
+from packaging import version
+from packaging.utils import canonicalize_name
+from terminaltables import AsciiTable
+
+DEFAULT_SCAN_JOBS = 16
+
+
+def site_packages_dirs(path):
+    """ The site-packages directories of an environment, in import order.
+
+    :param path: a virtualenv / prefix directory, a python executable inside it, or a site-packages directory
+    """
+    if os.path.isfile(path):
+        # <prefix>/bin/python or <prefix>\Scripts\python.exe
+        path = os.path.dirname(os.path.dirname(os.path.abspath(path)))
+
+    if os.path.basename(path.rstrip(os.sep)) in ('site-packages', 'dist-packages'):
+        return [path]
+
+    directories = []
+    for lib_dir in (os.path.join(path, 'lib'), os.path.join(path, 'lib64')):
+        try:
+            entries = sorted(entry.name for entry in os.scandir(lib_dir) if entry.name.startswith('python'))
+        except OSError:
+            continue
+        for name in entries:
+            for packages_dir in ('site-packages', 'dist-packages'):
+                directory = os.path.join(lib_dir, name, packages_dir)
+                # lib64 is often a symlink to lib
+                if os.path.isdir(directory) and \
+                        os.path.realpath(directory) not in [os.path.realpath(known) for known in directories]:
+                    directories.append(directory)
+
+    windows_dir = os.path.join(path, 'Lib', 'site-packages')
+    if not directories and os.path.isdir(windows_dir):  # pragma: nocover
+        directories.append(windows_dir)
+    return directories
+
+
+def _metadata_name_version(path):
+    """ Name and Version of a distribution, from its metadata (importlib.metadata, or the PKG-INFO file of an egg) """
+    if os.path.isfile(path):
+        # a single-file .egg-info: the PKG-INFO headers themselves
+        headers = {}
+        with open(path, encoding='utf-8', errors='replace') as fh:
+            for line in fh:
+                if not line.strip():
+                    break
+                key, _, value = line.partition(':')
+                headers.setdefault(key.strip(), value.strip())
+        return headers.get('Name'), headers.get('Version')
+
+    from importlib.metadata import PathDistribution
+    from pathlib import Path
+    metadata = PathDistribution(Path(path)).metadata
+    return metadata['Name'], metadata['Version']
+
+
+def scan_site_packages(directory):
+    """ Returns {canonical name: installed version} of a site-packages directory.
+
+    The name and version of a wheel install are read from its `<name>-<version>.dist-info` directory name, which
+    the wheel spec keeps unambiguous, so no file is opened. Egg installs, and dist-info directories with a legacy
+    name, are read with importlib.metadata.
+    """
+    installed = {}
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return installed
+
+    for entry in entries:
+        name = installed_version = None
+        if entry.name.endswith('.dist-info'):
+            name, _, installed_version = entry.name[:-len('.dist-info')].rpartition('-')
+            if not name or not installed_version or '-' in name:
+                name = installed_version = None
+        elif not entry.name.endswith('.egg-info'):
+            continue
+
+        if not name:
+            try:
+                name, installed_version = _metadata_name_version(entry.path)
+            except (OSError, ValueError, KeyError):  # pragma: nocover
+                continue
+            if not name or not installed_version:  # pragma: nocover
+                continue
+
+        # the first install wins, like on import
+        installed.setdefault(canonicalize_name(name), installed_version)
+    return installed
+
+
+def scan_environment(path=None):
+    """ Returns {canonical name: installed version} of an environment (default: the running interpreter's) """
+    if path is None:
+        directories = [directory for directory in sys.path if directory and os.path.isdir(directory)]
+    else:
+        directories = site_packages_dirs(path)
+
+    installed = {}
+    for directory in directories:
+        for name, installed_version in scan_site_packages(directory).items():
+            installed.setdefault(name, installed_version)
+    return installed
+
+
+def scan_environments(paths, jobs=DEFAULT_SCAN_JOBS):
+    """ Scans several environments concurrently. Returns an OrderedDict {path: {canonical name: version}} """
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(paths)))) as executor:
+        return OrderedDict(zip(paths, executor.map(scan_environment, paths)))
+
+
+def installed_versions(installed, canonical_name):
+    """ {environment path: installed version (None if missing)} of a package """
+    return OrderedDict((path, versions.get(canonical_name)) for path, versions in installed.items())
+
+
+def _is_pinned_version(installed_version, pinned_version):
+    try:
+        return version.parse(installed_version) == pinned_version
+    except version.InvalidVersion:  # pragma: nocover
+        return installed_version == str(pinned_version)
+
+
+def _installed_cell(pinned_version, versions):
+    """ The installed version(s), in red when they drift from the pin. Several environments are grouped by version """
+    counts = OrderedDict()
+    for installed_version in versions.values():
+        counts[installed_version] = counts.get(installed_version, 0) + 1
+
+    cells = []
+    for installed_version, count in counts.items():
+        text = installed_version or 'missing'
+        if len(versions) > 1:
+            text = '{} ({} envs)'.format(text, count) if count > 1 else '{} (1 env)'.format(text)
+        pinned = installed_version and _is_pinned_version(installed_version, pinned_version)
+        color = 'autogreen' if pinned else 'autored'
+        cells.append(Color('{{{0}}}{1}{{/{0}}}'.format(color, text)))
+    return ', '.join(cells)
+
+
+def print_installed_report(packages_status_map, installed):
+    """ Prints pinned, installed and latest versions side by side """
+    data = [[
+        Color('{autoblue}Package{/autoblue}'),
+        Color('{autoblue}Pinned{/autoblue}'),
+        Color('{autoblue}Installed{/autoblue}'),
+        Color('{autoblue}Latest{/autoblue}'),
+    ]]
+    for package_status in packages_status_map.values():
+        versions = package_status.get('installed') or \
+            installed_versions(installed, canonicalize_name(package_status['name']))
+        data.append([package_status['name'], package_status['current_version'],
+                     _installed_cell(package_status['current_version'], versions), package_status['latest_version']])
+
+    print('')
+    print(Color('{{autogreen}}Installed versions ({} environment{}):{{/autogreen}}'.format(
+        len(installed), '' if len(installed) == 1 else 's')))
+    print(AsciiTable(data).table)
@@ -0,0 +1,124 @@
+import os
+import shlex
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+INSTALLERS = ('pip', 'python', 'pip-batch', 'command')
+
+
+def default_python():
+    """ The interpreter of the active virtualenv (pip-upgrader may be installed outside of it), else the running one """
+    if os.environ.get('VIRTUAL_ENV'):
+        for relative_path in (('bin', 'python'), ('Scripts', 'python.exe')):
+            python = os.path.join(os.environ['VIRTUAL_ENV'], *relative_path)
+            if os.path.isfile(python):
+                return python
+    return sys.executable
+
+
+class Installer(object):
+    """ An installer backend: installs pinned packages with a single command, and records how long it took.
+
+    Subclasses build the command line. `batched` backends get all the selected packages in one call.
+    """
+
+    name = None
+    batched = False
+    durations = None
+    timings = None
+    # target interpreter, None when it's unknown (the first pip on PATH)
+    python = None
+
+    def __init__(self, timings=None):
+        """
+        :type timings: pip_upgrader.timings.Timings
+        """
+        self.durations = OrderedDict()
+        self.timings = timings
+
+    def command(self, pinned, install_options):
+        """
+        :param pinned: ['name==version', ...]
+        :param install_options: installer options, like ['--no-index', '--find-links', '<dir>']
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    def install(self, packages, install_options=()):
+        """ Installs the latest version of the packages. Raises CalledProcessError on failure. """
+        pinned = ['{}=={}'.format(package['name'], package['latest_version']) for package in packages]
+        started = time.perf_counter()
+        try:
+            subprocess.check_call(self.command(pinned, list(install_options)))
+        finally:
+            # a batch is a single command: its packages share the duration
+            duration = (time.perf_counter() - started) / len(packages)
+            for package in packages:
+                self.durations[package['name']] = duration
+                if self.timings:
+                    self.timings.install(package['name'], self.name, duration, len(packages))
+
+
+class PipInstaller(Installer):
+    """ `pip install`, with the first pip on PATH """
+
+    name = 'pip'
+
+    def command(self, pinned, install_options):
+        return ['pip', 'install'] + install_options + pinned
+
+
+class PythonPipInstaller(Installer):
+    """ `python -m pip install`, with a chosen interpreter, so packages land in its environment """
+
+    name = 'python'
+
+    def __init__(self, python=None, timings=None):
+        super(PythonPipInstaller, self).__init__(timings=timings)
+        self.python = python or default_python()
+
+    def command(self, pinned, install_options):
+        return [self.python, '-m', 'pip', 'install'] + install_options + pinned
+
+
+class BatchedPipInstaller(PythonPipInstaller):
+    """ `python -m pip install` of all the selected packages at once (one resolution, parallel-friendly downloads).
+    Failed batches are bisected by PackagesUpgrader. """
+
+    name = 'pip-batch'
+    batched = True
+
+
+class CommandInstaller(Installer):
+    """ An external installer command (like `uv pip install --python {python}`), followed by the options and pins.
+    `{python}` is replaced by the target interpreter. """
+
+    name = 'command'
+    command_line = None
+
+    def __init__(self, command_line, python=None, timings=None):
+        super(CommandInstaller, self).__init__(timings=timings)
+        self.command_line = command_line
+        self.python = python or default_python()
+
+    def command(self, pinned, install_options):
+        return [argument.replace('{python}', self.python) for argument in shlex.split(self.command_line)] + \
+            install_options + pinned
+
+
+def create_installer(options, timings=None):
+    """ The installer backend chosen by --installer (pip by default, or command with --installer-command) """
+    name = options.get('--installer') or ('command' if options.get('--installer-command') else 'pip')
+    if name not in INSTALLERS:
+        raise ValueError('Unknown installer "{}", use one of: {}'.format(name, ', '.join(INSTALLERS)))
+
+    if name == 'pip':
+        return PipInstaller(timings=timings)
+    if name == 'python':
+        return PythonPipInstaller(python=options.get('--python'), timings=timings)
+    if name == 'pip-batch':
+        return BatchedPipInstaller(python=options.get('--python'), timings=timings)
+    if not options.get('--installer-command'):
+        raise ValueError('The command installer needs --installer-command')
+    return CommandInstaller(options['--installer-command'], python=options.get('--python'), timings=timings)
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+from packaging.utils import canonicalize_name
+
+from pip_upgrader.distribution_filenames import parse_filename, parse_filename_version
+from pip_upgrader.simple_html_parser import iter_anchor_files
+
+
+def local_index_path(index_url):
+    """ Returns the directory of a file:// index url, or of a local path, or None for remote indexes. """
+    if index_url.startswith('file:'):
+        return url2pathname(urlparse(index_url).path)
+    if '://' not in index_url and os.path.isdir(index_url):
+        return index_url
+    return None
+
+
+class LocalIndex(object):
+    """ Index backend for local directories: a PEP 503 tree (one directory per project, with distribution files
+    or an index.html) or a flat wheelhouse.
+
+    The whole directory is scanned once (with os.scandir), on the first query, into a name -> releases index,
+    so each package query is a dict lookup. Files are only stat'ed (for their upload time) when their package is
+    queried.
+    """
+
+    path = None
+
+    def __init__(self, path):
+        self.path = path
+        self._releases = None
+        self._lock = threading.Lock()
+
+    def releases(self, package_name):
+        """ Returns the map of version string -> upload time (oldest file mtime) of the package. """
+        if self._releases is None:
+            with self._lock:
+                if self._releases is None:
+                    self._releases = self._scan()
+        return {version_string: self._upload_time(paths)
+                for version_string, paths in self._releases.get(canonicalize_name(package_name), {}).items()}
+
+    @staticmethod
+    def _upload_time(paths):
+        mtimes = []
+        for path in paths:
+            try:
+                mtimes.append(os.stat(path).st_mtime)
+            except OSError:  # pragma: nocover
+                continue
+        if not mtimes:
+            return None
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(min(mtimes)))
+
+    def _scan(self):
+        releases = defaultdict(dict)
+
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    self._scan_project_dir(entry, releases[canonicalize_name(entry.name)])
+                elif entry.is_file():
+                    name_version = parse_filename(entry.name)
+                    if name_version:
+                        releases[name_version[0]].setdefault(name_version[1], []).append(entry.path)
+
+        return releases
+
+    def _scan_project_dir(self, project_entry, project_releases):
+        canonical_name = canonicalize_name(project_entry.name)
+
+        with os.scandir(project_entry.path) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                if entry.name == 'index.html':
+                    # simple page pointing to files stored elsewhere
+                    with open(entry.path, encoding='utf-8') as fh:
+                        for filename, yanked in iter_anchor_files(fh.read()):
+                            version_string = parse_filename_version(filename, canonical_name)
+                            if version_string and not yanked:
+                                project_releases.setdefault(version_string, [])
+                    continue
+
+                version_string = parse_filename_version(entry.name, canonical_name)
+                if version_string:
+                    project_releases.setdefault(version_string, []).append(entry.path)
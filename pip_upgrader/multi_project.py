@@ -0,0 +1,78 @@
+from collections import OrderedDict
+
+from colorclass import Color
+
+from pip_upgrader.packages_interactive_selector import PackageInteractiveSelector
+from pip_upgrader.packages_upgrader import PackagesUpgrader
+from pip_upgrader.requirements_detector import RequirementsDetector
+from pip_upgrader.version_selector import parse_version
+
+
+class MultiProjectScanner(object):
+    """ Checks the requirements of several projects with a single index pass.
+
+    The requirements of all projects are detected (with RequirementsDetector, in each project root) and checked
+    together, so PackagesStatusDetector queries each distinct package once. Upgrades are then computed from
+    the pins of each project, and applied to its own requirements files.
+    """
+
+    projects = None
+
+    def __init__(self, project_roots, recursive=False, excludes=None):
+        self.projects = OrderedDict()
+        for root in project_roots:
+            self.projects[root] = RequirementsDetector(None, root=root, recursive=recursive,
+                                                       excludes=excludes).get_filenames()
+
+    def get_filenames(self):
+        """ Requirements files of all projects (each file once) """
+        filenames = []
+        for project_filenames in self.projects.values():
+            filenames.extend(filename for filename in project_filenames if filename not in filenames)
+        return filenames
+
+    def project_status_map(self, root, packages_status_map):
+        """ The packages status of a project, from the shared status map: `current_version`, `upgrade_available`
+        and `requirements` are those of the project pins (the shared entry holds the first pin found). """
+        filenames = set(self.projects[root])
+        status_map = OrderedDict()
+
+        for name, package_status in packages_status_map.items():
+            records = [record for record in package_status.get('requirements', []) if record.filename in filenames]
+            pinned_versions = [parse_version(record.pinned_version) for record in records]
+            pinned_versions = [pinned_version for pinned_version in pinned_versions if pinned_version]
+            if not pinned_versions:
+                continue
+
+            current_version = min(pinned_versions)
+            project_status = dict(package_status)
+            project_status.update({
+                'current_version': current_version,
+                'upgrade_available': current_version < package_status['latest_version'],
+                'requirements': records,
+            })
+            status_map[name] = project_status
+
+        return status_map
+
+    def upgrade(self, packages_status_map, options):
+        """ Selects and applies the upgrades of each project. Packages are not installed, as projects don't
+        share an environment: only requirements files are updated. Returns {project root: upgraded packages}. """
+        options = dict(options, **{'--skip-package-installation': True})
+        upgraded = OrderedDict()
+
+        for root, filenames in self.projects.items():
+            print(Color('\n{{autoblue}}Project {}{{/autoblue}}'.format(root)))
+            if not filenames:
+                print(Color('{autoyellow}No requirements files found.{/autoyellow}'))
+                continue
+
+            status_map = self.project_status_map(root, packages_status_map)
+            if not any(package['upgrade_available'] for package in status_map.values()):
+                print(Color('{autogreen}All packages are up-to-date.{/autogreen}'))
+                continue
+
+            selected_packages = PackageInteractiveSelector(status_map, options).get_packages()
+            upgraded[root] = PackagesUpgrader(selected_packages, filenames, options).do_upgrade()
+
+        return upgraded
@@ -0,0 +1,68 @@
+import threading
+from urllib.parse import urljoin
+
+from pip_upgrader.local_index import LocalIndex, local_index_path
+from pip_upgrader.timings import percentile
+
+
+def index_api(index_url):
+    """ Returns (api url, api type, LocalIndex or None) of an index url.
+
+    The api url is a template with a {package} placeholder, except for local directories (its path).
+    """
+    local_path = local_index_path(index_url)
+    if local_path:
+        # file:// index url, or a plain directory (PEP 503 tree or flat wheelhouse)
+        return local_path, 'local_files', LocalIndex(local_path)
+
+    if not index_url.endswith('/'):
+        index_url += '/'
+
+    if index_url.endswith('/simple/') or index_url.endswith('/+simple/'):
+        return urljoin(index_url, '{package}/'), 'simple_json', None
+
+    if '/pypi/' in index_url:
+        base_url = index_url.split('/pypi/')[0]
+        return urljoin(base_url, '/pypi/{package}/json'), 'pypi_json', None
+
+    return urljoin(index_url, '/pypi/{package}/json'), 'pypi_json', None
+
+
+class PackageIndex(object):
+    """ One of the indexes queried for each package, with the statistics of its answers. """
+
+    api_url = None
+    api_type = None
+    local_index = None
+    sync = None  # IndexSync, when the cached answers of this index are validated from its changelog
+
+    def __init__(self, api_url, api_type, local_index=None):
+        self.api_url = api_url
+        self.api_type = api_type
+        self.local_index = local_index
+        self.latencies = []
+        self.outcomes = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, index_url):
+        return cls(*index_api(index_url))
+
+    def record(self, fetch_info):
+        """
+        :param fetch_info: filled by PackagesStatusDetector._fetch_index_releases (source and request latency)
+        """
+        source = fetch_info.get('source', 'error')
+        with self._lock:
+            self.outcomes[source] = self.outcomes.get(source, 0) + 1
+            if source in ('network', 'revalidated', 'daemon', 'not_found', 'error'):
+                self.latencies.append(fetch_info.get('latency', 0.0))
+
+    def summary(self):
+        """ One line of statistics: answers by source, and latency of the requests """
+        latencies = sorted(self.latencies)
+        outcomes = ', '.join('{}: {}'.format(source, count) for source, count in sorted(self.outcomes.items()))
+        if not latencies:
+            return '{} ({})'.format(self.api_url, outcomes)
+        return '{} ({}), {} requests, latency p50 {:.3f}s, max {:.3f}s'.format(
+            self.api_url, outcomes, len(latencies), percentile(latencies, 50), latencies[-1])
@@ -1,10 +1,86 @@
+import re
+
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.specifiers import SpecifierSet
+from packaging.utils import canonicalize_name
+
+# operators which pin a version that can be upgraded in place, by priority
+PIN_OPERATORS = ('==', '>=')
+
+# -i url, --index-url url, --index-url=url, --extra-index-url url, --extra-index-url=url
+INDEX_OPTION_RE = re.compile(r'^(-i|--index-url|--extra-index-url)(?:\s*=\s*|\s+)(\S+)')
+
+
+class RequirementRecord(object):
+    """ A requirement line, parsed once, with the position of its pinned version in the file.
+
+    With a compound specifier (celery>=3.1.1,<4), the other clauses are kept in `constraints`: upgrades must
+    satisfy them too.
+    """
+
+    __slots__ = ('name', 'canonical_name', 'extras', 'specifier', 'marker',
+                 'filename', 'line_number', 'pin_operator', 'pinned_version', 'version_span', 'constraints')
+
+    def __init__(self, requirement, filename=None, line_number=None, raw_line=''):
+        """
+        :type requirement: packaging.requirements.Requirement
+        :param line_number: 1-based line number in `filename`
+        :param raw_line: the line, as found in the file (used for the column span of the pinned version)
+        """
+        self.name = requirement.name
+        self.canonical_name = canonicalize_name(requirement.name)
+        self.extras = frozenset(requirement.extras)
+        self.specifier = requirement.specifier
+        self.marker = requirement.marker
+        self.filename = filename
+        self.line_number = line_number
+        self.pin_operator = None
+        self.pinned_version = None
+        self.version_span = None
+        self.constraints = SpecifierSet()
+
+        for pin_operator in PIN_OPERATORS:
+            for spec in self.specifier:
+                if spec.operator == pin_operator:
+                    self.pin_operator = pin_operator
+                    self.pinned_version = spec.version
+                    self.version_span = self._find_version_span(raw_line, pin_operator, spec.version)
+                    self.constraints = SpecifierSet(','.join(str(other) for other in self.specifier if other != spec))
+                    return
+
+    @staticmethod
+    def _find_version_span(raw_line, pin_operator, pinned_version):
+        position = raw_line.find(pin_operator)
+        while position != -1:
+            start = position + len(pin_operator)
+            while raw_line[start:start + 1] in (' ', '\t'):
+                start += 1
+            if raw_line.startswith(pinned_version, start):
+                return start, start + len(pinned_version)
+            position = raw_line.find(pin_operator, position + 1)
+        return None
+
+    def __str__(self):
+        extras = '[{}]'.format(','.join(sorted(self.extras))) if self.extras else ''
+        marker = '; {}'.format(self.marker) if self.marker else ''
+        return '{}{}{}{}'.format(self.name, extras, self.specifier, marker)
+
+    def __repr__(self):
+        return '<RequirementRecord {} ({}:{})>'.format(self, self.filename, self.line_number)
+
+
 class PackagesDetector(object):
-    """ Takes list of requirements fies and returns the list of packages from all of them """
+    """ Takes list of requirements fies and returns the list of packages (RequirementRecord) from all of them.
+    Index urls set in the files (-i / --index-url, --extra-index-url) are collected too. """
 
     packages = []
+    index_urls = []
+    extra_index_urls = []
 
     def __init__(self, requirements_files):
         self.packages = []
+        self.index_urls = []
+        self.extra_index_urls = []
         self.detect_packages(requirements_files)
 
     def get_packages(self):
@@ -13,10 +89,11 @@ class PackagesDetector(object):
     def detect_packages(self, requirements_files):
         for filename in requirements_files:
             with open(filename) as fh:
-                for line in fh:
-                    self._process_req_line(line)
+                for line_number, line in enumerate(fh, 1):
+                    self._process_req_line(line, filename, line_number)
 
-    def _process_req_line(self, line):
+    def _process_req_line(self, line, filename=None, line_number=None):
+        raw_line = line
 
         if not line or not line.strip():
             return
@@ -25,6 +102,13 @@ class PackagesDetector(object):
         if line.startswith('#'):
             return
 
+        index_option = INDEX_OPTION_RE.match(line)
+        if index_option:
+            urls = self.extra_index_urls if index_option.group(1) == '--extra-index-url' else self.index_urls
+            if index_option.group(2) not in urls:
+                urls.append(index_option.group(2))
+            return
+
         if line.startswith('-f') or line.startswith('--find-links') or \
                 line.startswith('-i') or line.startswith('--index-url') or \
                 line.startswith('--extra-index-url') or \
@@ -37,4 +121,10 @@ class PackagesDetector(object):
         if '#' in line:  # inline comment in file
             line = line.split('#')[0].strip()
 
-        self.packages.append(line)
+        try:
+            requirement = Requirement(line)
+        except InvalidRequirement:
+            # editables, urls, other pip options: nothing to upgrade
+            return
+
+        self.packages.append(RequirementRecord(requirement, filename, line_number, raw_line))
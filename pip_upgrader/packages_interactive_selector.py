@@ -35,6 +35,7 @@ class PackageInteractiveSelector(object):
 
         # choose which packages to upgrade (interactive or not)
         if '-p' in options and options['-p']:
+            self._exclude_conflicting_packages()
             if options['-p'] == ['all']:
                 self._select_packages(self.packages_for_upgrade.keys())
             else:
@@ -49,6 +50,14 @@ class PackageInteractiveSelector(object):
         else:
             self.ask_for_packages()
 
+    def _exclude_conflicting_packages(self):
+        """ Upgrades which failed the compatibility check are not chosen automatically """
+        for index, package in list(self.packages_for_upgrade.items()):
+            if package.get('conflicts'):
+                print(Color('{{autored}}Skipping {} {}: {}{{/autored}}'.format(
+                    package['name'], package['latest_version'], '; '.join(package['conflicts']))))
+                del self.packages_for_upgrade[index]
+
     def get_packages(self):
         return self.selected_packages
 
@@ -60,6 +69,10 @@ class PackageInteractiveSelector(object):
             Color('{autoblue}Latest version{/autoblue}'),
             Color('{autoblue}Release date{/autoblue}'),
         ]]
+        # filled by the compatibility check (--check-compatibility)
+        show_conflicts = any('conflicts' in package for package in self.packages_for_upgrade.values())
+        if show_conflicts:
+            data[0].append(Color('{autoblue}Conflicts{/autoblue}'))
 
         for i, package in self.packages_for_upgrade.items():
             data.append([Color('{{autobgblack}}{{autogreen}} {} {{/autogreen}}{{/bgblack}}'.format(i)),
@@ -67,6 +80,9 @@ class PackageInteractiveSelector(object):
                          package['current_version'],
                          package['latest_version'],
                          package['upload_time']])
+            if show_conflicts:
+                data[-1].append(Color('{{autored}}{}{{/autored}}'.format('\n'.join(package['conflicts'])))
+                                if package.get('conflicts') else '')
 
         print('')
         print(Color('{autogreen}Available upgrades:{/autogreen}'))
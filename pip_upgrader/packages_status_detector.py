@@ -1,23 +1,30 @@
+import json
 import os
 import re
-import requests
 import sys
+import time
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from configparser import ConfigParser, NoOptionError, NoSectionError
-from urllib.parse import urljoin
 
 from colorclass import Color
 from packaging import version
+from packaging.specifiers import SpecifierSet
 from packaging.utils import canonicalize_name
-from requests import HTTPError
-
-try:
-    from pip.locations import site_config_files
-except ImportError:
-    try:
-        from pip._internal.locations import site_config_files
-    except ImportError:  # pragma: nocover
-        site_config_files = None
+from requests import RequestException
+
+from pip_upgrader.distribution_filenames import parse_filename_version
+from pip_upgrader.http_session import create_session
+from pip_upgrader.index_cache import IndexCache
+from pip_upgrader.index_snapshot import IndexSnapshot
+from pip_upgrader.index_sync import ChangelogError, IndexSync
+from pip_upgrader.installed_environments import installed_versions
+from pip_upgrader.package_index import PackageIndex, index_api
+from pip_upgrader.pip_config import site_config_files
+from pip_upgrader.pypi_json_parser import load_pypi_json
+from pip_upgrader.simple_html_parser import iter_anchor_files
+from pip_upgrader.status_output import error_record, status_record, write_record
+from pip_upgrader.version_selector import parse_version, select_latest_version
 
 
 class PackagesStatusDetector(object):
@@ -33,81 +40,168 @@ class PackagesStatusDetector(object):
     ]
 
     check_gte = False
+    jobs = 1
+    cache = None
+    incremental_sync = False
+    session = None
+    snapshot = None
+    snapshot_filename = None
+    offline_snapshot = None
+    local_index = None
+    extra_indexes = None
+    indexes = None
+    _index_executor = None
+    timings = None
+    installed = None
+    daemon = None
+    output_format = 'text'
+    errors = None
+    timeout = 15
     _prerelease = False
 
-    def __init__(self, packages, options):
+    SIMPLE_JSON_CONTENT_TYPE = 'application/vnd.pypi.simple.v1+json'
+    # PEP 691 content negotiation: prefer json, but accept the html page from servers which don't support it
+    SIMPLE_ACCEPT_HEADER = 'application/vnd.pypi.simple.v1+json, application/vnd.pypi.simple.v1+html;q=0.2, ' \
+                           'text/html;q=0.01'
+
+    DEFAULT_JOBS = 8
+    DEFAULT_TIMEOUT = 15
+    DEFAULT_RETRIES = 3
+
+    def __init__(self, packages, options, timings=None, requirements_index_urls=None,
+                 requirements_extra_index_urls=None, installed=None):
+        """
+        :type timings: pip_upgrader.timings.Timings
+        :param requirements_index_urls: -i / --index-url found in requirements files
+        :param requirements_extra_index_urls: --extra-index-url found in requirements files
+        :param installed: {environment path: {canonical name: installed version}}, added to each package status
+        """
         self.packages = packages
+        self.timings = timings
+        self.installed = installed
         self.packages_status_map = {}
+        self.output_format = options.get('--format') or 'text'
+        self.errors = []
         self.PYPI_API_URL = 'https://pypi.python.org/pypi/{package}/json'
         self.PYPI_API_TYPE = 'pypi_json'
+        self.extra_indexes = []
 
         if not options.get('--use-default-index'):
-            self._update_index_url_from_configs()
-
-        self.check_gte = options['--check-greater-equal']
+            self._update_index_url_from_configs(requirements_index_urls or [], requirements_extra_index_urls or [])
+
+        self.check_gte = options.get('--check-greater-equal', False)
+        self.jobs = max(1, int(options.get('--jobs') or self.DEFAULT_JOBS))
+        self.timeout = float(options.get('--timeout') or self.DEFAULT_TIMEOUT)
+        retries = options.get('--retries')
+        self.session = create_session(pool_size=self.jobs,
+                                      retries=self.DEFAULT_RETRIES if retries is None else int(retries))
+        if options.get('--offline'):
+            # everything is answered from the snapshot, no network and no cache
+            self.offline_snapshot = IndexSnapshot.load(options['--offline'])
+        elif not options.get('--no-cache'):
+            self.cache = IndexCache(ttl=options.get('--cache-ttl'), refresh=options.get('--refresh', False))
+            self.incremental_sync = bool(options.get('--sync'))
+        if options.get('--snapshot-out'):
+            self.snapshot = IndexSnapshot()
+            self.snapshot_filename = options['--snapshot-out']
         self._prerelease = False
 
-    def _update_index_url_from_configs(self):
-        """ Checks for alternative index-url in pip.conf """
+        # a running daemon answers from its warm caches; options which need this process's own index state
+        # (no cache, refresh, snapshots) keep the lookups in process
+        if not any(options.get(option) for option in ('--no-daemon', '--offline', '--snapshot-out', '--no-cache',
+                                                      '--refresh', '--sync')):
+            from pip_upgrader.daemon import DaemonClient
+            client = DaemonClient()
+            if client.is_running():
+                self.daemon = client
 
+    def _update_index_url_from_configs(self, requirements_index_urls=(), requirements_extra_index_urls=()):
+        """ Checks for alternative index-url, and extra-index-url(s), in requirements files, environ and pip.conf """
+
+        # a copy, the class attribute is shared by all instances
+        pip_config_locations = list(self.pip_config_locations)
         if 'VIRTUAL_ENV' in os.environ:
-            self.pip_config_locations.append(os.path.join(os.environ['VIRTUAL_ENV'], 'pip.conf'))
-            self.pip_config_locations.append(os.path.join(os.environ['VIRTUAL_ENV'], 'pip.ini'))
+            pip_config_locations.append(os.path.join(os.environ['VIRTUAL_ENV'], 'pip.conf'))
+            pip_config_locations.append(os.path.join(os.environ['VIRTUAL_ENV'], 'pip.ini'))
 
-        if site_config_files:
-            self.pip_config_locations.extend(site_config_files)
+        pip_config_locations.extend(site_config_files())
 
         index_url = None
         custom_config = None
-
-        if 'PIP_INDEX_URL' in os.environ and os.environ['PIP_INDEX_URL']:
+        # (url, where it was found)
+        extra_index_urls = [(url, 'requirements file') for url in requirements_extra_index_urls]
+
+        if requirements_index_urls:
+            # like pip, options of requirements files take priority
+            index_url = requirements_index_urls[0]
+            custom_config = 'requirements file'
+        elif 'PIP_INDEX_URL' in os.environ and os.environ['PIP_INDEX_URL']:
             # environ variable takes priority
             index_url = os.environ['PIP_INDEX_URL']
             custom_config = 'PIP_INDEX_URL environment variable'
-        else:
-            for pip_config_filename in self.pip_config_locations:
-                if pip_config_filename.startswith('~'):
-                    pip_config_filename = os.path.expanduser(pip_config_filename)
 
-                if os.path.isfile(pip_config_filename):
-                    config = ConfigParser()
-                    config.read([pip_config_filename])
+        if os.environ.get('PIP_EXTRA_INDEX_URL'):
+            extra_index_urls.extend((url, 'PIP_EXTRA_INDEX_URL environment variable')
+                                    for url in os.environ['PIP_EXTRA_INDEX_URL'].split())
+
+        config_extra_index_found = False
+        for pip_config_filename in pip_config_locations:
+            if index_url and config_extra_index_found:
+                break
+            if pip_config_filename.startswith('~'):
+                pip_config_filename = os.path.expanduser(pip_config_filename)
+
+            if os.path.isfile(pip_config_filename):
+                config = ConfigParser()
+                config.read([pip_config_filename])
+                # stop on first detected, because config locations have a priority
+                if not index_url:
                     try:
                         index_url = config.get('global', 'index-url')
                         custom_config = pip_config_filename
-                        break  # stop on first detected, because config locations have a priority
                     except (NoOptionError, NoSectionError):  # pragma: nocover
                         pass
+                if not config_extra_index_found:
+                    try:
+                        extra_index_urls.extend((url, pip_config_filename)
+                                                for url in config.get('global', 'extra-index-url').split())
+                        config_extra_index_found = True
+                    except (NoOptionError, NoSectionError):
+                        pass
 
         if index_url:
             self.PYPI_API_URL = self._prepare_api_url(index_url)
-            print(Color('Setting API url to {{autoyellow}}{}{{/autoyellow}} as found in {{autoyellow}}{}{{/autoyellow}}'
-                        '. Use --default-index-url to use pypi default index'.format(self.PYPI_API_URL, custom_config)))
+            self._print_info(Color(
+                'Setting API url to {{autoyellow}}{}{{/autoyellow}} as found in {{autoyellow}}{}{{/autoyellow}}'
+                '. Use --default-index-url to use pypi default index'.format(self.PYPI_API_URL, custom_config)))
+
+        api_urls = {self.PYPI_API_URL}
+        for extra_index_url, found_in in extra_index_urls:
+            extra_index = PackageIndex.from_url(extra_index_url)
+            if extra_index.api_url in api_urls:
+                continue
+            api_urls.add(extra_index.api_url)
+            self.extra_indexes.append(extra_index)
+            self._print_info(Color(
+                'Adding extra index {{autoyellow}}{}{{/autoyellow}} as found in {{autoyellow}}{}{{/autoyellow}}'.format(
+                    extra_index.api_url, found_in)))
 
     def _prepare_api_url(self, index_url):  # pragma: nocover
-        if not index_url.endswith('/'):
-            index_url += '/'
-
-        if index_url.endswith('/simple/'):
-            self.PYPI_API_TYPE = 'simple_html'
-            return urljoin(index_url, '{package}/')
-
-        if index_url.endswith('/+simple/'):
-            self.PYPI_API_TYPE = 'simple_html'
-            return urljoin(index_url, '{package}/')
-
-        if '/pypi/' in index_url:
-            base_url = index_url.split('/pypi/')[0]
-            return urljoin(base_url, '/pypi/{package}/json')
-
-        return urljoin(index_url, '/pypi/{package}/json')
+        self.PYPI_API_URL, self.PYPI_API_TYPE, self.local_index = index_api(index_url)
+        return self.PYPI_API_URL
 
     def detect_available_upgrades(self, options):
         self._prerelease = options.get('--prerelease', False)
+        # the primary index comes first: its upload times are preferred when merging releases
+        self.indexes = [PackageIndex(self.PYPI_API_URL, self.PYPI_API_TYPE, self.local_index)] + self.extra_indexes
+        if self.incremental_sync:
+            self._start_index_syncs()
         explicit_packages_lower = None
         if options['-p'] and options['-p'] != ['all']:
             explicit_packages_lower = [pack_name.lower() for pack_name in options['-p']]
 
+        candidates = []
+        requirements_by_name = {}
         for i, package in enumerate(self.packages):
             try:
                 package_name, pinned_version = self._expand_package(package)
@@ -115,6 +209,11 @@ class PackagesStatusDetector(object):
                     # todo: treat <= or >= instead of ==
                     continue
 
+                if package.canonical_name in requirements_by_name:
+                    # same package in several requirements files: query the index only once
+                    requirements_by_name[package.canonical_name].append(package)
+                    continue
+
                 if explicit_packages_lower and package_name.lower() not in explicit_packages_lower:
                     found = False
                     for option_package in explicit_packages_lower:
@@ -127,139 +226,394 @@ class PackagesStatusDetector(object):
                 current_version = version.parse(pinned_version)
 
                 if pinned_version and isinstance(current_version, version.Version):  # version parsing is correct
-                    package_status, reason = self._fetch_index_package_info(package_name, current_version)
+                    candidates.append((i, package, package_name, current_version))
+                    requirements_by_name[package.canonical_name] = [package]
+            except Exception as e:  # noqa  # pragma: nocover
+                self._report_error(package, e)
+
+        # the upgrade of a package must satisfy the other clauses of all its pins (celery>=3.1.1,<4)
+        candidates = [(i, package, package_name, current_version,
+                       self._constraints(requirements_by_name[package.canonical_name]))
+                      for i, package, package_name, current_version in candidates]
+
+        if len(self.indexes) > 1 and not self.offline_snapshot:
+            # a separate pool for the indexes of each package, so lookups never wait for a worker of their own pool
+            self._index_executor = ThreadPoolExecutor(max_workers=self.jobs * len(self.indexes))
+
+        # query the index concurrently. Text output consumes the results in requirements order, so progress lines
+        # keep the same order as a sequential run; ndjson streams each record as soon as it's known
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = {executor.submit(self._fetch_candidate_package_info, candidate): candidate
+                       for candidate in candidates}
+            ordered_futures = sorted(futures, key=lambda future: futures[future][0])
+            statuses = {}
+
+            for future in as_completed(futures) if self.output_format == 'ndjson' else ordered_futures:
+                i, package, package_name, current_version, _ = futures[future]
+                fetch_result, error, latency = future.result()
+                try:
+                    if error:  # pragma: nocover
+                        raise error
+
+                    package_status, reason = fetch_result
                     if not package_status:  # pragma: nocover
-                        print(package, reason)
+                        self._report_error(package, reason)
                         continue
 
-                    print('{}/{}: {} ... '.format(i + 1, len(self.packages), package_name), end='')
-                    sys.stdout.flush()
+                    package_status['requirements'] = requirements_by_name[package.canonical_name]
+                    package_status['fetch_latency'] = latency
+                    if self.installed is not None:
+                        package_status['installed'] = installed_versions(self.installed, package.canonical_name)
+                    statuses[future] = package_status
+                    self._report_status(i, package_status)
+                except Exception as e:  # noqa  # pragma: nocover
+                    self._report_error(package, e)
+
+            for future in ordered_futures:
+                if future in statuses:
+                    self.packages_status_map[statuses[future]['name']] = statuses[future]
+
+        if self._index_executor:
+            self._index_executor.shutdown()
+            self._index_executor = None
+            self._print_info(Color('{autoyellow}Indexes:{/autoyellow}'))
+            for index in self.indexes:
+                self._print_info('  ' + index.summary())
+
+        for index in self.indexes:
+            if index.sync:
+                index.sync.save()
+
+        if self.cache:
+            self.cache.prune()
+
+        if self.snapshot:
+            self.snapshot.save(self.snapshot_filename)
+            self._print_info(Color('Index snapshot saved to {{autoyellow}}{}{{/autoyellow}}'.format(
+                self.snapshot_filename)))
 
-                    # compare versions
-                    if current_version < package_status['latest_version']:
-                        print('upgrade available: {} ==> {} (uploaded on {})'.format(current_version,
-                                                                                     package_status['latest_version'],
-                                                                                     package_status['upload_time']))
-                    else:
-                        print('up to date: {}'.format(current_version))
-                    sys.stdout.flush()
+        return self.packages_status_map
 
-                    self.packages_status_map[package_name] = package_status
-            except Exception as e:  # noqa  # pragma: nocover
-                print('Error while parsing package {} (skipping). \nException: '.format(package), e)
+    def _start_index_syncs(self):
+        """ Reads the changelog of each index since the last sync: only the projects it lists are fetched again """
+        for index in self.indexes:
+            if index.api_type == 'local_files':
+                continue
+            sync = IndexSync(index.api_url, self.cache.cache_dir)
+            try:
+                sync.start(self.session, timeout=self.timeout)
+            except ChangelogError as e:
+                self._print_info('No changelog for {} ({}), its cached answers are revalidated'.format(
+                    index.api_url, e))
+                continue
+            index.sync = sync
+            if sync.base_serial is None:
+                self._print_info(Color('Syncing {{autoyellow}}{}{{/autoyellow}} from serial {}'.format(
+                    index.api_url, sync.serial)))
+            else:
+                self._print_info(Color('Syncing {{autoyellow}}{}{{/autoyellow}} from serial {} to {}: '
+                                       '{} changed projects'.format(index.api_url, sync.base_serial, sync.serial,
+                                                                    len(sync.changes))))
+
+    def _print_info(self, message):
+        # machine readable formats keep stdout for the records only
+        print(message, file=sys.stdout if self.output_format == 'text' else sys.stderr)
+
+    def _report_status(self, i, package_status):
+        if self.output_format == 'ndjson':
+            write_record(status_record(package_status))
+            return
+        if self.output_format != 'text':
+            return
+
+        current_version = package_status['current_version']
+        print('{}/{}: {} ... '.format(i + 1, len(self.packages), package_status['name']), end='')
+        if package_status['upgrade_available']:
+            print('upgrade available: {} ==> {} (uploaded on {})'.format(current_version,
+                                                                         package_status['latest_version'],
+                                                                         package_status['upload_time']))
+        else:
+            print('up to date: {}'.format(current_version))
+        sys.stdout.flush()
+
+    def _report_error(self, package, reason):
+        record = error_record(package, reason)
+        self.errors.append(record)
+        if self.output_format == 'ndjson':
+            write_record(record)
+        else:
+            self._print_info('Error while checking package {} (skipping): {}'.format(package, reason))
 
-        return self.packages_status_map
+    def _fetch_candidate_package_info(self, candidate):
+        """ Runs in a worker thread. Exceptions are returned, not raised, so they are reported in order.
+        Returns (result, exception, latency in seconds). """
+        _, _, package_name, current_version, constraints = candidate
+        started = time.perf_counter()
+        try:
+            return self._fetch_index_package_info(package_name, current_version, constraints), None, \
+                time.perf_counter() - started
+        except Exception as e:  # noqa  # pragma: nocover
+            return None, e, time.perf_counter() - started
 
-    def _fetch_index_package_info(self, package_name, current_version):
+    def _fetch_index_package_info(self, package_name, current_version, constraints=None):
         """
         :type package_name: str
         :type current_version: version.Version
+        :param constraints: the upgrade must satisfy this SpecifierSet too
         """
-
+        started = time.perf_counter()
+        fetch_info = {'source': 'snapshot', 'latency': 0.0, 'bytes': 0}
+        try:
+            # the daemon selects the latest version without constraints
+            if self.daemon and not constraints:
+                daemon_result = self._fetch_daemon_package_info(package_name, current_version, fetch_info)
+                if daemon_result:
+                    return daemon_result
+
+            if self.offline_snapshot:
+                _, releases = self.offline_snapshot.get(package_name)
+                if releases is None:  # pragma: nocover
+                    return False, 'not found in the offline index snapshot'
+            else:
+                releases, reason, index_urls = self._fetch_releases_from_indexes(package_name, fetch_info)
+                if releases is None:  # pragma: nocover
+                    return False, reason
+                if self.snapshot:
+                    self.snapshot.add(package_name, ' '.join(index_urls), releases)
+
+            return self._package_status(package_name, current_version, releases, constraints)
+        finally:
+            if self.timings:
+                self.timings.package(package_name, fetch_info['source'], fetch_info['latency'],
+                                     time.perf_counter() - started - fetch_info['latency'], fetch_info['bytes'])
+
+    def _fetch_daemon_package_info(self, package_name, current_version, fetch_info):
+        """ Asks the daemon. Returns None if it stopped answering: the lookup then runs in process, like the next
+        ones. """
+        from pip_upgrader.daemon import DaemonError
+        indexes = [(index.api_url, index.api_type) for index in self.indexes]
+        started = time.perf_counter()
         try:
-            package_canonical_name = package_name
-            if self.PYPI_API_TYPE == 'simple_html':
-                package_canonical_name = canonicalize_name(package_name)
-            response = requests.get(self.PYPI_API_URL.format(package=package_canonical_name), timeout=15)
-        except HTTPError as e:  # pragma: nocover
-            return False, e.message
-
-        if not response.ok:  # pragma: nocover
-            return False, 'API error: {}'.format(response.reason)
-
-        if self.PYPI_API_TYPE == 'pypi_json':
-            return self._parse_pypi_json_package_info(package_name, current_version, response)
-        elif self.PYPI_API_TYPE == 'simple_html':
-            return self._parse_simple_html_package_info(package_name, current_version, response)
+            package_status, reason, _ = self.daemon.package_status(indexes, package_name, current_version,
+                                                                   self._prerelease, timeout=self.timeout)
+        except (DaemonError, ValueError, KeyError):
+            self.daemon = None
+            return None
+        fetch_info['source'] = 'daemon'
+        fetch_info['latency'] = time.perf_counter() - started
+        self.indexes[0].record(fetch_info)
+        return package_status, reason
+
+    def _fetch_releases_from_indexes(self, package_name, fetch_info):
+        """ Queries all the indexes (concurrently, when there are several) and merges their releases.
+        Returns (releases, reason, api urls of the indexes which have the package). """
+        indexes = self.indexes or [PackageIndex(self.PYPI_API_URL, self.PYPI_API_TYPE, self.local_index)]
+        fetch_infos = [{} for _ in indexes]
+        if len(indexes) > 1 and self._index_executor:
+            results = list(self._index_executor.map(self._fetch_index_releases, [package_name] * len(indexes),
+                                                    fetch_infos, indexes))
+        else:
+            results = [self._fetch_index_releases(package_name, fetch_infos[0], indexes[0])]
+
+        releases = None
+        reasons = []
+        index_urls = []
+        for index, index_fetch_info, (index_releases, reason) in zip(indexes, fetch_infos, results):
+            index.record(index_fetch_info)
+            if index_releases is None:
+                reasons.append(reason)
+                continue
+            index_urls.append(index.api_url)
+            releases = releases or {}
+            for version_string, upload_time in index_releases.items():
+                if releases.get(version_string) is None:
+                    releases[version_string] = upload_time
+
+        # the slowest index sets the latency, as they are queried concurrently
+        fetch_info['latency'] = max(index_fetch_info.get('latency', 0.0) for index_fetch_info in fetch_infos)
+        fetch_info['bytes'] = sum(index_fetch_info.get('bytes', 0) for index_fetch_info in fetch_infos)
+        fetch_info['source'] = fetch_infos[0].get('source', 'error')
+        if releases is None:
+            return None, ', '.join(reasons), index_urls
+        return releases, 'success', index_urls
+
+    def _fetch_index_releases(self, package_name, fetch_info=None, index=None):
+        """ Returns (releases, reason). Releases map each version string to its upload time (None if unknown).
+
+        :param fetch_info: optional dict, filled with the source, latency and downloaded bytes of the answer
+        :param index: the PackageIndex to query (default: the primary index)
+        :type index: PackageIndex
+        """
+        fetch_info = {} if fetch_info is None else fetch_info
+        index = index or PackageIndex(self.PYPI_API_URL, self.PYPI_API_TYPE, self.local_index)
+        if index.api_type == 'local_files':
+            fetch_info['source'] = 'local'
+            return index.local_index.releases(package_name), 'success'
+
+        package_canonical_name = package_name
+        if index.api_type in ('simple_json', 'simple_html'):
+            package_canonical_name = canonicalize_name(package_name)
+
+        # cached entries younger than the ttl are used without any request,
+        # older ones are revalidated, so an unchanged package costs only a 304.
+        # When syncing, entries of projects absent from the changelog are used whatever their age,
+        # and the ones it lists are fetched again
+        entry = self.cache.get(index.api_url, package_name) if self.cache else None
+        sync = index.sync
+        sync_serial = sync.serial if sync else None
+        if entry and sync and sync.is_changed(package_name, entry):
+            entry = None
+
+        if entry and sync and sync.is_unchanged(package_name, entry):
+            fetch_info['source'] = 'synced'
+            self.cache.synced(index.api_url, package_name, entry, sync_serial)
+            content = entry['content']
+            content_type = entry.get('content_type')
+        elif entry and self.cache.is_fresh(entry):
+            fetch_info['source'] = 'cache'
+            content = entry['content']
+            content_type = entry.get('content_type')
+        else:
+            headers = self.cache.conditional_headers(entry) if entry else {}
+            if index.api_type == 'simple_json':
+                headers['Accept'] = self.SIMPLE_ACCEPT_HEADER
+            started = time.perf_counter()
+            fetch_info['source'] = 'error'
+            try:
+                response = self.session.get(index.api_url.format(package=package_canonical_name),
+                                            headers=headers, timeout=self.timeout)
+            except RequestException as e:  # pragma: nocover
+                return None, 'API error: {}'.format(e)
+            finally:
+                fetch_info['latency'] = time.perf_counter() - started
+
+            if response.status_code == 304 and entry:
+                fetch_info['source'] = 'revalidated'
+                content = self.cache.revalidated(index.api_url, package_name, entry, serial=sync_serial)['content']
+                content_type = entry.get('content_type')
+            elif not response.ok:  # pragma: nocover
+                if response.status_code == 404:
+                    fetch_info['source'] = 'not_found'
+                return None, 'API error: {}'.format(response.reason)
+            else:
+                fetch_info['source'] = 'network'
+                fetch_info['bytes'] = len(response.content)
+                content = response.content
+                content_type = response.headers.get('Content-Type')
+                if self.cache:
+                    self.cache.store(index.api_url, package_name, content, response.headers, serial=sync_serial)
+
+        if index.api_type == 'pypi_json':
+            return self._parse_pypi_json_releases(package_name, content), 'success'
+        elif index.api_type == 'simple_json':
+            if (content_type or '').startswith(self.SIMPLE_JSON_CONTENT_TYPE):
+                return self._parse_simple_json_releases(package_name, content), 'success'
+            # the server ignored the json Accept header
+            return self._parse_simple_html_releases(package_name, content), 'success'
+        elif index.api_type == 'simple_html':
+            return self._parse_simple_html_releases(package_name, content), 'success'
         else:  # pragma: nocover
-            raise NotImplementedError('This type of PYPI_API_TYPE type is not supported')
+            raise NotImplementedError('This type of index api type is not supported')
 
-    def _expand_package(self, package_line):
+    def _expand_package(self, package):
+        """
+        :type package: pip_upgrader.packages_detector.RequirementRecord
+        """
         pin_types = ['==', '>='] if self.check_gte else ['==']
 
-        for pin_type in pin_types:
-            if pin_type in package_line:
-                name, vers = package_line.split(pin_type)
+        if package.pin_operator in pin_types:
+            return package.name, package.pinned_version
 
-                if '[' in name and name.strip().endswith(']'):
-                    name = name.split('[')[0]
+        return None, None
 
-                return name, vers
+    @staticmethod
+    def _constraints(records):
+        """ The other clauses of all the pins of a package, as a single SpecifierSet """
+        constraints = SpecifierSet()
+        for record in records:
+            constraints &= record.constraints
+        return constraints
 
-        return None, None
+    def _select_latest_version(self, version_strings, current_version):
+        """ Returns (latest version, its original string) """
+        # even if user did not choose prerelease, if the package from requirements is pre/post release, use it
+        include_prereleases = self._prerelease or current_version.is_postrelease or current_version.is_prerelease
+        return select_latest_version(version_strings, current_version, include_prereleases)
 
-    def _parse_pypi_json_package_info(self, package_name, current_version, response):
+    def _package_status(self, package_name, current_version, releases, constraints=None):
         """
         :type package_name: str
         :type current_version: version.Version
-        :type response: requests.models.Response
+        :type releases: dict
+        :type constraints: packaging.specifiers.SpecifierSet
         """
-
-        data = response.json()
-        all_versions = [version.parse(vers) for vers in data['releases'].keys()]
-        if not self._prerelease:
-            filtered_versions = [vers for vers in all_versions if not vers.is_prerelease and not vers.is_postrelease]
-        else:
-            filtered_versions = all_versions
-
-        if not filtered_versions:  # pragma: nocover
-            return False, 'error while parsing version'
-
-        latest_version = max(filtered_versions)
-
-        # even if user did not choose prerelease, if the package from requirements is pre/post release, use it
-        if self._prerelease or current_version.is_postrelease or current_version.is_prerelease:
-            prerelease_versions = [vers for vers in all_versions if vers.is_prerelease or vers.is_postrelease]
-            if prerelease_versions:
-                if max(prerelease_versions) > latest_version:
-                    latest_version = max(prerelease_versions)
-        try:
-            try:
-                latest_version_info = data['releases'][str(latest_version)][0]
-            except KeyError:  # pragma: nocover
-                # non-RFC versions, get the latest from pypi response
-                latest_version = version.parse(data['info']['version'])
-                latest_version_info = data['releases'][str(latest_version)][0]
-        except Exception:  # pragma: nocover
+        version_strings = releases.keys()
+        if constraints:
+            version_strings = [version_string for version_string in version_strings
+                               if parse_version(version_string) is not None and
+                               constraints.contains(parse_version(version_string), prereleases=True)]
+            if not version_strings:  # pragma: nocover
+                return False, 'no release satisfies {}'.format(constraints)
+        latest_version, latest_version_string = self._select_latest_version(version_strings, current_version)
+
+        if not latest_version:  # pragma: nocover
             return False, 'error while parsing version'
 
-        upload_time = latest_version_info['upload_time'].replace('T', ' ')
-
         return {
             'name': package_name,
             'current_version': current_version,
             'latest_version': latest_version,
             'upgrade_available': current_version < latest_version,
-            'upload_time': upload_time
+            'upload_time': releases[latest_version_string] or '-'
         }, 'success'
 
-    def _parse_simple_html_package_info(self, package_name, current_version, response):
+    def _parse_pypi_json_releases(self, package_name, content):
         """
         :type package_name: str
-        :type current_version: version.Version
-        :type response: requests.models.Response
+        :type content: bytes
         """
-        pattern = r'<a.*>.*{name}-([A-z0-9\.-]*)(?:-py|\.tar).*<\/a>'.format(name=re.escape(package_name))
-        versions_match = re.findall(pattern, response.content.decode('utf-8'), flags=re.IGNORECASE)
+        data = load_pypi_json(content)
 
-        all_versions = [version.parse(vers) for vers in versions_match]
-        filtered_versions = [vers for vers in all_versions if not vers.is_prerelease and not vers.is_postrelease]
-
-        if not filtered_versions:  # pragma: nocover
-            return False, 'error while parsing version'
+        # releases without any file can't be installed
+        return {vers: upload_times[0].replace('T', ' ')
+                for vers, upload_times in data['releases'].items() if upload_times}
 
-        latest_version = max(filtered_versions)
-
-        # even if user did not choose prerelease, if the package from requirements is pre/post release, use it
-        if self._prerelease or current_version.is_postrelease or current_version.is_prerelease:
-            prerelease_versions = [vers for vers in all_versions if vers.is_prerelease or vers.is_postrelease]
-            if prerelease_versions:
-                latest_version = max(prerelease_versions)
+    def _parse_simple_json_releases(self, package_name, content):
+        """
+        Parses the PEP 691 json simple api response (with PEP 700 upload-time, when the index provides it)
 
-        return {
-           'name': package_name,
-           'current_version': current_version,
-           'latest_version': latest_version,
-           'upgrade_available': current_version < latest_version,
-           'upload_time': '-'
-        }, 'success'
+        :type package_name: str
+        :type content: bytes
+        """
+        data = json.loads(content.decode('utf-8'))
+        canonical_name = canonicalize_name(package_name)
+
+        upload_times = {}
+        yanked_versions = {}
+        for file_info in data.get('files', []):
+            version_string = parse_filename_version(file_info['filename'], canonical_name)
+            if not version_string:
+                continue
+
+            # a release is yanked only if all its files are yanked
+            yanked_versions[version_string] = yanked_versions.get(version_string, True) and \
+                bool(file_info.get('yanked'))
+            if file_info.get('upload-time'):
+                upload_time = file_info['upload-time'][:19].replace('T', ' ')
+                upload_times[version_string] = min(upload_times.get(version_string, upload_time), upload_time)
+
+        return {vers: upload_times.get(vers) for vers, yanked in yanked_versions.items() if not yanked}
+
+    def _parse_simple_html_releases(self, package_name, content):
+        """
+        :type package_name: str
+        :type content: bytes
+        """
+        canonical_name = canonicalize_name(package_name)
+        releases = {}
+        for filename, yanked in iter_anchor_files(content.decode('utf-8')):
+            version_string = parse_filename_version(filename, canonical_name)
+            if version_string and not yanked:
+                releases[version_string] = None
+
+        return releases
@@ -1,11 +1,12 @@
 import os
 
-import subprocess
 from subprocess import CalledProcessError
 
-import re
 from colorclass import Color
 
+from pip_upgrader.installers import create_installer
+from pip_upgrader.requirements_rewriter import RequirementsRewriter
+
 
 class PackagesUpgrader(object):
 
@@ -14,32 +15,89 @@ class PackagesUpgrader(object):
     upgraded_packages = None
     dry_run = False
     check_gte = False
+    batch_install = False
+    installer = None
 
-    def __init__(self, selected_packages, requirements_files, options):
+    def __init__(self, selected_packages, requirements_files, options, timings=None):
+        """
+        :type timings: pip_upgrader.timings.Timings
+        """
         self.selected_packages = selected_packages
         self.requirements_files = requirements_files
         self.upgraded_packages = []
         self.dry_run = options['--dry-run']
-        self.check_gte = options['--check-greater-equal']
+        self.check_gte = options.get('--check-greater-equal', False)
         skip_pkg_install = options.get('--skip-package-installation', False)
         if 'PIP_UPGRADER_SKIP_PACKAGE_INSTALLATION' in os.environ:
             skip_pkg_install = True  # pragma: nocover
         self.skip_package_installation = skip_pkg_install
+        self.installer = create_installer(options, timings=timings)
+        self.batch_install = options.get('--batch-install', False) or self.installer.batched
 
     def do_upgrade(self):
-        for package in self.selected_packages:
-            self._update_package(package)
+        installed_packages = []
+        try:
+            if self.batch_install and not self.dry_run and not self.skip_package_installation:
+                installed_packages = self._install_packages_batch(self.selected_packages)
+            else:
+                for package in self.selected_packages:
+                    if self._update_package(package):
+                        installed_packages.append(package)
+            self._print_install_durations(installed_packages)
+        finally:
+            # update only packages with installation success, all files in a single pass (even if interrupted)
+            self._update_requirements_packages(installed_packages)
 
         return self.upgraded_packages
 
+    def _install_packages_batch(self, packages):
+        """ Installs all the packages with a single installer call. If it fails, the set is bisected,
+        to install everything except the offending packages. Returns the installed packages. """
+        if not packages:
+            return []
+
+        try:
+            self._install(packages)
+            return list(packages)
+        except CalledProcessError:
+            if len(packages) == 1:
+                print(Color('{{autored}}Failed to install package "{}"{{/autored}}'.format(packages[0]['name'])))
+                return []
+
+        middle = len(packages) // 2
+        print(Color('{{autoyellow}}Batch install failed, retrying {} and {} packages separately{{/autoyellow}}'.format(
+            middle, len(packages) - middle)))
+        return self._install_packages_batch(packages[:middle]) + self._install_packages_batch(packages[middle:])
+
+    def _install(self, packages):
+        wheelhouses = sorted({os.path.dirname(package['prefetched'])
+                              for package in packages if package.get('prefetched')})
+        if not wheelhouses:
+            self.installer.install(packages)
+            return
+
+        find_links = [option for wheelhouse in wheelhouses for option in ('--find-links', wheelhouse)]
+        if all(package.get('prefetched') for package in packages):
+            try:
+                # everything was prefetched (--prefetch): a local install, unless a new dependency is needed
+                self.installer.install(packages, ['--no-index'] + find_links)
+                return
+            except CalledProcessError:
+                print(Color('{autoyellow}Install from the wheelhouse failed, retrying with the index{/autoyellow}'))
+        self.installer.install(packages, find_links)
+
+    def _print_install_durations(self, packages):
+        for package in packages:
+            if package['name'] in self.installer.durations:
+                print('Installed {} {} in {:.2f}s ({})'.format(
+                    package['name'], package['latest_version'], self.installer.durations[package['name']],
+                    self.installer.name))
+
     def _update_package(self, package):
-        """ Update (install) the package in current environment,
-        and if success, also replace version in file """
+        """ Update (install) the package in current environment. Returns True on success. """
         try:
             if not self.dry_run and not self.skip_package_installation:  # pragma: nocover
-                pinned = '{}=={}'.format(package['name'],
-                                         package['latest_version'])
-                subprocess.check_call(['pip', 'install', pinned])
+                self._install([package])
             else:
                 # dry run has priority in messages
                 if self.dry_run:
@@ -48,52 +106,12 @@ class PackagesUpgrader(object):
                     lbl = "Skip Install"  # pragma: nocover
                 print('[{}]: skipping package installation:'.format(lbl),
                       package['name'])
-            # update only if installation success
-            self._update_requirements_package(package)
+            return True
 
         except CalledProcessError:  # pragma: nocover
             print(Color('{{autored}}Failed to install package "{}"{{/autored}}'.format(package['name'])))
+            return False
 
-    def _update_requirements_package(self, package):
-        for filename in set(self.requirements_files):
-            lines = []
-
-            # read current lines
-            with open(filename, 'r') as frh:
-                for line in frh:
-                    lines.append(line)
-
-            try:
-                # write updates lines
-                with open(filename, 'w') as fwh:
-                    for line in lines:
-                        line = self._maybe_update_line_package(line, package)
-                        fwh.write(line)
-            except Exception as e:  # pragma: nocover
-                # at exception, restore old file
-                with open(filename, 'w') as fwh:
-                    for line in lines:
-                        fwh.write(line)
-                raise e
-
-    def _maybe_update_line_package(self, line, package):
-        original_line = line
-        pin_type = r'[>=]=' if self.check_gte else '=='
-
-        pattern = r'\b({package}(?:\[\w*\])?{pin_type})[a-zA-Z0-9\.]+\b'.format(
-            package=re.escape(package['name']),
-            pin_type=pin_type
-        )
-
-        repl = r'\g<1>{}'.format(package['latest_version'])
-        line = re.sub(pattern, repl, line)
-
-        if line != original_line:
-            self.upgraded_packages.append(package)
-
-            if self.dry_run:  # pragma: nocover
-                print('[Dry Run]: skipping requirements replacement:',
-                      original_line.replace('\n', ''), ' / ',
-                      line.replace('\n', ''))
-                return original_line
-        return line
+    def _update_requirements_packages(self, packages):
+        rewriter = RequirementsRewriter(dry_run=self.dry_run)
+        self.upgraded_packages.extend(rewriter.rewrite(self.requirements_files, packages))
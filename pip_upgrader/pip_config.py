@@ -0,0 +1,17 @@
+import os
+import sys
+
+
+def site_config_files():
+    """ pip's global (site-wide) configuration files, resolved like pip does (appdirs.site_config_dirs),
+    without importing pip, which would load a big part of it at startup. """
+    if sys.platform == 'win32':
+        program_data = os.environ.get('PROGRAMDATA') or os.environ.get('ALLUSERSPROFILE') or r'C:\ProgramData'
+        return [os.path.join(program_data, 'pip', 'pip.ini')]
+
+    if sys.platform == 'darwin':
+        return ['/Library/Application Support/pip/pip.conf']
+
+    xdg_config_dirs = os.environ.get('XDG_CONFIG_DIRS') or '/etc/xdg'
+    return [os.path.join(path, 'pip', 'pip.conf') for path in xdg_config_dirs.split(os.pathsep) if path] + \
+        ['/etc/pip.conf']
@@ -0,0 +1,34 @@
+import json
+
+
+def _compact_object(pairs):
+    """ object_pairs_hook which shrinks every json object as soon as it's decoded.
+
+    The decoder builds objects bottom-up, so each file entry (with its digests, urls, sizes...) is collapsed
+    to its upload time before the next one is decoded, instead of keeping every file of every release alive.
+    """
+    obj = dict(pairs)
+
+    if 'filename' in obj and 'upload_time' in obj:
+        # file entry of a release
+        return obj['upload_time']
+
+    if 'releases' in obj:
+        # top level document
+        return {'releases': obj['releases'], 'info': obj.get('info') or {}}
+
+    if 'name' in obj and 'version' in obj and 'summary' in obj:
+        # project info, drop the (big) description
+        return {'version': obj['version']}
+
+    return obj
+
+
+def load_pypi_json(content):
+    """ Decodes a pypi json api project document, keeping only what the upgrade check needs:
+
+        {'releases': {'<version>': ['<upload time of each file>', ...], ...}, 'info': {'version': '<latest>'}}
+
+    :type content: bytes
+    """
+    return json.loads(content, object_pairs_hook=_compact_object)
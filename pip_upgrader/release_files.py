@@ -0,0 +1,54 @@
+import json
+from urllib.parse import urljoin
+
+from packaging.utils import canonicalize_name
+from packaging.version import InvalidVersion, Version
+
+from pip_upgrader.distribution_filenames import parse_filename_version
+
+
+def same_version(version_string, release_version):
+    """ Whether a version string (from a filename) is `release_version`, once normalized """
+    if not version_string:
+        return False
+    try:
+        return Version(version_string) == Version(str(release_version))
+    except InvalidVersion:  # pragma: nocover
+        return version_string == str(release_version)
+
+
+def _get(status_detector, url, headers=None):
+    response = status_detector.session.get(url, headers=headers or {}, timeout=status_detector.timeout)
+    return response if response.ok else None
+
+
+def pypi_json_release(status_detector, api_url, name, release_version):
+    """ The pypi json document of a single release (/pypi/<name>/<version>/json): its `info` (requires_dist,
+    requires_python...) and its files (`urls`), or None """
+    response = _get(status_detector, api_url.replace('{package}/json', '{package}/{version}/json').format(
+        package=name, version=release_version))
+    if response is None:
+        return None
+    return json.loads(response.content.decode('utf-8'))
+
+
+def simple_json_release_files(status_detector, api_url, name, release_version):
+    """ The files of a release, from the PEP 691 project page (cached by the status check, usually), with absolute
+    urls. Returns None if the index doesn't serve the json api. """
+    page_url = api_url.format(package=canonicalize_name(name))
+    entry = status_detector.cache.get(api_url, name) if status_detector.cache else None
+    if entry:
+        content, content_type = entry['content'], entry.get('content_type')
+    else:
+        response = _get(status_detector, page_url, headers={'Accept': status_detector.SIMPLE_JSON_CONTENT_TYPE})
+        if response is None:
+            return None
+        content, content_type = response.content, response.headers.get('Content-Type')
+    if not (content_type or '').startswith(status_detector.SIMPLE_JSON_CONTENT_TYPE):
+        return None
+
+    files = []
+    for file_info in json.loads(content.decode('utf-8')).get('files', []):
+        if same_version(parse_filename_version(file_info['filename'], canonicalize_name(name)), release_version):
+            files.append(dict(file_info, url=urljoin(page_url, file_info['url'])))
+    return files
@@ -1,14 +1,28 @@
-import mimetypes
 import os
 
+from pip_upgrader.requirements_discovery import (REQUIREMENTS_EXTENSIONS, IgnoreRules, iter_included_files,
+                                                 walk_requirements_files)
+
 
 class RequirementsDetector(object):
     """ Takes raw requirements argument, and detects / discovers all the requirements files. """
 
     filenames = []
+    root = None
+    recursive = False
+    excludes = ()
 
-    def __init__(self, requirements_arg):
+    def __init__(self, requirements_arg, root=None, recursive=False, excludes=None):
+        """
+        :param root: project directory for the autodetection (default: current working directory)
+        :param recursive: autodetect requirements files in the whole tree, not only in the usual locations
+        :param excludes: .gitignore-style globs of paths to skip during autodetection
+        """
         self.filenames = []
+        self.root = root
+        self.recursive = recursive
+        self.excludes = tuple(excludes or ())
+        self._seen_paths = set()
 
         if not requirements_arg:
             self.autodetect_files()
@@ -22,42 +36,58 @@ class RequirementsDetector(object):
     def detect_files(self, requirements_arg):
         for argument in requirements_arg:
             if self._is_valid_requirements_file(argument):
-                self.filenames.append(argument)
+                self._add_filename(argument)
             else:  # pragma: nocover
                 print('Invalid requirements file: {}'.format(argument))
         self._check_inclusions_recursively()
 
+    def _root_path(self, path):
+        return os.path.join(self.root, path) if self.root else path
+
     def autodetect_files(self):
-        """ Attempt to detect requirements files in the current working directory """
-        if self._is_valid_requirements_file('requirements.txt'):
-            self.filenames.append('requirements.txt')
-
-        if self._is_valid_requirements_file('requirements.pip'):  # pragma: nocover
-            self.filenames.append('requirements.pip')
-
-        if os.path.isdir('requirements'):
-            for filename in os.listdir('requirements'):
-                file_path = os.path.join('requirements', filename)
-                if self._is_valid_requirements_file(file_path):
-                    self.filenames.append(file_path)
+        """ Attempt to detect requirements files in the project root (current working directory by default) """
+        if self.recursive:
+            for filename in walk_requirements_files(self.root or '', self.excludes):
+                self._add_filename(filename)
+            self._check_inclusions_recursively()
+            return
+
+        rules = IgnoreRules().extended(self.excludes)
+        candidates = [self._root_path('requirements.txt'), self._root_path('requirements.pip')]
+
+        requirements_dir = self._root_path('requirements')
+        if os.path.isdir(requirements_dir):
+            with os.scandir(requirements_dir) as entries:
+                candidates.extend(os.path.join(requirements_dir, entry.name)
+                                  for entry in sorted(entries, key=lambda entry: entry.name))
+
+        for filename in candidates:
+            rel_path = os.path.relpath(filename, self.root or '.').replace(os.sep, '/')
+            if self._is_valid_requirements_file(filename) and not rules.is_file_ignored(rel_path):
+                self._add_filename(filename)
         self._check_inclusions_recursively()
 
     @staticmethod
     def _is_valid_requirements_file(filename):
-        extension_ok = filename.endswith('txt') or filename.endswith('pip')
-        return extension_ok and os.path.isfile(filename) and mimetypes.guess_type(filename)[0] in ['text/plain', None]
+        return filename.endswith(REQUIREMENTS_EXTENSIONS) and os.path.isfile(filename)
+
+    def _add_filename(self, filename):
+        """ Adds the file, unless it's already detected (under any spelling of its path). Returns True if added. """
+        real_path = os.path.realpath(filename)
+        if real_path in self._seen_paths:
+            return False
+        self._seen_paths.add(real_path)
+        self.filenames.append(filename)
+        return True
 
     def _check_inclusions_recursively(self):
-        for filename in self.filenames:
+        for filename in list(self.filenames):
             self._detect_inclusion(filename)
 
     def _detect_inclusion(self, filename):
-        with open(filename) as fh:
-            for line in fh:
-                if line.strip().startswith('-r '):
-                    included_filename = line.split('-r ')[1].strip()
-                    included_filename = os.path.join(os.path.dirname(filename), included_filename)
-                    if self._is_valid_requirements_file(included_filename) and included_filename not in self.filenames:
-                        self.filenames.append(included_filename)
-                        # recursively, check if the included file contains other inclusions
-                        self._detect_inclusion(included_filename)
+        """ Follows -r / --requirement and -c / --constraint includes, depth first. Files already seen are not
+        followed again, so include cycles terminate. """
+        for included_filename in iter_included_files(filename):
+            if self._is_valid_requirements_file(included_filename) and self._add_filename(included_filename):
+                # recursively, check if the included file contains other inclusions
+                self._detect_inclusion(included_filename)
@@ -0,0 +1,159 @@
+import os
+import re
+
+REQUIREMENTS_EXTENSIONS = ('.txt', '.pip')
+
+# directories which never hold project requirements, skipped without reading them
+DEFAULT_EXCLUDES = ('.git/', '.hg/', '.svn/', '.tox/', '.nox/', '.venv/', 'venv/', 'node_modules/', '__pycache__/',
+                    'site-packages/')
+
+# -r file, -rfile, --requirement file, --requirement=file, and the same forms of -c / --constraint
+INCLUDE_RE = re.compile(r'^(--requirement|--constraint|-r|-c)(?:\s*=\s*|\s*)(\S+)')
+
+
+def _translate_glob(pattern):
+    """ Translates a gitignore glob (without its leading / trailing slashes) to a regex """
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            regex += '[' + pattern[i + 1:end].replace('!', '^', 1) + ']'
+            i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+class IgnoreRules(object):
+    """ .gitignore-style exclude rules: globs relative to the directory they come from, anchored when they contain
+    a slash, `dir/` matching directories only, `**` matching any depth, and `!` re-including a path.
+
+    Rules are immutable: `extended()` returns new rules, so each directory of a walk only carries the rules of its
+    own .gitignore ancestors.
+    """
+
+    def __init__(self, rules=()):
+        # (base directory, regex, negated, directories only), in order: the last matching rule wins
+        self.rules = tuple(rules)
+
+    def extended(self, patterns, base=''):
+        rules = list(self.rules)
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith('#'):
+                continue
+
+            negated = pattern.startswith('!')
+            pattern = pattern.lstrip('!')
+            dir_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            anchored = '/' in pattern
+            regex = _translate_glob(pattern.lstrip('/'))
+            if not anchored:
+                regex = '(?:.*/)?' + regex
+            rules.append((base, re.compile(regex + '$'), negated, dir_only))
+        return IgnoreRules(rules)
+
+    def extended_from_file(self, filename, base=''):
+        try:
+            with open(filename, encoding='utf-8') as fh:
+                return self.extended(fh.read().splitlines(), base)
+        except (OSError, UnicodeDecodeError):  # pragma: nocover
+            return self
+
+    def is_ignored(self, rel_path, is_dir=False):
+        """
+        :param rel_path: path relative to the walked root, with / separators
+        """
+        ignored = False
+        for base, regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not rel_path.startswith(base + '/'):
+                    continue
+                path = rel_path[len(base) + 1:]
+            else:
+                path = rel_path
+            if regex.match(path):
+                ignored = not negated
+        return ignored
+
+    def is_file_ignored(self, rel_path):
+        """ Whether a file is ignored, itself or through one of its parent directories (for files which are found
+        without walking the tree, where ignored directories are pruned) """
+        parts = rel_path.split('/')
+        for depth in range(1, len(parts)):
+            if self.is_ignored('/'.join(parts[:depth]), is_dir=True):
+                return True
+        return self.is_ignored(rel_path)
+
+
+def is_requirements_filename(filename, in_requirements_dir=False):
+    """ requirements.txt, requirements-dev.txt, test-requirements.txt, constraints.txt, requirements.pip,
+    and any .txt / .pip file of a `requirements` directory """
+    name = filename.lower()
+    if not name.endswith(REQUIREMENTS_EXTENSIONS):
+        return False
+    return in_requirements_dir or 'requirements' in name or 'constraints' in name
+
+
+def walk_requirements_files(root='', excludes=(), use_gitignore=True):
+    """ Yields the requirements files under `root` (the current directory by default, yielding relative paths),
+    walking the tree with os.scandir. Excluded directories (DEFAULT_EXCLUDES, `excludes` globs and the rules of
+    .gitignore files) are not entered. """
+    stack = [('', IgnoreRules().extended(DEFAULT_EXCLUDES).extended(excludes))]
+    while stack:
+        rel_dir, rules = stack.pop()
+        directory = os.path.join(root, *rel_dir.split('/')) if rel_dir else root
+        try:
+            entries = sorted(os.scandir(directory or '.'), key=lambda entry: entry.name)
+        except OSError:  # pragma: nocover
+            continue
+
+        if use_gitignore and any(entry.name == '.gitignore' for entry in entries):
+            rules = rules.extended_from_file(os.path.join(directory, '.gitignore'), rel_dir)
+
+        in_requirements_dir = rel_dir.rpartition('/')[2] == 'requirements'
+        subdirectories = []
+        for entry in entries:
+            rel_path = rel_dir + '/' + entry.name if rel_dir else entry.name
+            is_dir = entry.is_dir()
+            if rules.is_ignored(rel_path, is_dir):
+                continue
+            if is_dir:
+                subdirectories.append((rel_path, rules))
+            elif is_requirements_filename(entry.name, in_requirements_dir) and entry.is_file():
+                yield os.path.join(directory, entry.name)
+
+        # depth first, in name order
+        stack.extend(reversed(subdirectories))
+
+
+def iter_included_files(filename):
+    """ Yields the requirements and constraints files included by `filename` (paths relative to its directory
+    are resolved), in file order. Remote (url) includes are skipped. """
+    directory = os.path.dirname(filename)
+    with open(filename) as fh:
+        for line in fh:
+            match = INCLUDE_RE.match(line.strip())
+            if not match:
+                continue
+            included = match.group(2)
+            if '://' in included:
+                continue
+            yield os.path.join(directory, included)
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+
+
+class RequirementsRewriter(object):
+    """ Applies all the version changes to the requirements files, in a single pass per file.
+
+    Each selected package carries its requirement records (file, line number and column span of the pinned
+    version), so a change is a direct edit of that span. Files are written through a temp file + atomic rename,
+    and only if something changed in them.
+    """
+
+    dry_run = False
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+
+    def rewrite(self, filenames, packages):
+        """ Returns the packages which were replaced in at least one of `filenames`. """
+        filenames = set(filenames)
+        edits_by_file = defaultdict(list)
+        for package in packages:
+            for record in package.get('requirements', []):
+                if record.filename in filenames and record.version_span:
+                    edits_by_file[record.filename].append((record, package))
+
+        updated_names = set()
+        for filename in sorted(edits_by_file):
+            with open(filename, 'r', newline='') as fh:
+                lines = fh.readlines()
+
+            changed = False
+            for record, package in edits_by_file[filename]:
+                line = lines[record.line_number - 1]
+                start, end = record.version_span
+                if line[start:end] != record.pinned_version:  # pragma: nocover
+                    # the file was edited meanwhile
+                    continue
+                if not record.constraints.contains(package['latest_version'], prereleases=True):
+                    # the other clauses of the line exclude it (celery>=3.1.1,<4): the line would be unsatisfiable
+                    continue
+
+                new_line = line[:start] + str(package['latest_version']) + line[end:]
+                if new_line == line:
+                    continue
+
+                updated_names.add(package['name'])
+                if self.dry_run:  # pragma: nocover
+                    print('[Dry Run]: skipping requirements replacement:',
+                          line.rstrip('\r\n'), ' / ', new_line.rstrip('\r\n'))
+                    continue
+                lines[record.line_number - 1] = new_line
+                changed = True
+
+            if changed:
+                self._write_atomic(filename, lines)
+
+        return [package for package in packages if package['name'] in updated_names]
+
+    @staticmethod
+    def _write_atomic(filename, lines):
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.pip-upgrader-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', newline='') as fh:
+                fh.writelines(lines)
+            shutil.copymode(filename, tmp_path)
+            os.replace(tmp_path, filename)
+        except Exception:  # pragma: nocover
+            os.remove(tmp_path)
+            raise
@@ -0,0 +1,41 @@
+import re
+from html import unescape
+
+# attributes and text are matched with negated classes, which can't run past their delimiter (the text can hold
+# nested tags, but stops at the next <a> or </a>, so an unclosed anchor fails at the next one): the scan is linear
+# in the page size, whatever the number of links
+ANCHOR_RE = re.compile(r'<a\b([^>]*)>((?:[^<]|<(?!/?a[\s>]))*)</a\s*>', re.IGNORECASE)
+HREF_RE = re.compile(r'''href\s*=\s*["']?([^"'\s>]*)''', re.IGNORECASE)
+TAG_RE = re.compile(r'<[^>]*>')
+
+
+def _href_filename(attributes):
+    href = HREF_RE.search(attributes)
+    if not href:
+        return ''
+    return href.group(1).split('#')[0].rstrip('/').rsplit('/', 1)[-1]
+
+
+def iter_anchor_files(text):
+    """ Single pass tokenizer for PEP 503 simple pages. Yields (filename, yanked) for every <a> tag.
+
+    The filename is the anchor text, or the last path segment of the href when the text is empty or holds nested
+    markup (like <span>celery</span>).
+
+    :type text: str
+    """
+    for match in ANCHOR_RE.finditer(text):
+        attributes, filename = match.groups()
+        filename = filename.strip()
+
+        if '<' in filename:
+            filename = _href_filename(attributes) or TAG_RE.sub('', filename).strip()
+        elif not filename:
+            filename = _href_filename(attributes)
+        if not filename:
+            continue
+
+        if '&' in filename:
+            filename = unescape(filename)
+
+        yield filename, 'data-yanked' in attributes
@@ -0,0 +1,58 @@
+import json
+import sys
+
+OUTPUT_FORMATS = ('text', 'ndjson', 'json')
+
+
+def status_record(package_status):
+    """ The json-serializable record of a package status (as built by PackagesStatusDetector) """
+    upload_time = package_status.get('upload_time')
+    record = {
+        'name': package_status['name'],
+        'current': str(package_status['current_version']),
+        'latest': str(package_status['latest_version']),
+        'upgrade_available': package_status['upgrade_available'],
+        'upload_time': None if upload_time in (None, '-') else upload_time,
+        'source': [{'file': record.filename, 'line': record.line_number}
+                   for record in package_status.get('requirements', [])],
+        'fetch_latency': round(package_status.get('fetch_latency', 0.0), 6),
+    }
+    if 'installed' in package_status:
+        # {environment path: installed version, or None}
+        record['installed'] = dict(package_status['installed'])
+    return record
+
+
+def error_record(package, reason):
+    """
+    :type package: pip_upgrader.packages_detector.RequirementRecord
+    """
+    return {
+        'name': package.name,
+        'error': str(reason),
+        'source': [{'file': package.filename, 'line': package.line_number}],
+    }
+
+
+def write_record(record, stream=None):
+    """ Writes a single ndjson line, flushed right away so consumers can act on it. """
+    stream = stream or sys.stdout
+    stream.write(json.dumps(record, sort_keys=True) + '\n')
+    stream.flush()
+
+
+def write_summary(packages_status_map, errors, stream=None):
+    """ Writes the whole result as a single json document """
+    stream = stream or sys.stdout
+    packages = [status_record(package_status) for package_status in packages_status_map.values()]
+    json.dump({
+        'packages': packages,
+        'errors': errors,
+        'summary': {
+            'checked': len(packages),
+            'upgrades_available': sum(1 for package in packages if package['upgrade_available']),
+            'errors': len(errors),
+        },
+    }, stream, indent=2, sort_keys=True)
+    stream.write('\n')
+    stream.flush()
@@ -0,0 +1,125 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from colorclass import Color
+
+# callables receiving every timing event (a dict), from any Timings instance
+_hooks = []
+
+
+def add_timing_hook(callback):
+    """ Registers `callback(event)`, called for each timing event of every run. Events are dicts:
+
+    - {'event': 'stage', 'stage': 'status_detection', 'duration': 1.2}
+    - {'event': 'package', 'package': 'django', 'source': 'network', 'latency': 0.3, 'parse': 0.01, 'bytes': 1234}
+      where source is one of network, revalidated (304), cache, synced, local, snapshot, daemon, not_found or error
+    - {'event': 'install', 'package': 'django', 'installer': 'pip', 'duration': 4.2, 'batch_size': 1}
+      where a batch of packages installed with a single command share its duration
+
+    Package events are sent from the index lookup worker threads.
+    """
+    _hooks.append(callback)
+
+
+def remove_timing_hook(callback):
+    _hooks.remove(callback)
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = int(round(percent / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+class Timings(object):
+    """ Collects the duration of each stage of a run, the index latency and the install duration of each package. """
+
+    stages = None
+    packages = None
+    installs = None
+
+    def __init__(self):
+        self.stages = []
+        self.packages = []
+        self.installs = []
+        self._lock = threading.Lock()
+
+    def _emit(self, event):
+        for callback in list(_hooks):
+            callback(event)
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            event = {'event': 'stage', 'stage': name, 'duration': time.perf_counter() - started}
+            with self._lock:
+                self.stages.append(event)
+            self._emit(event)
+
+    def package(self, package_name, source, latency, parse, downloaded):
+        """
+        :param source: where the releases came from (network, revalidated, cache, synced, local, snapshot, daemon,
+            error)
+        :param latency: seconds spent getting the index answer
+        :param parse: seconds spent parsing it and selecting the latest version
+        :param downloaded: bytes received from the index
+        """
+        event = {'event': 'package', 'package': package_name, 'source': source, 'latency': latency,
+                 'parse': parse, 'bytes': downloaded}
+        with self._lock:
+            self.packages.append(event)
+        self._emit(event)
+
+    def install(self, package_name, installer, duration, batch_size):
+        """
+        :param installer: name of the installer backend
+        :param duration: seconds spent installing the package (its share of the batch)
+        :param batch_size: number of packages installed by the same command
+        """
+        event = {'event': 'install', 'package': package_name, 'installer': installer, 'duration': duration,
+                 'batch_size': batch_size}
+        with self._lock:
+            self.installs.append(event)
+        self._emit(event)
+
+    def print_report(self, slowest=10, file=None):
+        def print_line(line):
+            print(line, file=file or sys.stdout)
+
+        print_line(Color('\n{autoyellow}Timings:{/autoyellow}'))
+        for event in self.stages:
+            print_line('  {:<20} {:>9.3f}s'.format(event['stage'], event['duration']))
+
+        if self.installs:
+            print_line(Color('{autoyellow}Installs:{/autoyellow}'))
+            for event in self.installs:
+                print_line('  {:<30} {:>9.3f}s  ({}{})'.format(
+                    event['package'], event['duration'], event['installer'],
+                    ', batch of {}'.format(event['batch_size']) if event['batch_size'] > 1 else ''))
+
+        if not self.packages:
+            return
+
+        latencies = sorted(event['latency'] for event in self.packages)
+        sources = {}
+        for event in self.packages:
+            sources[event['source']] = sources.get(event['source'], 0) + 1
+
+        print_line(Color('{autoyellow}Index lookups:{/autoyellow}'))
+        print_line('  packages: {} ({})'.format(
+            len(self.packages), ', '.join('{}: {}'.format(source, count) for source, count in sorted(sources.items()))))
+        print_line('  latency: p50 {:.3f}s, p95 {:.3f}s, max {:.3f}s'.format(
+            percentile(latencies, 50), percentile(latencies, 95), latencies[-1]))
+        print_line('  parsing: {:.3f}s total'.format(sum(event['parse'] for event in self.packages)))
+        print_line('  downloaded: {} bytes'.format(sum(event['bytes'] for event in self.packages)))
+
+        print_line(Color('{autoyellow}Slowest packages:{/autoyellow}'))
+        for event in sorted(self.packages, key=lambda e: e['latency'] + e['parse'], reverse=True)[:slowest]:
+            print_line('  {:<30} {:>9.3f}s  (parse {:.3f}s, {} bytes, {})'.format(
+                event['package'], event['latency'], event['parse'], event['bytes'], event['source']))
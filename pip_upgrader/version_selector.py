@@ -0,0 +1,92 @@
+import re
+from functools import lru_cache
+
+from packaging import version
+
+# leading release segment of a version string ("1.11.2" in "1.11.2rc1"), without building a Version
+RELEASE_PREFIX_RE = re.compile(r'\d+(?:\.\d+)*')
+
+PARSE_CACHE_SIZE = 16384
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_version(version_string):
+    """ Memoized version.parse, shared by all packages and indexes of the run.
+    Returns None for versions which are not PEP 440 compliant. """
+    try:
+        parsed = version.parse(version_string)
+    except version.InvalidVersion:
+        return None
+    return parsed if isinstance(parsed, version.Version) else None
+
+
+def _is_surely_older(version_string, current_release):
+    """ True if the release segment of `version_string` is lower than the current one,
+    so it can't be newer than the current version, whatever its pre/post/dev suffix. """
+    major = version_string.partition('.')[0]
+    if major.isdigit():
+        # cheap check first, most of a long release history has an older major version
+        if int(major) != current_release[0]:
+            return int(major) < current_release[0]
+    elif '!' in version_string:  # epochs need a full comparison
+        return False
+
+    match = RELEASE_PREFIX_RE.match(version_string)
+    if not match:
+        return False
+    # trailing zeros don't count: 1.10 is 1.10.0, and 1.10.post1 is newer than it
+    return _strip_zeros(tuple(int(part) for part in match.group().split('.'))) < current_release
+
+
+def _strip_zeros(release):
+    while len(release) > 1 and release[-1] == 0:
+        release = release[:-1]
+    return release
+
+
+def select_latest_version(version_strings, current_version, include_prereleases=False):
+    """ Returns (latest version, its original string) of the given releases, or (None, None).
+
+    Releases which surely are older than `current_version` are discarded before parsing. The latest final release
+    and the latest pre/post release are computed in the same pass; the later one is used only with
+    `include_prereleases`.
+
+    :type version_strings: collections.Iterable[str]
+    :type current_version: version.Version
+    """
+    version_strings = list(version_strings)
+    candidates = version_strings
+    if current_version.epoch == 0:
+        current_release = _strip_zeros(current_version.release)
+        candidates = [vers for vers in version_strings if not _is_surely_older(vers, current_release)]
+        if not candidates:
+            # the pinned release is not on the index anymore, and nothing is newer: report the latest anyway
+            candidates = version_strings
+
+    latest_final, latest_final_string, latest_prerelease, latest_prerelease_string = _latest_versions(candidates)
+    if latest_final is None and not include_prereleases and candidates is not version_strings:
+        # only pre-releases are newer than a pinned release which is not on the index anymore: report the latest
+        # final release anyway
+        latest_final, latest_final_string = _latest_versions(version_strings)[:2]
+
+    if include_prereleases and latest_prerelease is not None:
+        if latest_final is None or latest_prerelease > latest_final:
+            return latest_prerelease, latest_prerelease_string
+
+    return latest_final, latest_final_string
+
+
+def _latest_versions(version_strings):
+    """ Returns (latest final release, its string, latest pre/post release, its string), in a single pass """
+    latest_final = latest_final_string = None
+    latest_prerelease = latest_prerelease_string = None
+    for version_string in version_strings:
+        parsed = parse_version(version_string)
+        if parsed is None:
+            continue
+        if parsed.is_prerelease or parsed.is_postrelease:
+            if latest_prerelease is None or parsed > latest_prerelease:
+                latest_prerelease, latest_prerelease_string = parsed, version_string
+        elif latest_final is None or parsed > latest_final:
+            latest_final, latest_final_string = parsed, version_string
+    return latest_final, latest_final_string, latest_prerelease, latest_prerelease_string
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from packaging.tags import parse_tag, sys_tags
+from packaging.utils import InvalidWheelFilename, parse_wheel_filename
+from requests import RequestException
+
+from pip_upgrader.distribution_filenames import SDIST_EXTENSIONS
+from pip_upgrader.index_cache import user_cache_dir
+from pip_upgrader.release_files import pypi_json_release, simple_json_release_files
+
+CHUNK_SIZE = 64 * 1024
+
+# run by the target interpreter, which may not have packaging installed, but has pip
+TAGS_SCRIPT = '''
+try:
+    from packaging.tags import sys_tags
+except ImportError:
+    from pip._vendor.packaging.tags import sys_tags
+print('\\n'.join(str(tag) for tag in sys_tags()))
+'''
+
+
+def default_wheelhouse():
+    return os.path.join(user_cache_dir(), 'wheelhouse')
+
+
+class PrefetchError(Exception):
+    pass
+
+
+def interpreter_tags(python):
+    """ The wheel tags supported by the `python` interpreter, by priority, or None for the running one.
+    Raises PrefetchError when the interpreter can't tell. """
+    if os.path.realpath(python) == os.path.realpath(sys.executable):
+        return None
+    try:
+        output = subprocess.check_output([python, '-c', TAGS_SCRIPT], stderr=subprocess.DEVNULL, timeout=60)
+    except (OSError, subprocess.SubprocessError) as e:
+        raise PrefetchError('could not get the wheel tags of {}: {}'.format(python, e))
+    return [tag for line in output.decode('utf-8').split() for tag in parse_tag(line)]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class WheelPrefetcher(object):
+    """ Downloads the distribution of each selected upgrade (the best wheel for the target interpreter, or the sdist)
+    into a local wheelhouse, concurrently, checking the sha256 digest published by the index.
+
+    Files already in the wheelhouse with the right digest are reused, so the wheelhouse doubles as a download cache.
+    """
+
+    status_detector = None
+    wheelhouse = None
+
+    def __init__(self, status_detector, wheelhouse=None, tags=None):
+        """
+        :type status_detector: pip_upgrader.packages_status_detector.PackagesStatusDetector
+        :param tags: wheel tags supported by the target interpreter, by priority (default: the running one's)
+        """
+        self.status_detector = status_detector
+        self.wheelhouse = wheelhouse or default_wheelhouse()
+        self.tag_ranks = {}
+        for rank, tag in enumerate(tags if tags is not None else sys_tags()):
+            self.tag_ranks.setdefault(tag, rank)
+
+    def prefetch(self, packages):
+        """ Sets the `prefetched` path of each package downloaded into the wheelhouse. Packages which can't be
+        prefetched are left as they are (they are installed from the index). Returns {name: result or error}. """
+        if not os.path.isdir(self.wheelhouse):
+            os.makedirs(self.wheelhouse)
+
+        with ThreadPoolExecutor(max_workers=self.status_detector.jobs) as executor:
+            results = list(executor.map(self._prefetch_package, packages))
+
+        for package, result in zip(packages, results):
+            if not isinstance(result, Exception):
+                package['prefetched'] = result['path']
+        return {package['name']: result for package, result in zip(packages, results)}
+
+    def _prefetch_package(self, package):
+        """ Runs in a worker thread. Exceptions are returned, not raised. """
+        started = time.perf_counter()
+        try:
+            release_file = self.choose_file(self._release_files(package['name'], package['latest_version']))
+            if not release_file:
+                raise PrefetchError('no distribution file found for {}=={}'.format(
+                    package['name'], package['latest_version']))
+            path, source, downloaded = self._download(release_file)
+        except (PrefetchError, RequestException, ValueError, KeyError, OSError) as e:
+            return e
+        return {'path': path, 'source': source, 'bytes': downloaded, 'verified': bool(release_file['sha256']),
+                'seconds': time.perf_counter() - started}
+
+    def _release_files(self, name, release_version):
+        """ [{filename, url, sha256, yanked}] of a release """
+        detector = self.status_detector
+        index = detector.indexes[0] if detector.indexes else None
+        api_url = index.api_url if index else detector.PYPI_API_URL
+        api_type = index.api_type if index else detector.PYPI_API_TYPE
+
+        if api_type == 'pypi_json':
+            release = pypi_json_release(detector, api_url, name, release_version)
+            files = [{'filename': file_info['filename'], 'url': file_info['url'],
+                      'sha256': (file_info.get('digests') or {}).get('sha256'), 'yanked': file_info.get('yanked')}
+                     for file_info in (release or {}).get('urls', [])]
+        elif api_type == 'simple_json':
+            files = [{'filename': file_info['filename'], 'url': file_info['url'],
+                      'sha256': (file_info.get('hashes') or {}).get('sha256'), 'yanked': file_info.get('yanked')}
+                     for file_info in simple_json_release_files(detector, api_url, name, release_version) or []]
+        else:
+            raise PrefetchError('{} indexes are not supported for prefetching'.format(api_type))
+        return [release_file for release_file in files if not release_file['yanked']]
+
+    def choose_file(self, files):
+        """ The wheel with the most specific tag supported by the target interpreter, else the sdist """
+        best_rank, best_file = None, None
+        for release_file in files:
+            if not release_file['filename'].endswith('.whl'):
+                continue
+            try:
+                tags = parse_wheel_filename(release_file['filename'])[3]
+            except InvalidWheelFilename:  # pragma: nocover
+                continue
+            ranks = [self.tag_ranks[tag] for tag in tags if tag in self.tag_ranks]
+            if ranks and (best_rank is None or min(ranks) < best_rank):
+                best_rank, best_file = min(ranks), release_file
+        if best_file:
+            return best_file
+
+        return next((release_file for release_file in files
+                     if release_file['filename'].lower().endswith(SDIST_EXTENSIONS)), None)
+
+    def _download(self, release_file):
+        """ Returns (path, source, downloaded bytes). Source is `wheelhouse` when the file was already there. """
+        filename = os.path.basename(release_file['filename'])
+        path = os.path.join(self.wheelhouse, filename)
+        expected = release_file['sha256']
+        if os.path.isfile(path) and expected and file_sha256(path) == expected:
+            return path, 'wheelhouse', 0
+
+        # the response goes back to the pool in any case: the pool blocks when all its connections are taken
+        with self.status_detector.session.get(release_file['url'], stream=True,
+                                              timeout=self.status_detector.timeout) as response:
+            if not response.ok:
+                raise PrefetchError('{} {} while downloading {}'.format(response.status_code, response.reason,
+                                                                        filename))
+
+            # written to a temp file first, so an interrupted or corrupted download never lands in the wheelhouse
+            digest = hashlib.sha256()
+            downloaded = 0
+            fd, tmp_path = tempfile.mkstemp(dir=self.wheelhouse, suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as fh:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        digest.update(chunk)
+                        fh.write(chunk)
+                        downloaded += len(chunk)
+                if expected and digest.hexdigest() != expected:
+                    raise PrefetchError('sha256 mismatch for {}: expected {}, got {}'.format(
+                        filename, expected, digest.hexdigest()))
+                os.replace(tmp_path, path)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+        return path, 'network', downloaded
@@ -0,0 +1,8 @@
+from packaging import version
+
+
+def package(name, current, latest, requirements=None):
+    """ A package status, as found in the status map of PackagesStatusDetector """
+    return {'name': name, 'current_version': version.parse(current), 'latest_version': version.parse(latest),
+            'upgrade_available': version.parse(current) < version.parse(latest), 'upload_time': '-',
+            'requirements': [record for record in requirements or [] if record.name == name]}
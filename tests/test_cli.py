@@ -1,3 +1,8 @@
+import json
+import os
+import pstats
+import shutil
+import tempfile
 from subprocess import PIPE, Popen as popen
 from unittest import TestCase
 
@@ -8,6 +13,7 @@ from pip_upgrader import __version__ as VERSION
 
 from pip_upgrader import cli
 from pip_upgrader.packages_status_detector import PackagesStatusDetector
+from pip_upgrader.timings import add_timing_hook, remove_timing_hook
 
 try:
     from unittest.mock import patch
@@ -55,6 +61,18 @@ class TestCommand(TestCase):
     def setUp(self):
         self._add_responses_mocks()
 
+        # keep the index cache of each test isolated (and away from the user's cache dir)
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        # and away from the index configuration of the machine running the tests
+        for patcher in (patch.dict('os.environ', {'PIP_UPGRADER_CACHE_DIR': self.cache_dir}),
+                        patch('pip_upgrader.packages_status_detector.site_config_files', return_value=[]),
+                        patch.object(PackagesStatusDetector, 'pip_config_locations', [])):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        os.environ.pop('PIP_INDEX_URL', None)
+        os.environ.pop('PIP_EXTRA_INDEX_URL', None)
+
     @responses.activate
     @patch('pip_upgrader.cli.get_options', return_value={'--dry-run': True, '-p': []})
     def test_command_basic_usage(self, options_mock, is_virtualenv_mock, user_input_mock):
@@ -320,3 +338,126 @@ class TestCommand(TestCase):
         self.assertNotIn('ipdb', output)
         self.assertNotIn('celery ... upgrade available: 3.1.1 ==>', output)
         self.assertIn('Successfully upgraded', output)
+
+    @responses.activate
+    @patch('pip_upgrader.cli.get_options', return_value={'--dry-run': True, '-p': ['all'], '--jobs': '4',
+                                                         '<requirements_file>': ['requirements/local.txt']})
+    def test_command_concurrent_jobs_keep_requirements_order(self, options_mock, is_virtualenv_mock,
+                                                             user_input_mock):
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout_mock:
+            cli.main()
+            output = stdout_mock.getvalue()
+
+        positions = [int(line.split('/')[0]) for line in output.splitlines() if ' ... ' in line]
+        self.assertTrue(positions)
+        self.assertEqual(positions, sorted(positions))
+        self.assertIn('celery ... upgrade available: 3.1.1 ==>', output)
+        self.assertIn('Successfully upgraded', output)
+
+    @responses.activate
+    @patch('pip_upgrader.cli.get_options', return_value={'--dry-run': True, '-p': ['all'], '--timings': True,
+                                                         '<requirements_file>': ['requirements/local.txt']})
+    def test_command_timings(self, options_mock, is_virtualenv_mock, user_input_mock):
+        events = []
+        add_timing_hook(events.append)
+        self.addCleanup(remove_timing_hook, events.append)
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout_mock:
+            cli.main()
+            output = stdout_mock.getvalue()
+
+        self.assertIn('Timings:', output)
+        self.assertIn('status_detection', output)
+        self.assertIn('latency: p50', output)
+        self.assertEqual([event['stage'] for event in events if event['event'] == 'stage'],
+                         ['detection', 'parsing', 'status_detection', 'selection', 'upgrade'])
+        package_events = [event for event in events if event['event'] == 'package']
+        self.assertIn('celery', [event['package'] for event in package_events])
+        self.assertTrue(all(event['source'] == 'network' and event['bytes'] > 0 for event in package_events))
+
+    @responses.activate
+    def test_command_profile(self, is_virtualenv_mock, user_input_mock):
+        profile_filename = os.path.join(self.cache_dir, 'run.prof')
+        options = {'--dry-run': True, '-p': ['all'], '--profile': profile_filename,
+                   '<requirements_file>': ['requirements/local.txt']}
+
+        with patch('pip_upgrader.cli.get_options', return_value=options), \
+                patch('sys.stdout', new_callable=StringIO) as stdout_mock:
+            cli.main()
+            output = stdout_mock.getvalue()
+
+        self.assertIn('Profile saved to', output)
+        self.assertIn('detect_available_upgrades', str(pstats.Stats(profile_filename).stats))
+
+    @responses.activate
+    @patch('pip_upgrader.cli.get_options', return_value={'--dry-run': False, '-p': [], '--format': 'ndjson',
+                                                         '<requirements_file>': ['requirements/local.txt']})
+    def test_command_format_ndjson(self, options_mock, is_virtualenv_mock, user_input_mock):
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout_mock, \
+                patch('sys.stderr', new_callable=StringIO) as stderr_mock:
+            cli.main()
+            output = stdout_mock.getvalue()
+
+        # report only: no prompt, no virtualenv check, and nothing but records on stdout
+        self.assertFalse(user_input_mock.called)
+        self.assertFalse(is_virtualenv_mock.called)
+        self.assertIn('Found valid requirements file(s)', stderr_mock.getvalue())
+
+        records = [json.loads(line) for line in output.splitlines()]
+        celery = [record for record in records if record['name'] == 'celery'][0]
+        self.assertEqual(celery['current'], '3.1.1')
+        self.assertTrue(celery['upgrade_available'])
+        self.assertIn('requirements/production.txt', [source['file'] for source in celery['source']])
+        self.assertIn('fetch_latency', celery)
+        self.assertIn('upload_time', celery)
+
+    @responses.activate
+    @patch('pip_upgrader.cli.get_options', return_value={'--dry-run': False, '-p': [], '--format': 'json',
+                                                         '<requirements_file>': ['requirements/local.txt']})
+    def test_command_format_json(self, options_mock, is_virtualenv_mock, user_input_mock):
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout_mock, patch('sys.stderr', new_callable=StringIO):
+            cli.main()
+            output = stdout_mock.getvalue()
+
+        result = json.loads(output)
+        self.assertFalse(user_input_mock.called)
+        self.assertEqual(result['summary']['checked'], len(result['packages']))
+        self.assertEqual(result['summary']['upgrades_available'],
+                         len([package for package in result['packages'] if package['upgrade_available']]))
+        self.assertIn('celery', [package['name'] for package in result['packages']])
+        self.assertEqual(result['errors'], [])
+
+    @responses.activate
+    def test_command_multiple_projects(self, is_virtualenv_mock, user_input_mock):
+        projects_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, projects_dir)
+        api_root, worker_root = os.path.join(projects_dir, 'api'), os.path.join(projects_dir, 'worker')
+        os.makedirs(os.path.join(api_root, 'requirements'))
+        os.makedirs(worker_root)
+        with open(os.path.join(api_root, 'requirements', 'base.txt'), 'w') as fh:
+            fh.write('celery==3.1.1\ndjango-rest-auth==0.9.0\n')
+        with open(os.path.join(worker_root, 'requirements.txt'), 'w') as fh:
+            fh.write('Celery==4.0.2\nipython==6.0.0\n')
+
+        options = {'--dry-run': False, '-p': ['all'], '--project': [api_root, worker_root]}
+        with patch('pip_upgrader.cli.get_options', return_value=options), \
+                patch('sys.stdout', new_callable=StringIO) as stdout_mock:
+            cli.main()
+            output = stdout_mock.getvalue()
+
+        # celery is pinned in both projects, but queried once
+        requested_urls = [call.request.url for call in responses.calls]
+        self.assertEqual(len(requested_urls), len(set(requested_urls)))
+        self.assertEqual(len([url for url in requested_urls if 'celery' in url.lower()]), 1)
+
+        with open(os.path.join(api_root, 'requirements', 'base.txt')) as fh:
+            self.assertEqual(fh.read(), 'celery==4.0.2\ndjango-rest-auth==0.9.1\n')
+        with open(os.path.join(worker_root, 'requirements.txt')) as fh:
+            self.assertEqual(fh.read(), 'Celery==4.0.2\nipython==6.0.0\n')
+
+        self.assertIn('Updated requirements of {}: celery,django-rest-auth'.format(api_root), output)
+        self.assertIn('Project {}'.format(worker_root), output)
+        self.assertFalse(is_virtualenv_mock.called)
@@ -0,0 +1,104 @@
+import json
+from collections import OrderedDict
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+import responses
+from packaging import version
+
+from pip_upgrader.compatibility_checker import CompatibilityChecker
+from pip_upgrader.packages_interactive_selector import PackageInteractiveSelector
+from pip_upgrader.packages_status_detector import PackagesStatusDetector
+
+from helpers import package
+
+VERSION_URL = 'https://pypi.python.org/pypi/{}/{}/json'
+
+
+def add_release(name, release_version, requires_dist=None, requires_python=None):
+    responses.add(responses.GET, VERSION_URL.format(name, release_version), content_type='application/json',
+                  body=json.dumps({'info': {'name': name, 'version': release_version, 'summary': '',
+                                            'requires_dist': requires_dist, 'requires_python': requires_python}}))
+
+
+class TestCompatibilityChecker(TestCase):
+
+    def setUp(self):
+        self.status_map = OrderedDict((status['name'], status) for status in [
+            package('django', '1.11', '2.0'),
+            package('djangorestframework', '3.6', '3.9'),
+            package('celery', '4.0', '5.0'),
+            package('kombu', '4.0', '5.1'),
+        ])
+        self.detector = PackagesStatusDetector([], {'--use-default-index': True, '--no-cache': True})
+
+    @responses.activate
+    def test_conflicts(self):
+        add_release('django', '1.11', requires_dist=['pytz'])
+        add_release('django', '2.0', requires_dist=['pytz'], requires_python='>=3.4')
+        add_release('djangorestframework', '3.6', requires_dist=['django<2.0'])
+        add_release('djangorestframework', '3.9', requires_dist=['django>=1.11'])
+        add_release('celery', '4.0', requires_dist=['kombu<5'])
+        add_release('celery', '5.0', requires_python='>=3.6',
+                    requires_dist=['kombu>=5', 'pytest; extra == "test"', 'billiard<1; python_version < "3"'])
+        add_release('kombu', '4.0')
+        # kombu 5.1 metadata is unknown: not a conflict by itself
+
+        conflicting = CompatibilityChecker(self.detector, python_version='3.11.2').check(self.status_map)
+
+        self.assertEqual(conflicting, 3)
+        self.assertEqual(self.status_map['django']['conflicts'], ['djangorestframework 3.6 requires django<2.0'])
+        self.assertEqual(self.status_map['djangorestframework']['conflicts'], [])
+        self.assertEqual(self.status_map['celery']['conflicts'],
+                         ['requires kombu>=5 (kombu is pinned to 4.0), upgrade it to 5.1 too'])
+        self.assertEqual(self.status_map['kombu']['conflicts'], ['celery 4.0 requires kombu<5'])
+
+        # requires_python is checked against the target interpreter
+        CompatibilityChecker(self.detector, python_version='2.7.18').check(self.status_map)
+        self.assertIn('requires Python >=3.6 (running 2.7.18)', self.status_map['celery']['conflicts'])
+
+    def _add_simple_json_project(self, metadata_key):
+        responses.add(responses.GET, 'https://pypi.python.org/simple/celery/',
+                      content_type='application/vnd.pypi.simple.v1+json', body=json.dumps({'files': [
+                          {'filename': 'celery-5.0.tar.gz', 'url': '../../packages/celery-5.0.tar.gz'},
+                          {'filename': 'celery-5.0-py3-none-any.whl',
+                           'url': '../../packages/celery-5.0-py3-none-any.whl',
+                           'requires-python': '>=3.6', metadata_key: {'sha256': 'abc'}},
+                      ]}))
+
+    @responses.activate
+    def test_simple_index_core_metadata(self):
+        self.detector.PYPI_API_URL = self.detector._prepare_api_url('https://pypi.python.org/simple')
+        self._add_simple_json_project('core-metadata')
+        responses.add(responses.GET, 'https://pypi.python.org/packages/celery-5.0-py3-none-any.whl.metadata',
+                      body='Metadata-Version: 2.1\nName: celery\nVersion: 5.0\nRequires-Python: >=3.6\n'
+                           'Requires-Dist: kombu>=5\nRequires-Dist: vine\n\nDescription\n')
+
+        checker = CompatibilityChecker(self.detector)
+        checker.fetch_metadata([('celery', version.parse('5.0'))])
+
+        self.assertEqual(checker.metadata[('celery', '5.0')],
+                         {'requires_dist': ['kombu>=5', 'vine'], 'requires_python': '>=3.6'})
+
+    @responses.activate
+    def test_simple_index_legacy_metadata_key(self):
+        self.detector.PYPI_API_URL = self.detector._prepare_api_url('https://pypi.python.org/simple')
+        self._add_simple_json_project('dist-info-metadata')
+        responses.add(responses.GET, 'https://pypi.python.org/packages/celery-5.0-py3-none-any.whl.metadata',
+                      body='Metadata-Version: 2.1\nName: celery\nVersion: 5.0\nRequires-Dist: kombu>=5\n\n')
+
+        checker = CompatibilityChecker(self.detector)
+        checker.fetch_metadata([('celery', version.parse('5.0'))])
+
+        self.assertEqual(checker.metadata[('celery', '5.0')]['requires_dist'], ['kombu>=5'])
+
+    def test_selector_skips_conflicting_packages(self):
+        self.status_map['django']['conflicts'] = ['djangorestframework 3.6 requires django<2.0']
+        self.status_map['celery']['conflicts'] = []
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout_mock:
+            selected = PackageInteractiveSelector(self.status_map, {'-p': ['all']}).get_packages()
+
+        self.assertEqual([package['name'] for package in selected], ['djangorestframework', 'celery', 'kombu'])
+        self.assertIn('Skipping django 2.0: djangorestframework 3.6 requires django<2.0', stdout_mock.getvalue())
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+import responses
+from packaging import version
+
+from pip_upgrader.daemon import DaemonClient, StatusDaemon
+from pip_upgrader.package_index import PackageIndex
+from pip_upgrader.packages_status_detector import PackagesStatusDetector
+
+PYPI_INDEX = ('https://pypi.python.org/pypi/{package}/json', 'pypi_json')
+
+
+class TestDaemon(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.socket_path = os.path.join(self.tmp_dir, 'daemon.sock')
+        patcher = patch.dict('os.environ', {'PIP_UPGRADER_SOCKET': self.socket_path,
+                                            'PIP_UPGRADER_CACHE_DIR': os.path.join(self.tmp_dir, 'cache')})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with open('tests/fixtures/celery.json') as fh:
+            self.celery_json = fh.read()
+
+    def _start_daemon(self):
+        daemon = StatusDaemon({'--jobs': '2'})
+        daemon.bind()
+        thread = threading.Thread(target=daemon.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(daemon.shutdown)
+        return daemon
+
+    def test_not_running(self):
+        self.assertFalse(DaemonClient().is_running())
+
+        detector = PackagesStatusDetector([], {'--use-default-index': True})
+        self.assertIsNone(detector.daemon)
+
+    @responses.activate
+    def test_package_status(self):
+        responses.add(responses.GET, 'https://pypi.python.org/pypi/celery/json', body=self.celery_json,
+                      content_type='application/json')
+        self._start_daemon()
+        client = DaemonClient()
+        self.assertTrue(client.is_running())
+
+        status, reason, fetch_info = client.package_status([PYPI_INDEX], 'celery', version.parse('3.1.1'), False)
+        self.assertEqual(reason, 'success')
+        self.assertEqual(fetch_info['source'], 'network')
+        self.assertEqual(status['latest_version'], version.parse('4.0.2'))
+        self.assertTrue(status['upgrade_available'])
+
+        # the second query is answered from memory
+        _, _, fetch_info = client.package_status([PYPI_INDEX], 'celery', version.parse('3.1.1'), False)
+        self.assertEqual(fetch_info['source'], 'memory')
+        self.assertEqual(len(responses.calls), 1)
+
+    def test_daemon_detector_is_not_its_own_client(self):
+        daemon = self._start_daemon()
+
+        self.assertIsNone(daemon._detector([PYPI_INDEX]).daemon)
+
+    @responses.activate
+    def test_detector_uses_daemon(self):
+        responses.add(responses.GET, 'https://pypi.python.org/pypi/celery/json', body=self.celery_json,
+                      content_type='application/json')
+        self._start_daemon()
+
+        detector = PackagesStatusDetector([], {'--use-default-index': True})
+        self.assertIsNotNone(detector.daemon)
+        detector.indexes = [_primary(detector)]
+        status, _ = detector._fetch_index_package_info('celery', version.parse('3.1.1'))
+        self.assertEqual(status['latest_version'], version.parse('4.0.2'))
+        self.assertEqual(detector.indexes[0].outcomes, {'daemon': 1})
+
+        # --no-daemon, and options which need this process's own index state, skip it
+        for option in ('--no-daemon', '--no-cache', '--refresh'):
+            self.assertIsNone(PackagesStatusDetector([], {'--use-default-index': True, option: True}).daemon)
+
+    @responses.activate
+    def test_fallback_when_daemon_stops(self):
+        responses.add(responses.GET, 'https://pypi.python.org/pypi/celery/json', body=self.celery_json,
+                      content_type='application/json')
+        daemon = StatusDaemon({})
+        daemon.bind()
+        detector = PackagesStatusDetector([], {'--use-default-index': True, '--cache-ttl': '0'})
+        daemon.close()
+
+        detector.daemon = DaemonClient(daemon.socket_path)
+        detector.indexes = [_primary(detector)]
+        status, _ = detector._fetch_index_package_info('celery', version.parse('3.1.1'))
+
+        self.assertEqual(status['latest_version'], version.parse('4.0.2'))
+        self.assertIsNone(detector.daemon)
+        self.assertEqual(detector.indexes[0].outcomes, {'network': 1})
+
+
+def _primary(detector):
+    return PackageIndex(detector.PYPI_API_URL, detector.PYPI_API_TYPE, detector.local_index)
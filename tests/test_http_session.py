@@ -0,0 +1,39 @@
+from unittest import TestCase
+
+import responses
+
+from pip_upgrader.http_session import JitterRetry, create_session
+
+
+class TestHttpSession(TestCase):
+
+    @responses.activate
+    def test_retries_server_errors(self):
+        url = 'https://pypi.python.org/pypi/celery/json'
+        responses.add(responses.GET, url, status=502)
+        responses.add(responses.GET, url, json={'releases': {}})
+
+        response = create_session(retries=2, backoff_factor=0).get(url, timeout=1)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_gives_up_after_retries(self):
+        url = 'https://pypi.python.org/pypi/celery/json'
+        responses.add(responses.GET, url, status=503)
+
+        response = create_session(retries=1, backoff_factor=0).get(url, timeout=1)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(responses.calls), 2)
+
+    def test_backoff_has_jitter(self):
+        retry = JitterRetry(total=5, backoff_factor=1)
+        for _ in range(3):
+            retry = retry.increment(method='GET', url='/')
+        max_backoff = super(JitterRetry, retry).get_backoff_time()
+
+        backoffs = [retry.get_backoff_time() for _ in range(20)]
+        self.assertTrue(all(max_backoff / 2 <= backoff <= max_backoff for backoff in backoffs))
+        self.assertGreater(len(set(backoffs)), 1)
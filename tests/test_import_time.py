@@ -0,0 +1,40 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+# cold import of the cli module, in microseconds (importing requests alone takes longer)
+IMPORT_TIME_BUDGET_US = 50000
+
+# loaded only when the stage which needs them runs
+HEAVY_MODULES = ('requests', 'urllib3', 'packaging', 'terminaltables', 'pip', 'importlib.metadata')
+
+
+def import_times(code):
+    """ Runs `code` in a fresh interpreter with -X importtime, returns {module: cumulative import time in us} """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime(TestCase):
+
+    def test_cli_import_budget(self):
+        # best of 3 runs, to smooth out noisy machines
+        cli_import_time = min(import_times('import pip_upgrader.cli')['pip_upgrader.cli'] for _ in range(3))
+        self.assertLess(cli_import_time, IMPORT_TIME_BUDGET_US)
+
+    def test_help_doesnt_import_stage_dependencies(self):
+        code = "import sys; sys.argv = ['pip-upgrade', '--help']\n" \
+               "from pip_upgrader.cli import main\n" \
+               "try:\n    main()\nexcept SystemExit:\n    pass"
+        imported = import_times(code)
+
+        self.assertIn('docopt', imported)
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, imported)
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+import responses
+from packaging import version
+from packaging.requirements import Requirement
+
+from pip_upgrader.index_cache import IndexCache
+from pip_upgrader.packages_detector import RequirementRecord
+from pip_upgrader.packages_status_detector import PackagesStatusDetector
+
+INDEX_URL = 'https://pypi.python.org/pypi/{package}/json'
+
+
+class TestIndexCache(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.cache = IndexCache(cache_dir=self.cache_dir, ttl=60)
+
+    def test_store_and_get_by_canonical_name(self):
+        self.cache.store(INDEX_URL, 'Django_Rest.Auth', b'{"body": 1}', {'ETag': '"abc"'})
+
+        entry = self.cache.get(INDEX_URL, 'django-rest-auth')
+        self.assertEqual(entry['content'], b'{"body": 1}')
+        self.assertEqual(entry['etag'], '"abc"')
+        self.assertTrue(self.cache.is_fresh(entry))
+        self.assertIsNone(self.cache.get('https://other.index/{package}/', 'django-rest-auth'))
+
+    def test_conditional_headers(self):
+        entry = self.cache.store(INDEX_URL, 'celery', b'', {'ETag': '"abc"', 'Last-Modified': 'Mon, 01 Jan 2018'})
+
+        self.assertEqual(IndexCache.conditional_headers(entry), {
+            'If-None-Match': '"abc"',
+            'If-Modified-Since': 'Mon, 01 Jan 2018',
+        })
+
+    def test_refresh_ignores_entries(self):
+        self.cache.store(INDEX_URL, 'celery', b'{}', {})
+
+        refresh_cache = IndexCache(cache_dir=self.cache_dir, refresh=True)
+        self.assertIsNone(refresh_cache.get(INDEX_URL, 'celery'))
+
+    def test_prune_evicts_least_recently_used(self):
+        self.cache.max_size = 3000
+        for i, package in enumerate(['django', 'celery', 'ipython']):
+            self.cache.store(INDEX_URL, package, b'x' * 1000, {})
+            path = self.cache._entry_path(INDEX_URL, package)
+            os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+
+        self.cache.prune()
+
+        self.assertIsNone(self.cache.get(INDEX_URL, 'django'))
+        self.assertIsNotNone(self.cache.get(INDEX_URL, 'celery'))
+        self.assertIsNotNone(self.cache.get(INDEX_URL, 'ipython'))
+
+    def test_prune_leaves_the_wheelhouse_alone(self):
+        self.cache.max_size = 1000 * 1000
+        for package in ['django', 'celery', 'ipython']:
+            self.cache.store(INDEX_URL, package, b'x' * 1000, {})
+        wheelhouse = os.path.join(self.cache_dir, 'wheelhouse')
+        os.makedirs(wheelhouse)
+        wheel = os.path.join(wheelhouse, 'torch-2.0-cp311-cp311-manylinux_2_17_x86_64.whl')
+        with open(wheel, 'wb') as fh:
+            fh.write(b'x' * 2 * 1000 * 1000)
+
+        self.cache.prune()
+
+        self.assertTrue(os.path.isfile(wheel))
+        for package in ['django', 'celery', 'ipython']:
+            self.assertIsNotNone(self.cache.get(INDEX_URL, package))
+
+
+class TestPackagesStatusDetectorCache(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        patcher = patch.dict('os.environ', {'PIP_UPGRADER_CACHE_DIR': self.cache_dir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with open('tests/fixtures/celery.json', 'rb') as fh:
+            self.body = fh.read()
+
+    def _detector(self):
+        packages = [RequirementRecord(Requirement('celery==3.1.1'))]
+        detector = PackagesStatusDetector(packages, {'--use-default-index': True, '--no-daemon': True})
+        detector.cache = IndexCache(cache_dir=self.cache_dir, ttl=0)
+        return detector
+
+    @responses.activate
+    def test_stale_entry_is_revalidated(self):
+        url = INDEX_URL.format(package='celery')
+        responses.add(responses.GET, url, body=self.body, headers={'ETag': '"v1"'})
+        responses.add(responses.GET, url, status=304)
+
+        first, _ = self._detector()._fetch_index_package_info('celery', version.parse('3.1.1'))
+        second, _ = self._detector()._fetch_index_package_info('celery', version.parse('3.1.1'))
+
+        self.assertEqual(first['latest_version'], second['latest_version'])
+        self.assertEqual(responses.calls[1].request.headers['If-None-Match'], '"v1"')
@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import responses
+from packaging import version
+
+from pip_upgrader.index_snapshot import IndexSnapshot
+from pip_upgrader.packages_detector import PackagesDetector
+from pip_upgrader.packages_status_detector import PackagesStatusDetector
+
+
+class TestIndexSnapshot(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_save_and_load(self):
+        for filename in ('snapshot.json', 'snapshot.json.gz'):
+            path = os.path.join(self.tmp_dir, filename)
+            snapshot = IndexSnapshot()
+            snapshot.add('Django_Rest.Auth', 'https://pypi.python.org/simple/{package}/', {'0.9.1': None})
+            snapshot.save(path)
+
+            self.assertEqual(IndexSnapshot.load(path).get('django-rest-auth'),
+                             ('https://pypi.python.org/simple/{package}/', {'0.9.1': None}))
+            self.assertEqual(IndexSnapshot.load(path).get('celery'), (None, None))
+
+    @responses.activate
+    def test_offline_replay(self):
+        with open('tests/fixtures/celery.json') as fh:
+            responses.add(responses.GET, 'https://pypi.python.org/pypi/celery/json', body=fh.read())
+        snapshot_path = os.path.join(self.tmp_dir, 'snapshot.json.gz')
+        packages = PackagesDetector(['requirements/production.txt']).get_packages()
+        options = {'--use-default-index': True, '--no-cache': True, '-p': []}
+
+        online_status = PackagesStatusDetector(packages, dict(options, **{'--snapshot-out': snapshot_path})) \
+            .detect_available_upgrades(options)
+        responses.reset()
+        offline_status = PackagesStatusDetector(packages, dict(options, **{'--offline': snapshot_path})) \
+            .detect_available_upgrades(options)
+
+        self.assertEqual(len(responses.calls), 0)
+        self.assertEqual(offline_status['celery']['latest_version'], online_status['celery']['latest_version'])
+        self.assertEqual(offline_status['celery']['upload_time'], online_status['celery']['upload_time'])
+        self.assertEqual(online_status['celery']['latest_version'], version.parse('4.0.2'))
@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+import tempfile
+import xmlrpc.client
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+import responses
+
+from pip_upgrader.index_cache import IndexCache
+from pip_upgrader.index_sync import IndexSync, index_changelog_url
+from pip_upgrader.packages_detector import PackagesDetector
+from pip_upgrader.packages_status_detector import PackagesStatusDetector
+
+INDEX_URL = 'https://pypi.python.org/pypi/{package}/json'
+CHANGELOG_URL = 'https://pypi.org/pypi'
+
+
+class TestIndexSync(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        patcher = patch.dict('os.environ', {'PIP_UPGRADER_CACHE_DIR': self.cache_dir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.requirements_file = os.path.join(self.tmp_dir, 'requirements.txt')
+        with open(self.requirements_file, 'w') as fh:
+            fh.write('celery==3.1.1\nipython==5.0.0\n')
+
+    def _index(self):
+        for package in ('celery', 'ipython'):
+            with open('tests/fixtures/{}.json'.format(package)) as fh:
+                responses.add(responses.GET, INDEX_URL.format(package=package), body=fh.read(),
+                              content_type='application/json', headers={'X-PyPI-Last-Serial': '90'})
+
+    def _changelog(self, serial=None, events=None):
+        def callback(request):
+            params, method = xmlrpc.client.loads(request.body)
+            self.changelog_calls.append((method, params))
+            result = serial if method == 'changelog_last_serial' else events
+            return 200, {}, xmlrpc.client.dumps((result,), methodresponse=True)
+
+        self.changelog_calls = []
+        responses.add_callback(responses.POST, CHANGELOG_URL, callback=callback, content_type='text/xml')
+
+    def _run(self):
+        packages = PackagesDetector([self.requirements_file]).get_packages()
+        with patch('sys.stdout', new_callable=StringIO) as stdout_mock:
+            detector = PackagesStatusDetector(packages, {'--use-default-index': True, '--sync': True,
+                                                         '--cache-ttl': '0'})
+            status_map = detector.detect_available_upgrades({'-p': []})
+        return detector, status_map, stdout_mock.getvalue()
+
+    def _index_requests(self):
+        return [call.request.url for call in responses.calls if call.request.method == 'GET']
+
+    def _saved_serials(self):
+        with open(os.path.join(self.cache_dir, 'serials.json')) as fh:
+            return json.load(fh)
+
+    def test_changelog_url(self):
+        self.assertEqual(index_changelog_url(INDEX_URL), CHANGELOG_URL)
+        self.assertEqual(index_changelog_url('https://mirror.example.com/simple/{package}/'),
+                         'https://mirror.example.com/pypi')
+
+    @responses.activate
+    def test_only_changed_projects_are_fetched(self):
+        self._index()
+        self._changelog(serial=100)
+        detector, _, output = self._run()
+        self.assertEqual(detector.indexes[0].outcomes, {'network': 2})
+        self.assertEqual(self._saved_serials(), {INDEX_URL: 100})
+        self.assertIn('from serial 100', output)
+
+        # ipython changed after the last sync: only ipython is fetched again, without revalidation
+        responses.calls.reset()
+        self._changelog(events=[['ipython', '6.0.0', 1500000000, 'new release', 120],
+                                ['requests', '2.20.0', 1500000000, 'new release', 130]])
+        detector, status_map, output = self._run()
+
+        self.assertEqual(self.changelog_calls, [('changelog_since_serial', (100,))])
+        self.assertEqual(self._index_requests(), [INDEX_URL.format(package='ipython')])
+        self.assertNotIn('If-None-Match', responses.calls[-1].request.headers)
+        self.assertEqual(detector.indexes[0].outcomes, {'network': 1, 'synced': 1})
+        self.assertEqual(sorted(status_map), ['celery', 'ipython'])
+        self.assertEqual(self._saved_serials(), {INDEX_URL: 130})
+        self.assertIn('from serial 100 to 130: 2 changed projects', output)
+
+    def test_entries_fetched_after_the_change_are_kept(self):
+        cache = IndexCache(cache_dir=self.cache_dir)
+        cache.store(INDEX_URL, 'celery', b'{}', {'X-PyPI-Last-Serial': '120'}, serial=100)
+        sync = IndexSync(INDEX_URL, self.cache_dir)
+        sync.base_serial, sync.serial, sync.changes = 100, 130, {'celery': 120, 'ipython': 125}
+
+        self.assertTrue(sync.is_unchanged('celery', cache.get(INDEX_URL, 'celery')))
+        self.assertFalse(sync.is_changed('celery', cache.get(INDEX_URL, 'celery')))
+        self.assertTrue(sync.is_changed('ipython', {'serial': 100, 'last_serial': 90}))
+        # not validated since the last sync: revalidated as usual
+        self.assertFalse(sync.is_unchanged('django', {'serial': 50}))
+        self.assertFalse(sync.is_unchanged('django', {}))
+
+    def test_changelog_pages(self):
+        os.makedirs(self.cache_dir)
+        with open(os.path.join(self.cache_dir, 'serials.json'), 'w') as fh:
+            json.dump({INDEX_URL: 100}, fh)
+        pages = {100: [['celery', '4.0', 0, 'new release', 101], ['ipython', '6.0', 0, 'new release', 102]],
+                 102: [['celery', '4.1', 0, 'new release', 103]]}
+
+        def call(session, method, params, timeout):
+            return 200 if method == 'changelog_last_serial' else pages[params[0]]
+
+        sync = IndexSync(INDEX_URL, self.cache_dir)
+        sync.CHANGELOG_PAGE_SIZE = 2
+        with patch.object(sync, '_call', side_effect=call) as call_mock:
+            sync.start(None)
+        self.assertEqual([call_args[0][2] for call_args in call_mock.call_args_list], [(100,), (102,)])
+        self.assertEqual((sync.base_serial, sync.serial), (100, 103))
+        self.assertEqual(sync.changes, {'celery': 103, 'ipython': 102})
+
+        # too many pages: everything is revalidated, and the next run syncs from the current serial
+        sync = IndexSync(INDEX_URL, self.cache_dir)
+        sync.CHANGELOG_PAGE_SIZE, sync.MAX_CHANGELOG_PAGES = 1, 1
+        with patch.object(sync, '_call', side_effect=call):
+            sync.start(None)
+        self.assertEqual((sync.base_serial, sync.serial, sync.changes), (None, 200, {}))
+
+    @responses.activate
+    def test_index_without_changelog(self):
+        self._index()
+        responses.add(responses.POST, CHANGELOG_URL, status=404)
+        detector, status_map, output = self._run()
+
+        self.assertIn('No changelog for', output)
+        self.assertIsNone(detector.indexes[0].sync)
+        self.assertEqual(detector.indexes[0].outcomes, {'network': 2})
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, 'serials.json')))
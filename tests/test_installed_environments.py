@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from packaging import version
+
+from pip_upgrader.installed_environments import print_installed_report, scan_environment, scan_environments, \
+    site_packages_dirs
+from pip_upgrader.status_output import status_record
+
+
+def make_environment(root, distributions):
+    """ A virtualenv-like tree with dist-info directories for {dist-info name: METADATA content or None} """
+    site_packages = os.path.join(root, 'lib', 'python3.11', 'site-packages')
+    os.makedirs(site_packages)
+    os.makedirs(os.path.join(root, 'bin'))
+    open(os.path.join(root, 'bin', 'python'), 'w').close()
+    for name, metadata in distributions.items():
+        path = os.path.join(site_packages, name)
+        if name.endswith('.egg-info') and metadata is not None:
+            with open(path, 'w') as fh:
+                fh.write(metadata)
+            continue
+        os.makedirs(path)
+        if metadata is not None:
+            with open(os.path.join(path, 'METADATA'), 'w') as fh:
+                fh.write(metadata)
+    return site_packages
+
+
+class TestInstalledEnvironments(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.venv = os.path.join(self.tmp_dir, 'venv')
+        self.site_packages = make_environment(self.venv, {
+            'Django-1.11.dist-info': None,
+            'django_rest_auth-0.9.1.dist-info': None,
+            'legacy-name-2.0.dist-info': 'Metadata-Version: 2.1\nName: legacy-name\nVersion: 2.0\n\nbody\n',
+            'old_pkg-0.1-py3.11.egg-info': 'Metadata-Version: 1.0\nName: old-pkg\nVersion: 0.1\n',
+            'README.txt': None,
+        })
+
+    def test_site_packages_dirs(self):
+        self.assertEqual(site_packages_dirs(self.venv), [self.site_packages])
+        self.assertEqual(site_packages_dirs(os.path.join(self.venv, 'bin', 'python')), [self.site_packages])
+        self.assertEqual(site_packages_dirs(self.site_packages), [self.site_packages])
+        self.assertEqual(site_packages_dirs(os.path.join(self.tmp_dir, 'missing')), [])
+
+    def test_scan_environment(self):
+        self.assertEqual(scan_environment(self.venv), {
+            'django': '1.11',
+            'django-rest-auth': '0.9.1',
+            'legacy-name': '2.0',
+            'old-pkg': '0.1',
+        })
+
+    def test_scan_running_interpreter(self):
+        self.assertIn('packaging', scan_environment())
+
+    def test_scan_environments(self):
+        other_venv = os.path.join(self.tmp_dir, 'other')
+        make_environment(other_venv, {'Django-2.0.dist-info': None})
+
+        installed = scan_environments([self.venv, other_venv, os.path.join(self.tmp_dir, 'missing')])
+
+        self.assertEqual(list(installed), [self.venv, other_venv, os.path.join(self.tmp_dir, 'missing')])
+        self.assertEqual(installed[other_venv], {'django': '2.0'})
+        self.assertEqual(installed[os.path.join(self.tmp_dir, 'missing')], {})
+
+    def test_report(self):
+        installed = OrderedDict([('a', {'django': '1.11'}), ('b', {'django': '1.11.0'}), ('c', {})])
+        package_status = {
+            'name': 'Django',
+            'current_version': version.parse('1.11'),
+            'latest_version': version.parse('2.0'),
+            'upgrade_available': True,
+        }
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout_mock:
+            print_installed_report({'Django': package_status}, installed)
+            output = stdout_mock.getvalue()
+
+        self.assertIn('Installed versions (3 environments)', output)
+        self.assertIn('1.11 (1 env)', output)
+        self.assertIn('1.11.0 (1 env)', output)
+        self.assertIn('missing (1 env)', output)
+
+        package_status['installed'] = OrderedDict([('a', '1.11'), ('c', None)])
+        self.assertEqual(status_record(package_status)['installed'], {'a': '1.11', 'c': None})
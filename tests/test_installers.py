@@ -0,0 +1,70 @@
+from io import StringIO
+from subprocess import CalledProcessError
+from unittest import TestCase
+from unittest.mock import patch
+
+from pip_upgrader.installers import (BatchedPipInstaller, CommandInstaller, PipInstaller, PythonPipInstaller,
+                                     create_installer)
+from pip_upgrader.packages_upgrader import PackagesUpgrader
+from pip_upgrader.timings import Timings
+
+from helpers import package
+
+
+class TestInstallers(TestCase):
+
+    def setUp(self):
+        self.packages = [package('celery', '3.1.1', '4.0.2'), package('django', '1.10', '1.11')]
+
+    def test_create_installer(self):
+        self.assertIsInstance(create_installer({}), PipInstaller)
+        self.assertEqual(create_installer({'--installer': 'python', '--python': '/opt/py/bin/python'}).python,
+                         '/opt/py/bin/python')
+        self.assertTrue(create_installer({'--installer': 'pip-batch'}).batched)
+        self.assertIsInstance(create_installer({'--installer-command': 'uv pip install'}), CommandInstaller)
+
+        with self.assertRaisesRegex(ValueError, 'Unknown installer "poetry"'):
+            create_installer({'--installer': 'poetry'})
+        with self.assertRaisesRegex(ValueError, 'needs --installer-command'):
+            create_installer({'--installer': 'command'})
+
+    def test_commands(self):
+        pinned = ['celery==4.0.2']
+        self.assertEqual(PipInstaller().command(pinned, []), ['pip', 'install', 'celery==4.0.2'])
+        self.assertEqual(PythonPipInstaller(python='/venv/bin/python').command(pinned, ['--no-index']),
+                         ['/venv/bin/python', '-m', 'pip', 'install', '--no-index', 'celery==4.0.2'])
+        self.assertEqual(CommandInstaller("uv pip install --python '{python}'", python='/venv/bin/python').command(
+            pinned, ['--find-links', '/wheelhouse']),
+            ['uv', 'pip', 'install', '--python', '/venv/bin/python', '--find-links', '/wheelhouse', 'celery==4.0.2'])
+
+    @patch('pip_upgrader.installers.subprocess.check_call')
+    def test_durations(self, check_call_mock):
+        timings = Timings()
+        installer = BatchedPipInstaller(python='/venv/bin/python', timings=timings)
+
+        installer.install(self.packages)
+
+        check_call_mock.assert_called_once_with(['/venv/bin/python', '-m', 'pip', 'install',
+                                                 'celery==4.0.2', 'django==1.11'])
+        self.assertEqual(list(installer.durations), ['celery', 'django'])
+        self.assertEqual([(event['package'], event['installer'], event['batch_size']) for event in timings.installs],
+                         [('celery', 'pip-batch', 2), ('django', 'pip-batch', 2)])
+
+        # failed installs are timed too
+        check_call_mock.side_effect = CalledProcessError(1, 'pip')
+        with self.assertRaises(CalledProcessError):
+            installer.install(self.packages[:1])
+        self.assertEqual(timings.installs[-1]['batch_size'], 1)
+
+    @patch('pip_upgrader.installers.subprocess.check_call')
+    def test_upgrader_uses_the_installer(self, check_call_mock):
+        options = {'--dry-run': False, '--installer': 'pip-batch', '--python': '/venv/bin/python'}
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout_mock:
+            upgraded = PackagesUpgrader(self.packages, [], options).do_upgrade()
+
+        self.assertEqual(upgraded, [])  # no requirements files
+        check_call_mock.assert_called_once_with(['/venv/bin/python', '-m', 'pip', 'install',
+                                                 'celery==4.0.2', 'django==1.11'])
+        self.assertIn('Installed celery 4.0.2 in', stdout_mock.getvalue())
+        self.assertIn('(pip-batch)', stdout_mock.getvalue())
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from packaging import version
+
+from pip_upgrader.local_index import LocalIndex, local_index_path
+from pip_upgrader.packages_status_detector import PackagesStatusDetector
+
+
+class TestLocalIndex(TestCase):
+
+    def setUp(self):
+        self.index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.index_dir)
+
+    def _touch(self, *path):
+        with open(os.path.join(self.index_dir, *path), 'w') as fh:
+            fh.write('')
+
+    def test_flat_wheelhouse(self):
+        for filename in ('Django-1.11.tar.gz', 'Django-1.11.1-py3-none-any.whl', 'django_rest_auth-0.9.1.zip',
+                         'README.txt'):
+            self._touch(filename)
+
+        local_index = LocalIndex(self.index_dir)
+
+        self.assertEqual(sorted(local_index.releases('django')), ['1.11', '1.11.1'])
+        self.assertEqual(sorted(local_index.releases('Django-Rest_Auth')), ['0.9.1'])
+        self.assertEqual(local_index.releases('celery'), {})
+
+    def test_only_queried_files_are_stated(self):
+        for filename in ('Django-1.11.tar.gz', 'Django-1.11-py3-none-any.whl', 'celery-4.0.2.tar.gz'):
+            self._touch(filename)
+        os.utime(os.path.join(self.index_dir, 'Django-1.11.tar.gz'), (0, 0))
+        local_index = LocalIndex(self.index_dir)
+
+        with patch('pip_upgrader.local_index.os.stat', side_effect=os.stat) as stat_mock:
+            releases = local_index.releases('django')
+
+        self.assertEqual(sorted(call[0][0] for call in stat_mock.call_args_list),
+                         [os.path.join(self.index_dir, 'Django-1.11-py3-none-any.whl'),
+                          os.path.join(self.index_dir, 'Django-1.11.tar.gz')])
+        # the oldest file of the release gives its upload time
+        self.assertEqual(releases['1.11'], time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(0)))
+
+    def test_pep503_tree(self):
+        os.mkdir(os.path.join(self.index_dir, 'celery'))
+        os.mkdir(os.path.join(self.index_dir, 'django-rest-auth'))
+        self._touch('celery', 'celery-4.0.2.tar.gz')
+        with open(os.path.join(self.index_dir, 'django-rest-auth', 'index.html'), 'w') as fh:
+            fh.write('<a href="/files/django-rest-auth-0.9.1.tar.gz">django-rest-auth-0.9.1.tar.gz</a>'
+                     '<a href="/files/django-rest-auth-0.9.2.tar.gz" data-yanked="">django-rest-auth-0.9.2.tar.gz</a>')
+
+        local_index = LocalIndex(self.index_dir)
+
+        self.assertEqual(list(local_index.releases('celery')), ['4.0.2'])
+        self.assertEqual(local_index.releases('django-rest-auth'), {'0.9.1': None})
+
+    def test_status_detector_file_url(self):
+        self._touch('celery-3.1.1.tar.gz')
+        self._touch('celery-4.0.2-py2.py3-none-any.whl')
+        self.assertEqual(local_index_path('file://' + self.index_dir), self.index_dir)
+        self.assertIsNone(local_index_path('https://pypi.python.org/simple/'))
+
+        detector = PackagesStatusDetector([], {'--use-default-index': True, '--no-cache': True})
+        detector.PYPI_API_URL = detector._prepare_api_url('file://' + self.index_dir)
+        status, _ = detector._fetch_index_package_info('celery', version.parse('3.1.1'))
+
+        self.assertEqual(detector.PYPI_API_TYPE, 'local_files')
+        self.assertEqual(status['latest_version'], version.parse('4.0.2'))
+        self.assertNotEqual(status['upload_time'], '-')
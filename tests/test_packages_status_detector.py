@@ -0,0 +1,217 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+import responses
+from packaging import version
+
+from pip_upgrader.distribution_filenames import parse_filename_version
+from pip_upgrader.packages_detector import PackagesDetector
+from pip_upgrader.packages_status_detector import PackagesStatusDetector
+from pip_upgrader.pypi_json_parser import load_pypi_json
+from pip_upgrader.simple_html_parser import iter_anchor_files
+
+SIMPLE_INDEX_URL = 'https://pypi.python.org/simple/{package}/'
+
+SIMPLE_JSON_BODY = json.dumps({
+    'meta': {'api-version': '1.1'},
+    'name': 'django-rest-auth',
+    'versions': ['0.9.0', '0.9.1', '0.9.2', '1.0.0rc1'],
+    'files': [
+        {'filename': 'django-rest-auth-0.9.0.tar.gz', 'upload-time': '2016-11-10T10:00:00.000000Z'},
+        {'filename': 'django_rest_auth-0.9.1-py2.py3-none-any.whl', 'upload-time': '2017-03-06T06:28:14.123Z'},
+        {'filename': 'django-rest-auth-0.9.1.tar.gz', 'upload-time': '2017-03-06T06:30:00.000000Z'},
+        {'filename': 'django-rest-auth-0.9.2.tar.gz', 'upload-time': '2017-04-01T00:00:00Z', 'yanked': 'broken'},
+        {'filename': 'django-rest-auth-1.0.0rc1.zip', 'upload-time': '2017-05-01T00:00:00Z'},
+    ],
+})
+
+
+class TestSimpleJsonApi(TestCase):
+
+    def _detector(self, options=None):
+        detector = PackagesStatusDetector([], dict({'--use-default-index': True, '--no-cache': True},
+                                                   **(options or {})))
+        detector.PYPI_API_URL = detector._prepare_api_url('https://pypi.python.org/simple')
+        return detector
+
+    def test_simple_index_url_negotiates_json(self):
+        detector = self._detector()
+
+        self.assertEqual(detector.PYPI_API_TYPE, 'simple_json')
+        self.assertEqual(detector.PYPI_API_URL, SIMPLE_INDEX_URL)
+
+    @responses.activate
+    def test_json_response(self):
+        responses.add(responses.GET, SIMPLE_INDEX_URL.format(package='django-rest-auth'), body=SIMPLE_JSON_BODY,
+                      content_type='application/vnd.pypi.simple.v1+json')
+
+        status, _ = self._detector()._fetch_index_package_info('django_rest_auth', version.parse('0.9.0'))
+
+        self.assertIn('application/vnd.pypi.simple.v1+json', responses.calls[0].request.headers['Accept'])
+        # 0.9.2 is yanked, 1.0.0rc1 is a prerelease
+        self.assertEqual(status['latest_version'], version.parse('0.9.1'))
+        self.assertEqual(status['upload_time'], '2017-03-06 06:28:14')
+        self.assertTrue(status['upgrade_available'])
+
+    @responses.activate
+    def test_json_response_prerelease(self):
+        responses.add(responses.GET, SIMPLE_INDEX_URL.format(package='django-rest-auth'), body=SIMPLE_JSON_BODY,
+                      content_type='application/vnd.pypi.simple.v1+json')
+        detector = self._detector()
+        detector._prerelease = True
+
+        status, _ = detector._fetch_index_package_info('django-rest-auth', version.parse('0.9.0'))
+
+        self.assertEqual(status['latest_version'], version.parse('1.0.0rc1'))
+
+    @responses.activate
+    def test_html_fallback(self):
+        with open('tests/fixtures/django-rest-auth.html') as fh:
+            responses.add(responses.GET, SIMPLE_INDEX_URL.format(package='django-rest-auth'), body=fh.read(),
+                          content_type='text/html')
+
+        status, _ = self._detector()._fetch_index_package_info('django-rest-auth', version.parse('0.9.0'))
+
+        self.assertTrue(status['upgrade_available'])
+        self.assertEqual(status['upload_time'], '-')
+
+
+class TestDistributionFilenames(TestCase):
+
+    def test_parse_filename_version(self):
+        self.assertEqual(parse_filename_version('Django-1.11.tar.gz', 'django'), '1.11')
+        self.assertEqual(parse_filename_version('django-rest-auth-0.9.1.tar.gz', 'django-rest-auth'), '0.9.1')
+        self.assertEqual(parse_filename_version('Django-1.11-py2.py3-none-any.whl', 'django'), '1.11')
+        self.assertEqual(parse_filename_version('celery-4.0.2.zip', 'celery'), '4.0.2')
+        self.assertEqual(parse_filename_version('celery-3.1.1-py2.7.egg', 'celery'), '3.1.1')
+        self.assertIsNone(parse_filename_version('django-rest-auth-0.9.1.tar.gz', 'django'))
+        self.assertIsNone(parse_filename_version('celery-4.0.2.exe', 'celery'))
+
+
+class TestPypiJsonParser(TestCase):
+
+    def test_load_pypi_json_keeps_only_releases_and_upload_times(self):
+        with open('tests/fixtures/celery.json', 'rb') as fh:
+            content = fh.read()
+        full_data = json.loads(content.decode('utf-8'))
+
+        data = load_pypi_json(content)
+
+        self.assertEqual(set(data), {'releases', 'info'})
+        self.assertEqual(data['info'], {'version': full_data['info']['version']})
+        self.assertEqual(set(data['releases']), set(full_data['releases']))
+        self.assertEqual(data['releases']['4.0.2'], [file_info['upload_time']
+                                                     for file_info in full_data['releases']['4.0.2']])
+
+
+class TestSimpleHtmlParser(TestCase):
+
+    def test_iter_anchor_files(self):
+        html = ('<html><body><h1>Links for celery</h1>'
+                '<a href="../celery-4.0.2.tar.gz#sha256=abc">celery-4.0.2.tar.gz</a>'
+                '<a href="../celery-4.0.3-py3-none-any.whl" data-yanked="">celery-4.0.3-py3-none-any.whl</a>'
+                '<A HREF="/files/celery-4.1.0.zip#md5=123"></A><abbr>celery-9.9.9.tar.gz</abbr>'
+                '<a href="/files/celery-4.2.0-py3-none-any.whl"><span>celery</span> 4.2.0</a>'
+                '<a><b>celery-4.3.0.tar.gz</b></a></body></html>')
+
+        self.assertEqual(list(iter_anchor_files(html)), [
+            ('celery-4.0.2.tar.gz', False),
+            ('celery-4.0.3-py3-none-any.whl', True),
+            ('celery-4.1.0.zip', False),
+            ('celery-4.2.0-py3-none-any.whl', False),
+            ('celery-4.3.0.tar.gz', False),
+        ])
+
+    def test_unclosed_anchors(self):
+        html = ('<a href="/files/celery-4.0.1.tar.gz">celery-4.0.1.tar.gz<br/>' * 3 +
+                '<a href="/files/celery-4.0.2.tar.gz"><span>celery-4.0.2.tar.gz</span></a>')
+
+        self.assertEqual(list(iter_anchor_files(html)), [('celery-4.0.2.tar.gz', False)])
+
+    @responses.activate
+    def test_simple_html_versions_skip_yanked_and_other_projects(self):
+        html = ('<a href="#">celery-4.0.2.tar.gz</a><a href="#">celery-4.1.0-py3-none-any.whl</a>'
+                '<a href="#" data-yanked="">celery-4.2.0.zip</a><a href="#">celery-batches-5.0.0.tar.gz</a>')
+        responses.add(responses.GET, SIMPLE_INDEX_URL.format(package='celery'), body=html, content_type='text/html')
+        detector = PackagesStatusDetector([], {'--use-default-index': True, '--no-cache': True})
+        detector.PYPI_API_URL = detector._prepare_api_url('https://pypi.python.org/simple')
+
+        status, _ = detector._fetch_index_package_info('celery', version.parse('4.0.2'))
+
+        self.assertEqual(status['latest_version'], version.parse('4.1.0'))
+
+
+class TestExpandPackage(TestCase):
+
+    def test_pin_types(self):
+        records = PackagesDetector(['requirements/extra/debug.txt', 'requirements/local.txt']).get_packages()
+        detector = PackagesStatusDetector(records, {'--use-default-index': True, '--no-cache': True})
+        detector_gte = PackagesStatusDetector(records, {'--use-default-index': True, '--no-cache': True,
+                                                        '--check-greater-equal': True})
+
+        self.assertEqual([detector._expand_package(record) for record in records],
+                         [('celery', '3.1.1'), ('ipython', '6.0.0'), (None, None)])
+        self.assertEqual(detector_gte._expand_package(records[2]), ('ipdb', '0.0.1'))
+
+
+class TestMultipleIndexes(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.requirements_file = os.path.join(self.tmp_dir, 'requirements.txt')
+        with open(self.requirements_file, 'w') as fh:
+            fh.write('--extra-index-url=https://mirror.example.com/simple/\ncelery==3.1.1\nprivate-pkg==1.0\n')
+
+        # keep the machine's pip configuration out of the test
+        for patcher in (patch.dict('os.environ', {'PIP_EXTRA_INDEX_URL': 'https://private.example.com/simple'}),
+                        patch('pip_upgrader.packages_status_detector.site_config_files', return_value=[]),
+                        patch.object(PackagesStatusDetector, 'pip_config_locations', [])):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        os.environ.pop('PIP_INDEX_URL', None)
+
+    def _simple_json(self, name, versions):
+        return json.dumps({'meta': {'api-version': '1.1'}, 'name': name, 'versions': versions,
+                           'files': [{'filename': '{}-{}.tar.gz'.format(name, vers)} for vers in versions]})
+
+    @responses.activate
+    def test_extra_indexes_are_merged(self):
+        with open('tests/fixtures/celery.json') as fh:
+            responses.add(responses.GET, 'https://pypi.python.org/pypi/celery/json', body=fh.read(),
+                          content_type='application/json')
+        responses.add(responses.GET, 'https://pypi.python.org/pypi/private-pkg/json', status=404)
+        responses.add(responses.GET, 'https://private.example.com/simple/celery/', status=404)
+        responses.add(responses.GET, 'https://private.example.com/simple/private-pkg/',
+                      body=self._simple_json('private-pkg', ['1.0', '2.0']),
+                      content_type='application/vnd.pypi.simple.v1+json')
+        responses.add(responses.GET, 'https://mirror.example.com/simple/celery/',
+                      body=self._simple_json('celery', ['3.1.1', '9.0.0']),
+                      content_type='application/vnd.pypi.simple.v1+json')
+        responses.add(responses.GET, 'https://mirror.example.com/simple/private-pkg/', status=404)
+
+        packages_detector = PackagesDetector([self.requirements_file])
+        self.assertEqual(packages_detector.extra_index_urls, ['https://mirror.example.com/simple/'])
+        self.assertEqual([record.name for record in packages_detector.get_packages()], ['celery', 'private-pkg'])
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout_mock:
+            detector = PackagesStatusDetector(
+                packages_detector.get_packages(), {'--no-cache': True, '--jobs': '2'},
+                requirements_extra_index_urls=packages_detector.extra_index_urls)
+            status_map = detector.detect_available_upgrades({'-p': []})
+            output = stdout_mock.getvalue()
+
+        self.assertEqual(status_map['celery']['latest_version'], version.parse('9.0.0'))
+        self.assertEqual(status_map['private-pkg']['latest_version'], version.parse('2.0'))
+        self.assertEqual(detector.errors, [])
+
+        self.assertIn('https://mirror.example.com/simple/{package}/', output)
+        self.assertIn('https://private.example.com/simple/{package}/', output)
+        self.assertIn('PIP_EXTRA_INDEX_URL environment variable', output)
+        self.assertIn('Indexes:', output)
+        self.assertIn('https://pypi.python.org/pypi/{package}/json (network: 1, not_found: 1)', output)
@@ -0,0 +1,144 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from subprocess import CalledProcessError
+from unittest import TestCase
+
+import responses
+from packaging import version
+
+from pip_upgrader.packages_detector import PackagesDetector
+from pip_upgrader.packages_status_detector import PackagesStatusDetector
+from pip_upgrader.packages_upgrader import PackagesUpgrader
+from pip_upgrader.requirements_rewriter import RequirementsRewriter
+
+from helpers import package
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+
+class TestBatchInstall(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.requirements = os.path.join(self.tmp_dir, 'requirements.txt')
+        with open(self.requirements, 'w') as fh:
+            fh.write('Django==1.10\ncelery==3.1.1\nipython==5.0.0\nrequests==2.0.0\n')
+
+        records = PackagesDetector([self.requirements]).get_packages()
+        self.packages = [package('Django', '1.10', '1.11', records), package('celery', '3.1.1', '4.0.2', records),
+                         package('ipython', '5.0.0', '6.0.0', records), package('requests', '2.0.0', '2.1.0', records)]
+
+    def _upgrader(self):
+        return PackagesUpgrader(self.packages, [self.requirements], {'--dry-run': False, '--batch-install': True})
+
+    @patch('pip_upgrader.installers.subprocess.check_call')
+    def test_single_pip_call(self, check_call_mock):
+        upgraded = self._upgrader().do_upgrade()
+
+        check_call_mock.assert_called_once_with(['pip', 'install', 'Django==1.11', 'celery==4.0.2',
+                                                 'ipython==6.0.0', 'requests==2.1.0'])
+        self.assertEqual([pkg['name'] for pkg in upgraded], ['Django', 'celery', 'ipython', 'requests'])
+
+    @patch('pip_upgrader.installers.subprocess.check_call')
+    def test_failures_are_bisected(self, check_call_mock):
+        def pip_install(command):
+            if 'celery==4.0.2' in command:
+                raise CalledProcessError(1, command)
+        check_call_mock.side_effect = pip_install
+
+        with patch('sys.stdout', new_callable=StringIO) as stdout_mock:
+            upgraded = self._upgrader().do_upgrade()
+
+        self.assertEqual([pkg['name'] for pkg in upgraded], ['Django', 'ipython', 'requests'])
+        self.assertIn('Failed to install package "celery"', stdout_mock.getvalue())
+        with open(self.requirements) as fh:
+            self.assertEqual(fh.read(), 'Django==1.11\ncelery==3.1.1\nipython==6.0.0\nrequests==2.1.0\n')
+
+
+class TestRequirementsRewriter(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def _write(self, filename, content):
+        path = os.path.join(self.tmp_dir, filename)
+        with open(path, 'w', newline='') as fh:
+            fh.write(content)
+        return path
+
+    def _read(self, path):
+        with open(path, newline='') as fh:
+            return fh.read()
+
+    def test_all_packages_in_one_pass(self):
+        base = self._write('base.txt', '-r extra.txt\r\nDjango == 1.10  # web\r\n'
+                                       'django-rest-auth[with_social]==0.9.0 ; python_version >= "2.7"\r\n'
+                                       'auth==1.0\r\ncelery>=3.1.1\r\n')
+        extra = self._write('extra.txt', 'celery==3.1.1\n')
+        untouched = self._write('untouched.txt', 'ipython==6.0.0\n')
+        os.utime(untouched, (0, 0))
+        records = PackagesDetector([base, extra, untouched]).get_packages()
+        packages = [package('Django', '1.10', '1.11', records),
+                    package('django-rest-auth', '0.9.0', '0.9.1', records),
+                    package('celery', '3.1.1', '4.0.2', records[-2:-1]),
+                    package('ipdb', '0.1', '0.2', records)]
+
+        updated = RequirementsRewriter().rewrite([base, extra, untouched, base], packages)
+
+        self.assertEqual([pkg['name'] for pkg in updated], ['Django', 'django-rest-auth', 'celery'])
+        self.assertEqual(self._read(base), '-r extra.txt\r\nDjango == 1.11  # web\r\n'
+                                           'django-rest-auth[with_social]==0.9.1 ; python_version >= "2.7"\r\n'
+                                           'auth==1.0\r\ncelery>=3.1.1\r\n')
+        self.assertEqual(self._read(extra), 'celery==4.0.2\n')
+        self.assertEqual(os.stat(untouched).st_mtime, 0)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ['base.txt', 'extra.txt', 'untouched.txt'])
+
+
+class TestPackagesDetector(TestCase):
+
+    def test_requirement_records(self):
+        records = PackagesDetector(['requirements/local.txt', 'requirements/extra/debug.txt']).get_packages()
+
+        self.assertEqual([(record.name, record.pin_operator, record.pinned_version, record.line_number)
+                          for record in records],
+                         [('ipython', '==', '6.0.0', 5), ('ipdb', '>=', '0.0.1', 8), ('celery', '==', '3.1.1', 3)])
+        self.assertEqual(records[2].filename, 'requirements/extra/debug.txt')
+        self.assertEqual(records[2].version_span, (8, 13))
+        self.assertEqual(str(records[2]), 'celery==3.1.1')
+
+    @responses.activate
+    def test_compound_specifier(self):
+        with open('tests/fixtures/celery.json') as fh:
+            responses.add(responses.GET, 'https://pypi.python.org/pypi/celery/json', body=fh.read(),
+                          content_type='application/json')
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        requirements = os.path.join(tmp_dir, 'requirements.txt')
+        with open(requirements, 'w') as fh:
+            fh.write('celery>=3.1.1,<4\n')
+
+        records = PackagesDetector([requirements]).get_packages()
+        self.assertEqual((records[0].pin_operator, records[0].pinned_version, str(records[0].constraints)),
+                         ('>=', '3.1.1', '<4'))
+
+        options = {'--dry-run': False, '-p': [], '--check-greater-equal': True, '--use-default-index': True,
+                   '--no-cache': True, '--no-daemon': True}
+        with patch('sys.stdout', new_callable=StringIO):
+            status_map = PackagesStatusDetector(records, options).detect_available_upgrades(options)
+        # 4.0.2 is the latest release, but the line excludes it
+        self.assertEqual(status_map['celery']['latest_version'], version.parse('3.1.25'))
+
+        RequirementsRewriter().rewrite([requirements], [status_map['celery']])
+        with open(requirements) as fh:
+            self.assertEqual(fh.read(), 'celery>=3.1.25,<4\n')
+
+        # a version excluded by the other clauses is never written
+        status_map['celery']['latest_version'] = version.parse('4.0.2')
+        self.assertEqual(RequirementsRewriter().rewrite([requirements], [status_map['celery']]), [])
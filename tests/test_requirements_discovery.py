@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from pip_upgrader.requirements_detector import RequirementsDetector
+from pip_upgrader.requirements_discovery import IgnoreRules, walk_requirements_files
+
+
+class TestIgnoreRules(TestCase):
+
+    def test_globs(self):
+        rules = IgnoreRules().extended(['build/', '/docs', '*.log', 'vendor/**/requirements.txt', '!keep.log'])
+
+        self.assertTrue(rules.is_ignored('build', is_dir=True))
+        self.assertTrue(rules.is_ignored('services/api/build', is_dir=True))
+        self.assertFalse(rules.is_ignored('build', is_dir=False))  # directories only
+        self.assertTrue(rules.is_ignored('docs', is_dir=True))
+        self.assertFalse(rules.is_ignored('services/docs', is_dir=True))  # anchored
+        self.assertTrue(rules.is_ignored('a/b/debug.log'))
+        self.assertFalse(rules.is_ignored('a/keep.log'))  # negated
+        self.assertTrue(rules.is_ignored('vendor/x/y/requirements.txt'))
+        self.assertTrue(rules.is_ignored('vendor/requirements.txt'))
+        self.assertFalse(rules.is_ignored('requirements.txt'))
+
+    def test_rules_are_relative_to_their_base(self):
+        rules = IgnoreRules().extended(['/fixtures'], base='services/api')
+
+        self.assertTrue(rules.is_ignored('services/api/fixtures', is_dir=True))
+        self.assertFalse(rules.is_ignored('fixtures', is_dir=True))
+        self.assertFalse(rules.is_ignored('services/web/fixtures', is_dir=True))
+
+
+class TestRequirementsDiscovery(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def _write(self, path, content=''):
+        path = os.path.join(self.root, path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as fh:
+            fh.write(content)
+
+    def _relative(self, filenames):
+        return [os.path.relpath(filename, self.root).replace(os.sep, '/') for filename in filenames]
+
+    def test_walk(self):
+        self._write('requirements.txt')
+        self._write('services/api/requirements/base.txt')
+        self._write('services/api/requirements/notes.md')
+        self._write('services/api/test-requirements.txt')
+        self._write('services/web/constraints.txt')
+        self._write('services/web/setup.txt')
+        self._write('services/web/node_modules/pkg/requirements.txt')
+        self._write('services/web/.gitignore', 'generated/\n')
+        self._write('services/web/generated/requirements.txt')
+        self._write('services/old/requirements.txt')
+
+        filenames = self._relative(walk_requirements_files(self.root, excludes=['services/old/']))
+
+        self.assertEqual(filenames, [
+            'requirements.txt',
+            'services/api/test-requirements.txt',  # files of a directory first, then its subdirectories
+            'services/api/requirements/base.txt',
+            'services/web/constraints.txt',
+        ])
+
+    def test_all_include_forms_and_cycles(self):
+        self._write('requirements.txt', '-r requirements/base.txt\n--requirement=requirements/dev.txt\n'
+                                        '-c constraints.txt\n')
+        self._write('requirements/base.txt', 'django==1.11\n--constraint ../constraints.txt\n')
+        self._write('requirements/dev.txt', '-rtest.txt  # tests\n-r https://example.com/requirements.txt\n')
+        self._write('requirements/test.txt', '--requirement ../requirements.txt\n')  # cycle
+        self._write('constraints.txt', 'celery==4.0\n')
+
+        detector = RequirementsDetector([os.path.join(self.root, 'requirements.txt')])
+
+        self.assertEqual(self._relative(detector.get_filenames()), [
+            'requirements.txt',
+            'requirements/base.txt',
+            'constraints.txt',
+            'requirements/dev.txt',
+            'requirements/test.txt',
+        ])
+
+    def test_autodetect_recursive(self):
+        self._write('requirements.txt', '-r deploy/pins.txt\n')
+        self._write('deploy/pins.txt')
+        self._write('services/api/requirements-dev.txt')
+
+        not_recursive = RequirementsDetector(None, root=self.root)
+        recursive = RequirementsDetector(None, root=self.root, recursive=True)
+
+        self.assertEqual(self._relative(not_recursive.get_filenames()), ['requirements.txt', 'deploy/pins.txt'])
+        self.assertEqual(self._relative(recursive.get_filenames()),
+                         ['requirements.txt', 'services/api/requirements-dev.txt', 'deploy/pins.txt'])
+
+    def test_autodetect_excluded_directory(self):
+        self._write('requirements.txt')
+        self._write('requirements/base.txt')
+        self._write('requirements/dev.txt')
+
+        detector = RequirementsDetector(None, root=self.root, excludes=['requirements/'])
+
+        self.assertEqual(self._relative(detector.get_filenames()), ['requirements.txt'])
+        self.assertTrue(IgnoreRules().extended(['requirements/']).is_file_ignored('requirements/base.txt'))
+        self.assertFalse(IgnoreRules().extended(['requirements/']).is_file_ignored('requirements.txt'))
@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from packaging import version
+
+from pip_upgrader.version_selector import parse_version, select_latest_version
+
+RELEASES = ['0.9', '1.0', '1.9.1', '1.10', '1.10.1', '1.11rc1', '1.11', '1.11.1.post1', '2.0a1', 'not-a-version']
+
+
+class TestVersionSelector(TestCase):
+
+    def test_latest_final_release(self):
+        self.assertEqual(select_latest_version(RELEASES, version.parse('1.10')), (version.parse('1.11'), '1.11'))
+
+    def test_latest_prerelease(self):
+        self.assertEqual(select_latest_version(RELEASES, version.parse('1.10'), include_prereleases=True),
+                         (version.parse('2.0a1'), '2.0a1'))
+
+    def test_up_to_date(self):
+        self.assertEqual(select_latest_version(['1.0', '1.1', '1.1.0'], version.parse('1.1'))[0],
+                         version.parse('1.1'))
+
+    def test_pinned_release_removed_from_index(self):
+        self.assertEqual(select_latest_version(['1.0', '1.1'], version.parse('1.5')), (version.parse('1.1'), '1.1'))
+        # only a pre-release is newer than the pin
+        self.assertEqual(select_latest_version(['1.0', '2.0a1'], version.parse('1.5')), (version.parse('1.0'), '1.0'))
+        self.assertEqual(select_latest_version(['1.0', '2.0a1'], version.parse('1.5'), include_prereleases=True),
+                         (version.parse('2.0a1'), '2.0a1'))
+
+    def test_trailing_zeros(self):
+        for pin in ('1.10.0', '1.10.0.post0', '1.10'):
+            self.assertEqual(select_latest_version(['1.10.0', '1.10.post1'], version.parse(pin), True),
+                             (version.parse('1.10.post1'), '1.10.post1'))
+        self.assertEqual(select_latest_version(['1.9.0', '1.10.0'], version.parse('1.10')),
+                         (version.parse('1.10.0'), '1.10.0'))
+
+    def test_epochs_are_compared(self):
+        self.assertEqual(select_latest_version(['2.0', '1!1.0'], version.parse('1.5'))[1], '1!1.0')
+
+    def test_invalid_versions_are_skipped(self):
+        self.assertIsNone(parse_version('0.7.1.fix1'))
+        self.assertEqual(select_latest_version(['0.7.1.fix1'], version.parse('0.1')), (None, None))
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from io import StringIO
+from subprocess import CalledProcessError
+from unittest import TestCase
+from unittest.mock import MagicMock, call, patch
+
+import responses
+from packaging.tags import Tag
+
+from pip_upgrader.packages_status_detector import PackagesStatusDetector
+from pip_upgrader.packages_upgrader import PackagesUpgrader
+from pip_upgrader.wheel_prefetch import PrefetchError, WheelPrefetcher, interpreter_tags
+
+from helpers import package
+
+WHEEL_CONTENT = b'PK wheel content'
+FILES_URL = 'https://files.pythonhosted.org/packages/'
+
+
+def release_file(filename, content=WHEEL_CONTENT, sha256=None):
+    return {'filename': filename, 'url': FILES_URL + filename, 'yanked': False,
+            'digests': {'sha256': sha256 or hashlib.sha256(content).hexdigest()}}
+
+
+class TestWheelPrefetch(TestCase):
+
+    def setUp(self):
+        self.wheelhouse = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.wheelhouse)
+        self.detector = PackagesStatusDetector([], {'--use-default-index': True, '--no-cache': True})
+        self.tags = [Tag('cp311', 'cp311', 'manylinux_2_17_x86_64'), Tag('py3', 'none', 'any')]
+
+    def _prefetcher(self):
+        return WheelPrefetcher(self.detector, wheelhouse=self.wheelhouse, tags=self.tags)
+
+    def test_choose_file(self):
+        files = [{'filename': filename} for filename in (
+            'pkg-1.0.tar.gz', 'pkg-1.0-py3-none-any.whl', 'pkg-1.0-cp27-cp27m-win32.whl',
+            'pkg-1.0-cp311-cp311-manylinux_2_17_x86_64.manylinux2014_x86_64.whl')]
+        prefetcher = self._prefetcher()
+
+        self.assertEqual(prefetcher.choose_file(files)['filename'],
+                         'pkg-1.0-cp311-cp311-manylinux_2_17_x86_64.manylinux2014_x86_64.whl')
+        self.assertEqual(prefetcher.choose_file(files[:3])['filename'], 'pkg-1.0-py3-none-any.whl')
+        self.assertEqual(prefetcher.choose_file([files[0], files[2]])['filename'], 'pkg-1.0.tar.gz')
+        self.assertIsNone(prefetcher.choose_file([files[2]]))
+
+    @responses.activate
+    def test_prefetch(self):
+        responses.add(responses.GET, 'https://pypi.python.org/pypi/celery/4.0.2/json', body=json.dumps({
+            'info': {}, 'urls': [release_file('celery-4.0.2.tar.gz'), release_file('celery-4.0.2-py3-none-any.whl')]}))
+        responses.add(responses.GET, 'https://pypi.python.org/pypi/django/1.11/json', body=json.dumps({
+            'info': {}, 'urls': [release_file('Django-1.11-py3-none-any.whl', sha256='0' * 64)]}))
+        responses.add(responses.GET, FILES_URL + 'celery-4.0.2-py3-none-any.whl', body=WHEEL_CONTENT)
+        responses.add(responses.GET, FILES_URL + 'Django-1.11-py3-none-any.whl', body=WHEEL_CONTENT)
+        packages = [package('celery', '3.1.1', '4.0.2'), package('django', '1.10', '1.11')]
+
+        results = self._prefetcher().prefetch(packages)
+
+        path = os.path.join(self.wheelhouse, 'celery-4.0.2-py3-none-any.whl')
+        self.assertEqual(packages[0]['prefetched'], path)
+        self.assertEqual(results['celery']['source'], 'network')
+        self.assertTrue(results['celery']['verified'])
+        with open(path, 'rb') as fh:
+            self.assertEqual(fh.read(), WHEEL_CONTENT)
+
+        # the digest of the django wheel doesn't match: nothing lands in the wheelhouse
+        self.assertIsInstance(results['django'], PrefetchError)
+        self.assertIn('sha256 mismatch', str(results['django']))
+        self.assertNotIn('prefetched', packages[1])
+        self.assertEqual(sorted(os.listdir(self.wheelhouse)), ['celery-4.0.2-py3-none-any.whl'])
+
+        # verified files are reused
+        results = self._prefetcher().prefetch(packages[:1])
+        self.assertEqual(results['celery']['source'], 'wheelhouse')
+
+    @patch('pip_upgrader.wheel_prefetch.subprocess.check_output')
+    def test_interpreter_tags(self, check_output_mock):
+        self.assertIsNone(interpreter_tags(sys.executable))
+        self.assertFalse(check_output_mock.called)
+
+        check_output_mock.return_value = b'cp39-cp39-manylinux_2_17_x86_64\npy3-none-any\n'
+        self.assertEqual(interpreter_tags('/opt/py39/bin/python'),
+                         [Tag('cp39', 'cp39', 'manylinux_2_17_x86_64'), Tag('py3', 'none', 'any')])
+        self.assertEqual(check_output_mock.call_args[0][0][0], '/opt/py39/bin/python')
+
+        check_output_mock.side_effect = OSError('No such file or directory')
+        with self.assertRaisesRegex(PrefetchError, 'could not get the wheel tags of /opt/py39/bin/python'):
+            interpreter_tags('/opt/py39/bin/python')
+
+    def test_failed_downloads_release_their_connection(self):
+        response = MagicMock(ok=False, status_code=503, reason='Service Unavailable')
+        response.__enter__.return_value = response
+
+        with patch.object(self.detector.session, 'get', return_value=response):
+            with self.assertRaisesRegex(PrefetchError, '503 Service Unavailable'):
+                self._prefetcher()._download({'filename': 'celery-4.0.2-py3-none-any.whl', 'sha256': None,
+                                              'url': FILES_URL + 'celery-4.0.2-py3-none-any.whl'})
+
+        self.assertTrue(response.__exit__.called)
+
+
+class TestInstallFromWheelhouse(TestCase):
+
+    def setUp(self):
+        self.packages = [package('celery', '3.1.1', '4.0.2'), package('django', '1.10', '1.11')]
+        for selected in self.packages:
+            selected['prefetched'] = os.path.join('/wheelhouse', '{}.whl'.format(selected['name']))
+
+    def _upgrader(self):
+        return PackagesUpgrader(self.packages, [], {'--dry-run': False, '--batch-install': True})
+
+    @patch('pip_upgrader.installers.subprocess.check_call')
+    def test_install_without_index(self, check_call_mock):
+        self._upgrader().do_upgrade()
+
+        check_call_mock.assert_called_once_with(['pip', 'install', '--no-index', '--find-links', '/wheelhouse',
+                                                 'celery==4.0.2', 'django==1.11'])
+
+    @patch('pip_upgrader.installers.subprocess.check_call')
+    def test_retry_with_index(self, check_call_mock):
+        def pip_install(command):
+            if '--no-index' in command:
+                raise CalledProcessError(1, command)
+        check_call_mock.side_effect = pip_install
+
+        with patch('sys.stdout', new_callable=StringIO):
+            self._upgrader().do_upgrade()
+
+        self.assertEqual(check_call_mock.call_args_list[-1],
+                         call(['pip', 'install', '--find-links', '/wheelhouse', 'celery==4.0.2', 'django==1.11']))